@@ -1,8 +1,8 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
+import json
 from flask_cors import CORS
 import os
 import sys
-import subprocess
 import time
 import requests
 from pathlib import Path
@@ -13,87 +13,102 @@ from config import *
 os.environ['PYTHONUNBUFFERED'] = '1'
 sys.stdout.reconfigure(line_buffering=True) if hasattr(sys.stdout, 'reconfigure') else None
 
+from core.ollama_server import start_ollama_server
 
-def check_ollama_running():
-    """Ollama 서버가 실행 중인지 확인"""
-    try:
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=2)
-        return response.status_code == 200
-    except:
-        return False
-
+# 서버 역할 (serve.py 워커: "writer" = 업로드/삭제/인덱싱 담당, "reader" = 질의 처리 / 단독 실행: "standalone")
+SERVER_ROLE = os.getenv("RAG_SERVER_ROLE", "standalone")
+WRITER_URL = os.getenv("RAG_WRITER_URL", f"http://127.0.0.1:{SERVER_WRITER_PORT}")
 
-def start_ollama_server():
-    """Ollama 서버를 백그라운드로 시작"""
-    print("[OLLAMA] Checking Ollama server status...")
-    
-    if check_ollama_running():
-        print("[OLLAMA] Ollama server is already running")
-        return True
-    
-    print("[OLLAMA] Starting Ollama server...")
-    
-    try:
-        # Windows에서 백그라운드로 ollama serve 실행
-        if sys.platform == "win32":
-            # DETACHED_PROCESS 플래그로 별도 프로세스로 실행
-            CREATE_NO_WINDOW = 0x08000000
-            subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                creationflags=CREATE_NO_WINDOW
-            )
-        else:
-            # Linux/Mac
-            subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                start_new_session=True
-            )
-        
-        # Ollama가 준비될 때까지 대기 (최대 30초)
-        print("[OLLAMA] Waiting for Ollama to be ready...")
-        for i in range(30):
-            time.sleep(1)
-            if check_ollama_running():
-                print(f"[OLLAMA] Ollama server started successfully (took {i+1}s)")
-                return True
-            if (i + 1) % 5 == 0:
-                print(f"[OLLAMA] Still waiting... ({i+1}s)")
-        
-        print("[OLLAMA] WARNING: Ollama server did not start within 30 seconds")
-        print("[OLLAMA] Please check if Ollama is installed correctly")
-        return False
-        
-    except FileNotFoundError:
-        print("[OLLAMA] ERROR: 'ollama' command not found")
-        print("[OLLAMA] Please install Ollama from https://ollama.ai")
-        return False
-    except Exception as e:
-        print(f"[OLLAMA] ERROR: Failed to start Ollama: {e}")
-        return False
-
-
-# Ollama 서버 자동 시작
-start_ollama_server()
+# Ollama 서버 자동 시작 (serve.py는 마스터 프로세스에서 한 번만 실행)
+if SERVER_ROLE == "standalone":
+    start_ollama_server()
 
 from core.rag_system import RAGSystem
 from core.file_manager import FileManager
+from core.indexing_jobs import IndexingJobQueue, ACTIVE_STATUSES
 
 app = Flask(__name__)
 CORS(app)
 
-# RAG 시스템 및 파일 매니저 초기화
-rag_system = RAGSystem()
+# RAG 시스템 및 파일 매니저 초기화 (reader 워커는 인덱스를 바꾸지 않음)
+rag_system = RAGSystem(read_only=(SERVER_ROLE == "reader"))
 file_manager = FileManager()
 
+# 인덱싱 작업 큐 (업로드 요청은 작업 ID만 받고 즉시 반환)
+def on_index_job_cancelled(job):
+    """취소된 작업의 업로드 파일 삭제 (인덱싱되지 않은 파일이 목록에 남지 않도록)"""
+    if job.get("upload_id"):
+        file_manager.delete_file(job["upload_id"])
+
+index_jobs = None
+if SERVER_ROLE != "reader":
+    index_jobs = IndexingJobQueue(INDEX_JOBS_PATH, rag_system, max_workers=INDEX_WORKERS,
+                                  on_cancelled=on_index_job_cancelled)
+    index_jobs.resume_pending()
+
+# writer 워커로 전달할 엔드포인트 (인덱스/업로드 파일/작업 목록을 바꾸거나 writer만 가진 상태를 조회)
+WRITER_ENDPOINTS = {"upload_file", "list_jobs", "get_job", "cancel_job", "delete_file"}
+
+@app.before_request
+def route_by_role():
+    """reader 워커: 쓰기 요청은 writer 워커로 전달하고, 질의 전 인덱스 변경 여부 확인"""
+    if SERVER_ROLE != "reader":
+        return None
+    if request.endpoint in WRITER_ENDPOINTS:
+        return forward_to_writer()
+    try:
+        rag_system.refresh_if_stale()
+    except Exception as e:
+        print(f"[API] 인덱스 다시 로드 오류: {e}")
+    return None
+
+def forward_to_writer():
+    """현재 요청을 writer 워커로 그대로 전달 (본문/헤더 유지)"""
+    try:
+        upstream = requests.request(
+            request.method,
+            f"{WRITER_URL}{request.full_path if request.query_string else request.path}",
+            headers={k: v for k, v in request.headers if k.lower() not in ("host", "content-length")},
+            data=request.get_data(),
+            timeout=MAX_FILE_SIZE // (1024 * 1024) + 60  # 대용량 업로드 저장 시간 고려
+        )
+    except requests.RequestException as e:
+        return jsonify({"error": f"Writer worker unavailable: {str(e)}"}), 503
+    excluded = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+    return Response(
+        upstream.content,
+        status=upstream.status_code,
+        headers=[(k, v) for k, v in upstream.headers.items() if k.lower() not in excluded]
+    )
+
 @app.route("/api/health", methods=["GET"])
 def health():
     """헬스 체크 엔드포인트"""
     return jsonify({"status": "healthy", "message": "Private RAG API is running"})
 
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    """캐시 적중률 통계"""
+    return jsonify(rag_system.get_cache_stats()), 200
+
+@app.route("/api/llm/stats", methods=["GET"])
+def llm_stats():
+    """LLM 게이트웨이 상태 (예열 여부, 로드된 num_ctx, 호출/오류 수, 스케줄러 대기열 길이/대기 시간)"""
+    return jsonify(rag_system.llm.stats()), 200
+
+@app.route("/api/llm/probe", methods=["POST"])
+def llm_probe():
+    """LLM 지연 시간 측정 (기본: 현재 상태 그대로 측정)
+
+    {"unload": true}를 명시해야 모델을 내린 뒤 콜드 지연을 측정함.
+    운영 중 모델을 내리면 진행 중인 질의가 재로드를 기다리므로 점검 시간에만 사용.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(rag_system.llm.probe(unload=bool(data.get("unload", False)))), 200
+    except Exception as e:
+        return jsonify({"error": f"LLM probe failed: {str(e)}"}), 503
+
 @app.route("/api/upload", methods=["POST"])
 def upload_file():
     """파일 업로드 및 인덱싱"""
@@ -123,23 +138,55 @@ def upload_file():
                 "is_duplicate": True
             }), 409  # 409 Conflict
         
+        # 같은 파일이 아직 인덱싱 중인 경우도 중복으로 처리
+        active_job = index_jobs.find_active(original_filename)
+        if active_job:
+            return jsonify({
+                "error": "Duplicate document",
+                "message": f"파일명 '{original_filename}'은(는) 현재 인덱싱 중입니다.",
+                "job_id": active_job["id"],
+                "is_duplicate": True
+            }), 409
+        
         # 파일 저장용 안전한 파일명 생성
         safe_filename = secure_filename(file.filename)
         file_path = file_manager.save_file(file, safe_filename, original_filename)
+        upload_id = file_path.name.split("_", 1)[0]
         
-        # 문서 인덱싱 (원본 파일명 사용)
-        result = rag_system.index_document(file_path, original_filename)
+        # 문서 인덱싱 작업 등록 (원본 파일명 사용, 진행 상황은 /api/jobs/<job_id>로 확인)
+        job = index_jobs.submit(file_path, original_filename, upload_id=upload_id)
         
         return jsonify({
             "success": True,
             "filename": original_filename,  # 원본 파일명 반환
-            "file_id": result["file_id"],
-            "chunks_count": result["chunks_count"]
-        }), 200
+            "job_id": job["id"],
+            "status": job["status"]
+        }), 202
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    """인덱싱 작업 목록 조회"""
+    return jsonify({"jobs": index_jobs.list()}), 200
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """인덱싱 작업 상태 조회 (단계, 페이지 진행률, 단계별 소요 시간)"""
+    job = index_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    """인덱싱 작업 취소"""
+    job = index_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
 @app.route("/api/files", methods=["GET"])
 def list_files():
     """업로드된 파일 목록 조회"""
@@ -172,7 +219,7 @@ def list_files():
                     doc_type_counts[file_doc_type] = 0
                 doc_type_counts[file_doc_type] += 1
         
-        # 벡터 DB에서도 문서 유형별 개수 가져오기 (더 정확한 정보)
+        # 벡터 DB 카탈로그에서도 문서 유형별 개수 가져오기 (더 정확한 정보)
         try:
             vector_db_stats = rag_system.get_all_document_types()
             # 벡터 DB의 정보가 더 정확할 수 있으므로 우선 사용
@@ -222,6 +269,19 @@ def download_file(file_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def llm_busy_response(retry_after=None):
+    """LLM 대기열 초과 응답 (429, 대기하지 않고 즉시 반환)"""
+    retry_after = retry_after or 5
+    response = jsonify({
+        "error": "LLM queue is full",
+        "answer": "⚠️ 현재 질의가 많아 답변을 생성할 수 없습니다. 잠시 후 다시 시도하세요.",
+        "sources": [],
+        "has_answer": False,
+        "retry_after": retry_after
+    })
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 429
+
 @app.route("/api/query", methods=["POST"])
 def query():
     """RAG 쿼리 처리"""
@@ -234,15 +294,23 @@ def query():
         
         print(f"쿼리 수신: {query_text[:50]}...")
         
+        # LLM 대기열이 가득 차면 검색 전에 바로 거절
+        if rag_system.llm.scheduler.is_saturated():
+            return llm_busy_response()
+        
         # RAG 질의 처리
         result = rag_system.query(query_text)
         
         print(f"쿼리 처리 완료: has_answer={result.get('has_answer')}, sources={len(result.get('sources', []))}")
         
+        if result.get("busy"):
+            return llm_busy_response(result.get("retry_after"))
+        
         return jsonify({
             "answer": result["answer"],
             "sources": result["sources"],
-            "has_answer": result["has_answer"]
+            "has_answer": result["has_answer"],
+            "cached": result.get("cached", False)
         }), 200
         
     except Exception as e:
@@ -257,6 +325,58 @@ def query():
             "has_answer": False
         }), 500
 
+@app.route("/api/query/stream", methods=["GET", "POST"])
+def query_stream():
+    """RAG 쿼리 처리 (Server-Sent Events 스트리밍)
+    
+    이벤트:
+        event: sources  data: {"sources": [...]}              검색 완료 직후
+        event: token    data: {"content": "..."}              LLM 토큰
+        event: done     data: {"answer", "sources", "has_answer", "ttft", "cached", "busy"}
+        event: error    data: {"error": "..."}
+    """
+    if request.method == "POST":
+        data = request.json or {}
+        query_text = data.get("query")
+    else:
+        query_text = request.args.get("query")
+    
+    if not query_text:
+        return jsonify({"error": "Query text is required"}), 400
+    
+    print(f"스트리밍 쿼리 수신: {query_text[:50]}...")
+    
+    if rag_system.llm.scheduler.is_saturated():
+        return llm_busy_response()
+    
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    
+    def generate():
+        start = time.time()
+        try:
+            for event in rag_system.query_stream(query_text):
+                payload = dict(event)
+                name = payload.pop("event")
+                if name == "done":
+                    print(f"스트리밍 쿼리 완료: has_answer={payload.get('has_answer')}, "
+                          f"TTFT={payload.get('ttft')}, 총 {time.time() - start:.2f}초")
+                yield sse(name, payload)
+        except Exception as e:
+            import traceback
+            print(f"스트리밍 쿼리 처리 오류:")
+            print(traceback.format_exc())
+            yield sse("error", {"error": str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 프록시 버퍼링 비활성화
+        }
+    )
+
 @app.route("/api/files/<file_id>", methods=["DELETE"])
 def delete_file(file_id):
     """파일 및 인덱스 삭제"""
@@ -271,6 +391,21 @@ def delete_file(file_id):
                 file_info = f
                 break
         
+        # 같은 파일의 대기/진행 중인 인덱싱 작업 취소 (삭제 후 작업이 청크/카탈로그/BM25를 다시 쓰지 않도록)
+        # 저장 단계에 들어간 작업은 취소되지 않으므로 끝날 때까지 기다린 뒤 삭제
+        if file_info:
+            active_job = index_jobs.find_active(file_info.get("filename"))
+            if active_job:
+                logger.info("DELETE", f"Cancelling indexing job: job_id={active_job['id']}")
+                index_jobs.cancel(active_job["id"])
+                job = index_jobs.wait(active_job["id"], timeout=INDEX_CANCEL_TIMEOUT)
+                if job is not None and job["status"] in ACTIVE_STATUSES:
+                    return jsonify({
+                        "error": "Indexing in progress",
+                        "message": f"파일명 '{file_info.get('filename')}'의 인덱싱 작업이 아직 중단되지 않았습니다. 잠시 후 다시 시도하세요.",
+                        "job_id": job["id"]
+                    }), 409
+        
         # 벡터 DB에서 문서 삭제 (원본 파일명으로 검색)
         deleted_chunks = 0
         if file_info:
@@ -303,5 +438,5 @@ if __name__ == "__main__":
     print(f"Starting Private RAG API server...")
     print(f"Ollama URL: {OLLAMA_BASE_URL}")
     print(f"Embedding Device: {EMBEDDING_DEVICE}")
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    app.run(host=SERVER_HOST, port=SERVER_PORT, debug=False)
 
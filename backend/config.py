@@ -15,17 +15,99 @@ for dir_path in [DATA_DIR, MODELS_DIR, UPLOAD_DIR, VECTOR_DB_DIR]:
 # Ollama 설정
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = "llama3.1:8b-instruct-q4_K_M"
+# OLLAMA_MODEL의 토크나이저 로컬 경로 (예: MODELS_DIR / "llama-3.1-tokenizer", 서버 시작 시 로드)
+# 기본값 None: 글자 수로 추정 + Ollama 응답의 실제 토큰 수로 보정
+# (meta-llama/Llama-3.1-8B-Instruct 같은 HF 저장소 이름도 되지만 승인이 필요한 저장소라 오프라인/미인증 환경에서는 로드 실패)
+LLM_TOKENIZER = os.getenv("RAG_LLM_TOKENIZER") or None
+LLM_CONTEXT_LIMIT = 16384    # num_ctx 상한 (KV 캐시 메모리 한도)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # 마지막 요청 후 모델 유지 시간 ("-1m"이면 계속 유지)
+OLLAMA_WARMUP = True          # 서버 시작 시 모델 예열 (모델 로드 + 시스템 프롬프트 prefix 계산)
+OLLAMA_CONNECT_TIMEOUT = 5    # 연결 타임아웃 (초)
+OLLAMA_CLASSIFY_TIMEOUT = 20  # 의도 분류 응답 타임아웃 (초)
+OLLAMA_STREAM_TIMEOUT = 120   # 답변 스트림 토큰 간 최대 대기 (초, 첫 토큰은 모델 로드 + 프롬프트 처리 포함)
+OLLAMA_ENTITY_TIMEOUT = 300   # 엔티티 추출 응답 타임아웃 (초)
+LLM_MAX_CONCURRENT = 2        # Ollama 동시 요청 수 (Ollama의 OLLAMA_NUM_PARALLEL과 맞춤)
+LLM_MAX_QUEUE = 16            # 대기 요청 상한 (초과 시 429)
 
 # 임베딩 설정 (CPU에서 실행)
 EMBEDDING_MODEL = "BAAI/bge-m3"
 EMBEDDING_DEVICE = "cpu"  # CPU로 고정
+# 추론 백엔드: "fp32" (기준) | "int8" (torch 동적 양자화, 인코딩이 빠르고 메모리가 작지만 검색 결과가 약간 달라짐)
+# 저장되는 벡터에 백엔드가 기록되며, 다른 백엔드로 만든 문서가 섞여 있으면 시작 시 경고 (재인덱싱 권장)
+# 비교: python scripts/benchmark_quantization.py
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "fp32")
+EMBEDDING_MAX_SEQ_LENGTH = 2048  # 최대 토큰 수 (bge-m3 기본 8192, 초과분은 잘림 - 인덱싱 로그의 잘림 통계로 조정)
+EMBEDDING_BATCH_TOKENS = 16384   # 배치당 패딩 포함 토큰 상한 (길이 버킷별 배치 크기 = 상한 / 버킷 최대 길이)
+
+# 임베딩 서버 (호스트당 모델 1개, 동시 요청을 모아 배치 인코딩 / 연결할 수 없으면 프로세스 내 모델로 인코딩)
+EMBEDDING_SERVER_ENABLED = True
+EMBEDDING_SERVER_PORT = int(os.getenv("RAG_EMBEDDING_PORT", 5002))
+EMBEDDING_SERVER_URL = os.getenv("RAG_EMBEDDING_URL", f"http://127.0.0.1:{EMBEDDING_SERVER_PORT}")
+EMBEDDING_BATCH_WAIT_MS = 5           # 첫 요청 후 배치를 모으는 최대 시간 (ms)
+EMBEDDING_MAX_BATCH = 32              # 배치 1개의 최대 텍스트 수
+EMBEDDING_SERVER_TIMEOUT = 120        # 요청 응답 타임아웃 (초, 문서 청크 256개 기준)
+EMBEDDING_SERVER_RETRY_INTERVAL = 30  # 서버 오류 후 프로세스 내 모델을 쓰는 시간 (초)
+
+# 문서 청크 임베딩 캐시 (청크 텍스트 해시 기준 - 재업로드/재인덱싱/여러 문서에 반복되는 페이지는 다시 인코딩하지 않음)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = DATA_DIR / "embedding_cache.sqlite3"
+EMBEDDING_CACHE_MAX_ENTRIES = 1_000_000  # 최대 항목 수 (float16 1024차원 기준 약 2GB, 초과 시 오래 사용하지 않은 항목부터 삭제)
+
+# 질의 임베딩 캐시 (반복 질문의 인코딩 생략)
+QUERY_EMBEDDING_CACHE_SIZE = 2048  # 최대 캐시 항목 수 (LRU)
+QUERY_EMBEDDING_CACHE_PATH = DATA_DIR / "query_embedding_cache.pkl"  # None이면 디스크에 저장하지 않음
+
+# 질의 의도 분류 (규칙 기반 → 임베딩 분류기 → 신뢰도가 낮을 때만 LLM)
+INTENT_SEED_PATH = Path(__file__).parent / "core" / "intent_seeds.json"  # 학습용 시드 질문 (저장소에 포함)
+INTENT_MODEL_PATH = DATA_DIR / "intent_classifier.npz"  # 학습된 가중치 (시드 변경 시 재학습)
+INTENT_CONFIDENCE_THRESHOLD = 0.75  # 이 값 미만이면 LLM으로 분류
+
+# 검색 전 단계 병렬화 (의도 분류/메타데이터 감지와 동시에 질의 임베딩 + 필터 없는 검색을 미리 실행)
+QUERY_PREFETCH_ENABLED = True
+QUERY_PREFETCH_WORKERS = 4  # 미리 실행 작업 스레드 수 (동시 질의 수 기준)
+
+# 의미 기반 답변 캐시 (같은/유사한 질문의 LLM 호출 생략, 문서 변경 시 영향받는 항목만 제거)
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_SIZE = 512          # 최대 캐시 항목 수 (LRU)
+ANSWER_CACHE_SIMILARITY = 0.97   # 캐시 적중으로 볼 질의 임베딩 코사인 유사도 하한
 
 # ChromaDB 설정
 CHROMA_COLLECTION_NAME = "enterprise_documents"
 CHROMA_PERSIST_DIR = str(VECTOR_DB_DIR)
 
+# 문서 메타데이터 카탈로그 (벡터 DB 전체 스캔 대체, chroma_db 옆에 저장)
+CATALOG_PATH = DATA_DIR / "document_catalog.json"
+
+# 문서 파싱 결과 캐시 (파일 내용 해시 기준, PDF는 페이지 단위 - 재인덱싱 시 OCR/표 감지 생략)
+# 관리: python scripts/parse_cache.py stats | list | purge
+PARSE_CACHE_ENABLED = True
+PARSE_CACHE_DIR = DATA_DIR / "parse_cache"
+PARSE_CACHE_MAX_MB = 2048  # 초과 시 오래 사용하지 않은 항목부터 삭제 (LRU)
+
+# BM25 역색인 (하이브리드 검색용, 서버 재시작 시 재구성하지 않도록 저장)
+BM25_INDEX_PATH = DATA_DIR / "bm25_index.pkl"
+
+# 인덱스 세대 번호 (멀티 프로세스 서버에서 writer가 인덱스를 바꾸면 reader가 다시 로드)
+INDEX_GENERATION_PATH = DATA_DIR / "index_generation"
+
+# 프로덕션 서버 (serve.py: 마스터가 모델을 로드한 뒤 워커를 fork, 모델 가중치는 copy-on-write로 공유)
+SERVER_HOST = "0.0.0.0"
+SERVER_PORT = int(os.getenv("PORT", 5000))
+SERVER_WORKERS = int(os.getenv("RAG_WORKERS", 2))  # 질의 처리 reader 워커 수 (writer 워커 1개는 별도)
+SERVER_WRITER_PORT = 5001        # writer 워커 내부 포트 (127.0.0.1, 업로드/삭제/작업 조회를 reader가 전달)
+SERVER_GRACEFUL_TIMEOUT = 30     # 종료/재시작 시 진행 중 요청을 기다리는 최대 시간 (초)
+SERVER_TORCH_THREADS = None      # 워커당 torch 스레드 수 (None이면 CPU 코어 수 / 워커 수)
+# 주의: LLM_MAX_CONCURRENT / LLM_MAX_QUEUE는 워커 프로세스마다 적용됨
+
 # 파일 업로드 설정
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+INDEX_WORKERS = 2  # 동시에 실행할 인덱싱 작업 수 (파싱/OCR/임베딩이 CPU를 많이 사용)
+# PDF 페이지 병렬 처리 프로세스 수 (렌더링/OpenCV/EasyOCR, 인덱싱 작업들이 공유, 1이면 순차 처리)
+# 기본: 코어 수의 절반 (나머지는 질의 처리/임베딩 몫), 워커마다 EasyOCR 모델을 따로 로드함 (메모리 주의)
+PDF_PAGE_WORKERS = int(os.getenv("RAG_PDF_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+PDF_PAGE_WORKER_NICE = 10  # 페이지 워커 우선순위 낮춤 (질의 처리가 CPU를 먼저 사용)
+INDEX_JOBS_PATH = DATA_DIR / "index_jobs.json"  # 인덱싱 작업 목록 (재시작 시 미완료 작업 재개)
+INDEX_CANCEL_TIMEOUT = 60  # 파일 삭제 시 같은 파일의 인덱싱 작업이 취소되어 멈출 때까지 기다리는 최대 시간 (초)
 ALLOWED_EXTENSIONS = {
     # 문서 형식
     ".pdf", ".docx", ".txt", ".md", ".xlsx", ".xls",
@@ -42,19 +124,36 @@ CHUNK_OVERLAP = 200
 MAX_CHUNKS_PER_FILE = 15     # 파일당 최대 유지 청크 수
 MIN_CONTEXT_COUNT = 15       # LLM에 전달할 최소 컨텍스트 수
 MAX_CONTEXT_COUNT = 30       # LLM에 전달할 최대 컨텍스트 수
+CONTEXT_TOKEN_BUDGET = 8000   # LLM 프롬프트의 컨텍스트(청크) 토큰 예산
+CONTEXT_MMR_LAMBDA = 0.7     # MMR 관련도 가중치 (1에 가까울수록 관련도 우선, 작을수록 다양성 우선)
+CONTEXT_DUPLICATE_THRESHOLD = 0.95  # 선택된 청크와 임베딩 유사도가 이 값 이상이면 중복으로 제외
 
 # 하이브리드 검색 설정
 # [실험적] 고유명사(이름 등) 검색 정확도 향상을 위해 BM25 비중 상향
 VECTOR_WEIGHT = 0.4  # 벡터(의미) 검색 가중치
 BM25_WEIGHT = 0.6    # BM25(키워드) 검색 가중치
+BM25_TOP_K = 100     # BM25 후보 수 (벡터 검색 결과 수와 별개로 키워드 매칭 확보)
+HYBRID_FUSION_METHOD = "weighted"  # "weighted" (정규화 가중합) 또는 "rrf" (Reciprocal Rank Fusion)
+
+# bge-m3 lexical(sparse) 가중치 검색 (임베딩과 같은 forward에서 토큰별 가중치를 계산해 역색인에 저장)
+# 켜면 기존 청크는 시작 시 한 번 다시 인코딩하여 역색인 생성 (writer 프로세스)
+LEXICAL_ENABLED = os.getenv("RAG_LEXICAL_ENABLED", "0") == "1"
+LEXICAL_INDEX_PATH = DATA_DIR / "lexical_index.pkl"
+LEXICAL_WEIGHT = 0.3  # lexical 가중치 검색 융합 가중치
+LEXICAL_TOP_K = 100   # lexical 후보 수
 
 # 재순위화 설정
 RERANK_TOP_K = 25    # 재순위화 후 LLM에 전달할 최대 청크 수 (상향)
 RERANK_ENABLED = True  # 재순위화 활성화 여부
+RERANK_MODEL = "BAAI/bge-reranker-v2-m3"  # Cross-Encoder 모델 (다국어, CPU에서 실행)
+RERANK_BATCH_SIZE = 16              # 한 번에 점수화할 질의-청크 쌍 수
+RERANK_MAX_LENGTH = 512             # 질의+청크 최대 토큰 길이 (초과분은 잘림)
+RERANK_LATENCY_BUDGET_MS = 1500     # 재순위화 지연 시간 예산 (초과 예상 시 남은 배치 생략)
 
 # Semantic Metadata Tagging (엔티티 추출) 설정
 ENTITY_EXTRACTION_ENABLED = True  # 인덱싱 시 LLM 기반 엔티티 추출 활성화
 ENTITY_EXTRACTION_BATCH_SIZE = 5  # 한 번에 처리할 청크 수 (메모리/속도 최적화)
+ENTITY_QUEUE_PATH = DATA_DIR / "entity_queue.json"  # 미완료 엔티티 추출 배치 (재시작 시 이어서 처리)
 ENTITY_TYPES = [
     "person",       # 인물명 (예: 홍길동, 김철수)
     "organization", # 조직명 (예: 삼성전자, 현대자동차)
@@ -0,0 +1,155 @@
+"""
+의미 기반 답변 캐시
+
+말뭉치가 바뀌지 않았다면 같은(또는 거의 같은) 질문에는 같은 답변이 나오므로,
+Ollama 호출 결과를 질의 임베딩과 검색 범위로 캐시합니다.
+
+- 조회: 같은 검색 범위(scope)의 항목 중 질의 임베딩 코사인 유사도가
+  ANSWER_CACHE_SIMILARITY 이상인 가장 가까운 항목
+- 검색 범위: 질의에서 해석된 필터 조건 + 답변에 영향을 주는 기타 값
+    {"_mode": "detail", "filename": "..."} / {"_mode": "detail", "date": "250211", "doc_type": "재직증명서"} / ...
+  "_"로 시작하는 키는 캐시 키에만 쓰이고 문서 추가 시 필터 조건 비교에서는 제외
+  (예: 프롬프트에 들어가는 문서 유형별 개수 → 개수가 바뀌면 키가 달라져 자연히 적중하지 않음)
+- 항목마다 답변에 사용된 청크의 file_id를 기록하여 문서 변경 시 해당 항목만 제거
+    - 문서 삭제/재인덱싱: 그 문서를 사용한 항목 제거
+    - 문서 추가: 그 문서가 검색 범위에 들어가는 항목 제거 (필터 없는 질의 포함)
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """질의 임베딩 유사도 기반 답변 캐시 (LRU, 스레드 안전)"""
+
+    def __init__(self, max_size: int = 512, similarity_threshold: float = 0.97):
+        self.max_size = max(1, max_size)
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # 문서 변경 횟수 (답변 생성 중 문서가 바뀌면 그 답변은 저장하지 않음)
+        self.generation = 0
+
+    @staticmethod
+    def _scope_key(scope: Dict) -> tuple:
+        return tuple(sorted((k, str(v)) for k, v in scope.items() if v is not None))
+
+    def lookup(self, query_embedding: List[float], scope: Dict) -> Optional[Dict]:
+        """캐시된 답변 조회
+
+        Returns:
+            {"answer", "sources", "has_answer", "similarity"} 또는 None
+        """
+        scope_key = self._scope_key(scope)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        with self._lock:
+            candidates = [(entry_id, entry) for entry_id, entry in self._entries.items()
+                          if entry["scope_key"] == scope_key]
+            if candidates:
+                # 임베딩은 정규화되어 있으므로 내적 = 코사인 유사도
+                similarities = np.stack([entry["embedding"] for _, entry in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return {
+                        "answer": entry["answer"],
+                        "sources": entry["sources"],
+                        "has_answer": entry["has_answer"],
+                        "similarity": float(similarities[best]),
+                    }
+            self.misses += 1
+        return None
+
+    def put(self, query_embedding: List[float], scope: Dict, answer: str, sources: List[Dict],
+            has_answer: bool, file_ids: Iterable[str], generation: Optional[int] = None):
+        """답변 저장
+
+        Args:
+            generation: 답변 생성 시작 시점의 self.generation (그 사이 문서가 바뀌었으면 저장 안 함)
+        """
+        entry = {
+            "embedding": np.asarray(query_embedding, dtype=np.float32),
+            "scope": {k: v for k, v in scope.items() if v is not None},
+            "scope_key": self._scope_key(scope),
+            "answer": answer,
+            "sources": sources,
+            "has_answer": has_answer,
+            "file_ids": set(file_ids),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # ==================== 무효화 ====================
+
+    def _evict(self, predicate) -> int:
+        """self._lock 보유 상태에서 호출"""
+        self.generation += 1
+        stale = [entry_id for entry_id, entry in self._entries.items() if predicate(entry)]
+        for entry_id in stale:
+            del self._entries[entry_id]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_files(self, file_ids: Iterable[str]) -> int:
+        """삭제된 문서를 사용한 항목 제거"""
+        file_ids = set(file_ids)
+        if not file_ids:
+            return 0
+        with self._lock:
+            removed = self._evict(lambda entry: not entry["file_ids"].isdisjoint(file_ids))
+        if removed:
+            print(f"[AnswerCache] 문서 삭제로 캐시 항목 {removed}개 제거")
+        return removed
+
+    def invalidate_document(self, file_id: str, doc_metadata: Dict) -> int:
+        """추가/재인덱싱된 문서의 영향을 받는 항목 제거
+
+        Args:
+            doc_metadata: 문서 메타데이터 (filename, date, doc_type)
+        """
+        def affected(entry):
+            if file_id in entry["file_ids"]:
+                return True
+            # 검색 범위의 모든 필터 조건을 만족하면 새 문서가 검색될 수 있음
+            return all(str(doc_metadata.get(k)) == str(v)
+                       for k, v in entry["scope"].items() if not k.startswith("_"))
+
+        with self._lock:
+            removed = self._evict(affected)
+        if removed:
+            print(f"[AnswerCache] 문서 인덱싱으로 캐시 항목 {removed}개 제거")
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+                "similarity_threshold": self.similarity_threshold,
+            }
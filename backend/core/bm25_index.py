@@ -0,0 +1,349 @@
+"""
+BM25 희소(키워드) 인덱스 - 하이브리드 검색용
+
+청크 텍스트에 대한 역색인(term -> doc/tf 배열)을 프로세스 내에서 유지합니다.
+- index_document / delete_document*에서 증분 갱신
+- 디스크에 저장하여 서버 재시작 시 재구성하지 않음
+- posting은 array('i') / array('H')로 압축 저장하고, 검색 시 numpy로
+  복사 없이 감싸서 벡터 연산으로 점수 계산 (10만 청크 이상에서도 수 ms 내 검색)
+- 삭제는 청크 슬롯을 비활성화(tombstone)만 하고, 비활성 비율이
+  COMPACT_RATIO를 넘으면 posting을 한 번에 정리
+
+토큰화 (한국어 고유명사/숫자 검색 대응):
+    "홍길동에게 1,000만원" -> ["홍길동에게", "홍길", "길동", "동에", "에게",
+                               "1000만원", "1000", "만원"]
+    - 숫자의 천 단위 구분 쉼표 제거 (1,000 -> 1000)
+    - 한글 연속 구간은 2-gram으로 분해하여 조사가 붙어도 매칭
+"""
+import os
+import pickle
+import re
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+_NUMBER_COMMA_RE = re.compile(r'(?<=\d),(?=\d{3})')
+_TOKEN_RE = re.compile(r'[0-9A-Za-z가-힣]+')
+_RUN_RE = re.compile(r'[0-9]+|[A-Za-z]+|[가-힣]+')
+_HANGUL_RE = re.compile(r'^[가-힣]+$')
+
+_TF_MAX = 65535  # array('H') 상한
+
+
+def tokenize(text: str) -> List[str]:
+    """BM25용 토큰화 (전체 토큰 + 문자 종류별 구간 + 한글 2-gram)"""
+    if not text:
+        return []
+    text = _NUMBER_COMMA_RE.sub('', text.lower())
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        tokens.append(token)
+        runs = _RUN_RE.findall(token)
+        for run in runs:
+            if len(runs) > 1:
+                tokens.append(run)
+            if len(run) > 2 and _HANGUL_RE.match(run):
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class BM25Index:
+    """증분 갱신 가능한 BM25 역색인"""
+
+    VERSION = 2
+
+    # 비활성(삭제된) 슬롯 비율이 이 값을 넘으면 posting 정리
+    COMPACT_RATIO = 0.3
+
+    def __init__(self, index_path: Path, k1: float = 1.5, b: float = 0.75):
+        self.index_path = Path(index_path)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()  # 저장 순서 보장 (같은 임시 파일에 동시에 쓰지 않음)
+        self._reset_state()
+        self.loaded = self._load()
+
+    def _reset_state(self):
+        self._postings: Dict[str, Tuple[array, array]] = {}  # term -> (doc 배열, tf 배열)
+        self._chunk_ids: List[Optional[str]] = []             # doc -> chunk_id (삭제 시 None)
+        self._doc_file: List[Optional[str]] = []              # doc -> file_id
+        self._doc_len = array('f')                            # doc -> 토큰 수 (삭제 시 0)
+        self._alive = np.zeros(0, dtype=bool)                 # doc -> 활성 여부
+        self._doc_lookup: Dict[str, int] = {}                 # chunk_id -> doc
+        self._file_docs: Dict[str, Set[int]] = {}             # file_id -> {doc}
+        self._total_len = 0
+
+    # ==================== 영속화 ====================
+
+    def _load(self) -> bool:
+        if not self.index_path.exists():
+            return False
+        try:
+            with open(self.index_path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get("version") != self.VERSION:
+                return False
+            with self._lock:
+                self._postings = state["postings"]
+                self._chunk_ids = state["chunk_ids"]
+                self._doc_file = state["doc_file"]
+                self._doc_len = state["doc_len"]
+                self._rebuild_lookups()
+            print(f"[BM25] 인덱스 로드 완료: 청크 {len(self)}개, 용어 {len(self._postings)}개")
+            return True
+        except Exception as e:
+            print(f"[BM25] 인덱스 로드 오류: {e}")
+            with self._lock:
+                self._reset_state()
+            return False
+
+    def _rebuild_lookups(self):
+        """저장 대상이 아닌 보조 인덱스를 chunk_ids / doc_file에서 재구성"""
+        self._alive = np.fromiter((cid is not None for cid in self._chunk_ids),
+                                  dtype=bool, count=len(self._chunk_ids))
+        self._doc_lookup = {cid: doc for doc, cid in enumerate(self._chunk_ids) if cid is not None}
+        self._file_docs = {}
+        for doc, file_id in enumerate(self._doc_file):
+            if self._chunk_ids[doc] is not None:
+                self._file_docs.setdefault(file_id, set()).add(doc)
+        self._total_len = int(sum(self._doc_len))
+
+    def save(self):
+        """인덱스 저장 (임시 파일에 쓰고 교체)
+
+        _lock 안에서는 상태를 복사만 하고, 직렬화/파일 쓰기는 락 밖에서 수행 (저장 중에도 검색/갱신 가능)
+        """
+        with self._save_lock:
+            with self._lock:
+                if len(self._chunk_ids) and (len(self._chunk_ids) - len(self._doc_lookup)) > self.COMPACT_RATIO * len(self._chunk_ids):
+                    self._compact()
+                # posting 배열/리스트는 갱신 시 제자리에서 바뀌므로 복사
+                state = {
+                    "version": self.VERSION,
+                    "postings": {term: (docs[:], values[:]) for term, (docs, values) in self._postings.items()},
+                    "chunk_ids": list(self._chunk_ids),
+                    "doc_file": list(self._doc_file),
+                    "doc_len": self._doc_len[:],
+                }
+            tmp_path = self.index_path.with_suffix(self.index_path.suffix + ".tmp")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.index_path)
+            except Exception as e:
+                print(f"[BM25] 인덱스 저장 오류: {e}")
+
+    def _compact(self):
+        """비활성 슬롯을 제거하고 doc 번호를 다시 매김"""
+        alive_docs = np.nonzero(self._alive)[0]
+        remap = np.full(len(self._chunk_ids), -1, dtype=np.int32)
+        remap[alive_docs] = np.arange(len(alive_docs), dtype=np.int32)
+
+        postings = {}
+        for term, (docs, tfs) in self._postings.items():
+            doc_arr = np.frombuffer(docs, dtype=np.int32)
+            keep = self._alive[doc_arr]
+            if not keep.any():
+                continue
+            postings[term] = (array('i', remap[doc_arr[keep]].tobytes()),
+                              array('H', np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()))
+        self._postings = postings
+        self._chunk_ids = [self._chunk_ids[doc] for doc in alive_docs]
+        self._doc_file = [self._doc_file[doc] for doc in alive_docs]
+        self._doc_len = array('f', np.frombuffer(self._doc_len, dtype=np.float32)[alive_docs].tobytes())
+        self._rebuild_lookups()
+
+    # ==================== 갱신 ====================
+
+    def __len__(self) -> int:
+        return len(self._doc_lookup)
+
+    def add_chunks(self, file_id: str, chunk_ids: List[str], texts: List[str]):
+        """청크 추가 (같은 chunk_id가 있으면 교체)"""
+        with self._lock:
+            start = len(self._chunk_ids)
+            for chunk_id, text in zip(chunk_ids, texts):
+                if chunk_id in self._doc_lookup:
+                    self._remove_doc(self._doc_lookup[chunk_id])
+
+                term_freqs: Dict[str, int] = {}
+                for term in tokenize(text):
+                    term_freqs[term] = term_freqs.get(term, 0) + 1
+
+                doc = len(self._chunk_ids)
+                self._chunk_ids.append(chunk_id)
+                self._doc_file.append(file_id)
+                length = sum(term_freqs.values())
+                self._doc_len.append(length)
+                self._total_len += length
+                self._doc_lookup[chunk_id] = doc
+                self._file_docs.setdefault(file_id, set()).add(doc)
+
+                for term, tf in term_freqs.items():
+                    posting = self._postings.get(term)
+                    if posting is None:
+                        posting = self._postings[term] = (array('i'), array('H'))
+                    posting[0].append(doc)
+                    posting[1].append(min(tf, _TF_MAX))
+
+            added = len(self._chunk_ids) - start
+            if added:
+                self._alive = np.concatenate([self._alive, np.ones(added, dtype=bool)])
+
+    def _remove_doc(self, doc: int):
+        chunk_id = self._chunk_ids[doc]
+        file_id = self._doc_file[doc]
+        self._doc_lookup.pop(chunk_id, None)
+        docs = self._file_docs.get(file_id)
+        if docs is not None:
+            docs.discard(doc)
+            if not docs:
+                del self._file_docs[file_id]
+
+        self._total_len -= int(self._doc_len[doc])
+        self._doc_len[doc] = 0
+        self._chunk_ids[doc] = None
+        self._alive[doc] = False
+
+    def remove_file(self, file_id: str) -> int:
+        """file_id에 속한 모든 청크 제거"""
+        with self._lock:
+            docs = list(self._file_docs.get(file_id, ()))
+            for doc in docs:
+                self._remove_doc(doc)
+            return len(docs)
+
+    def remove_chunks(self, chunk_ids: Iterable[str]) -> int:
+        """chunk_id 목록으로 청크 제거"""
+        removed = 0
+        with self._lock:
+            for chunk_id in chunk_ids:
+                doc = self._doc_lookup.get(chunk_id)
+                if doc is not None:
+                    self._remove_doc(doc)
+                    removed += 1
+        return removed
+
+    def rebuild_from_collection(self, collection, page_size: int = 2000):
+        """벡터 DB에 저장된 청크 텍스트로 인덱스 재구성"""
+        print(f"[BM25] 벡터 DB에서 BM25 인덱스 재구성 중...")
+        with self._lock:
+            self._reset_state()
+            offset = 0
+            while True:
+                batch = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                ids = batch.get("ids") or []
+                if not ids:
+                    break
+                by_file: Dict[str, Tuple[List[str], List[str]]] = {}
+                for chunk_id, text, metadata in zip(ids, batch["documents"], batch["metadatas"]):
+                    file_id = (metadata or {}).get("file_id", "")
+                    group = by_file.setdefault(file_id, ([], []))
+                    group[0].append(chunk_id)
+                    group[1].append(text or "")
+                for file_id, (chunk_ids, texts) in by_file.items():
+                    self.add_chunks(file_id, chunk_ids, texts)
+                if len(ids) < page_size:
+                    break
+                offset += page_size
+        self.save()
+        print(f"[BM25] 인덱스 재구성 완료: 청크 {len(self)}개, 용어 {len(self._postings)}개")
+
+    # ==================== 검색 ====================
+
+    def search(self, query_text: str, top_k: int, file_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """BM25 검색
+
+        Args:
+            query_text: 질의 텍스트
+            top_k: 반환할 최대 결과 수
+            file_ids: 지정 시 해당 file_id의 청크만 검색 (메타데이터 필터 대응)
+
+        Returns:
+            [(chunk_id, score), ...] 점수 내림차순
+        """
+        terms = set(tokenize(query_text))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = len(self._doc_lookup)
+            if n_docs == 0:
+                return []
+            avgdl = self._total_len / n_docs
+
+            alive = self._alive
+            if file_ids is not None:
+                allowed_docs = [doc for fid in file_ids for doc in self._file_docs.get(fid, ())]
+                if not allowed_docs:
+                    return []
+                alive = np.zeros(len(self._chunk_ids), dtype=bool)
+                alive[allowed_docs] = True
+
+            doc_len = np.frombuffer(self._doc_len, dtype=np.float32)
+            scores = np.zeros(len(self._chunk_ids), dtype=np.float32)
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                docs = np.frombuffer(posting[0], dtype=np.int32)
+                live = self._alive[docs]
+                df = int(np.count_nonzero(live))
+                if df == 0:
+                    continue
+                tfs = np.frombuffer(posting[1], dtype=np.uint16).astype(np.float32)
+                idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * doc_len[docs] / avgdl)
+                scores[docs] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+            scores[~alive] = 0.0
+            candidates = np.flatnonzero(scores)
+            if len(candidates) == 0:
+                return []
+            if len(candidates) > top_k:
+                part = np.argpartition(scores[candidates], -top_k)[-top_k:]
+                candidates = candidates[part]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._chunk_ids[doc], float(scores[doc])) for doc in ranked]
+
+
+def fuse_rankings(dense: List[Tuple[str, float]], sparse: List[Tuple[str, float]],
+                  vector_weight: float, bm25_weight: float,
+                  method: str = "weighted", rrf_k: int = 60,
+                  lexical: Optional[List[Tuple[str, float]]] = None,
+                  lexical_weight: float = 0.0) -> List[Tuple[str, float]]:
+    """벡터 검색 결과와 BM25 결과(+ lexical 가중치 검색 결과)를 융합
+
+    Args:
+        dense: [(chunk_id, 유사도)] (유사도 = 1 - cosine distance)
+        sparse: [(chunk_id, BM25 점수)]
+        method: "weighted" (min-max 정규화 후 가중합) 또는 "rrf" (Reciprocal Rank Fusion)
+        lexical: [(chunk_id, lexical 점수)] (LexicalIndex.search 결과, 없으면 생략)
+
+    Returns:
+        [(chunk_id, 융합 점수)] 점수 내림차순
+    """
+    fused: Dict[str, float] = {}
+    rankings = ((vector_weight, dense), (bm25_weight, sparse), (lexical_weight, lexical or []))
+
+    if method == "rrf":
+        for weight, ranking in rankings:
+            for rank, (chunk_id, _) in enumerate(ranking):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + weight / (rrf_k + rank + 1)
+    else:
+        for weight, ranking in rankings:
+            if not ranking:
+                continue
+            values = [score for _, score in ranking]
+            low, high = min(values), max(values)
+            span = high - low
+            for chunk_id, score in ranking:
+                normalized = (score - low) / span if span > 0 else 1.0
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + weight * normalized
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
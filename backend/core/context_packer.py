@@ -0,0 +1,182 @@
+"""
+토큰 예산 기반 컨텍스트 구성
+
+LLM 프롬프트에 넣을 청크를 토큰 수 기준으로 채우고, Ollama num_ctx를 프롬프트 크기에 맞춥니다.
+
+- 토큰 수: 대상 모델 토크나이저(LLM_TOKENIZER, transformers)로 계산 (서버 시작 시 로드)
+  설정하지 않았거나 로드할 수 없으면(오프라인 등) 글자 수 기반 추정값을 쓰고,
+  Ollama 응답의 prompt_eval_count로 글자당 토큰 비율을 보정
+- 청크는 관련도 순서로 CONTEXT_TOKEN_BUDGET까지 채우고, 넘치는 청크는 제외
+- "[문서 정보]" 헤더는 청크마다가 아니라 파일마다 한 번만 출력
+    [문서 정보]
+    - 파일명: ...
+    - 날짜: ... / 문서 유형: ... / 문서 제목: ...
+
+    [페이지 1]
+    ...
+- num_ctx = 프롬프트 토큰 수 + 생성 토큰 수(num_predict), 256 단위 올림, LLM_CONTEXT_LIMIT 이하
+"""
+import threading
+from typing import Dict, List, Optional
+
+# 채팅 템플릿(역할 태그 등)에 추가되는 토큰 여유분
+CHAT_TEMPLATE_OVERHEAD = 32
+
+
+class TokenCounter:
+    """대상 LLM 토크나이저 기반 토큰 수 계산 (로드 실패 시 보정된 추정값)"""
+
+    # 추정 시 초기 글자당 토큰 수 (한국어 + 숫자/기호 혼합 문서 기준)
+    DEFAULT_TOKENS_PER_CHAR = 0.8
+
+    def __init__(self, tokenizer_name: Optional[str]):
+        self.tokenizer_name = tokenizer_name
+        self._tokenizer = None
+        self._load_attempted = False
+        self._lock = threading.Lock()
+        self.tokens_per_char = self.DEFAULT_TOKENS_PER_CHAR
+
+    def _get_tokenizer(self):
+        if self._load_attempted:
+            return self._tokenizer
+        with self._lock:
+            if not self._load_attempted:
+                if self.tokenizer_name:
+                    try:
+                        from transformers import AutoTokenizer
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+                        print(f"[Packer] 토크나이저 로드: {self.tokenizer_name}")
+                    except Exception as e:
+                        print(f"⚠️ 토크나이저 로드 실패, 글자 수 기반 추정 사용: {e}")
+                else:
+                    print("[Packer] LLM_TOKENIZER 미설정: 글자 수 기반 토큰 추정 사용 (Ollama 응답으로 보정)")
+                self._load_attempted = True
+        return self._tokenizer
+
+    def load(self) -> bool:
+        """토크나이저 로드 (서버 시작 시 호출 - 첫 질의에서 로드하지 않도록), 정확한 토큰 수 사용 가능 여부 반환"""
+        return self._get_tokenizer() is not None
+
+    @property
+    def exact(self) -> bool:
+        return self._get_tokenizer() is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        tokenizer = self._get_tokenizer()
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        return int(len(text) * self.tokens_per_char) + 1
+
+    def calibrate(self, prompt_chars: int, actual_tokens: Optional[int]):
+        """실제 프롬프트 토큰 수로 추정 비율 보정 (토크나이저가 없을 때만)"""
+        if not actual_tokens or prompt_chars <= 0 or self._tokenizer is not None:
+            return
+        observed = actual_tokens / prompt_chars
+        # 지수 이동 평균 (질의마다 조금씩 반영)
+        self.tokens_per_char = 0.8 * self.tokens_per_char + 0.2 * observed
+
+
+def _file_header(metadata: Dict) -> str:
+    header = "[문서 정보]\n"
+    header += f"- 파일명: {metadata.get('filename', '알 수 없음')}\n"
+    if metadata.get("date"):
+        header += f"- 날짜: {metadata['date']}\n"
+    if metadata.get("doc_type"):
+        header += f"- 문서 유형: {metadata['doc_type']}\n"
+    if metadata.get("doc_title"):
+        header += f"- 문서 제목: {metadata['doc_title']}\n"
+    return header
+
+
+def _chunk_block(metadata: Dict, text: str) -> str:
+    return f"\n[페이지 {metadata.get('page', '알 수 없음')}]\n{text}\n"
+
+
+def _page_sort_key(metadata: Dict):
+    page = metadata.get("page", 0)
+    return int(page) if str(page).isdigit() else 0
+
+
+def pack_context(chunks: List[Dict], budget_tokens: int, counter: TokenCounter) -> Dict:
+    """관련도 순서의 청크를 토큰 예산까지 채워 컨텍스트 문자열 구성
+
+    Args:
+        chunks: [{"doc_text": str, "metadata": {...}}, ...] (관련도 내림차순)
+        budget_tokens: 컨텍스트에 쓸 최대 토큰 수
+
+    Returns:
+        {
+            "context_text": str,        # 파일명 → 페이지 순으로 정렬된 컨텍스트
+            "chunks": [...],            # 포함된 청크 (출력 순서)
+            "tokens": int,              # 컨텍스트 토큰 수
+            "dropped": int,             # 예산 초과로 제외된 청크 수
+            "dropped_tokens": int       # 제외된 청크의 토큰 수
+        }
+    """
+    packed = []
+    files = {}  # filename -> 헤더 토큰 수
+    used = 0
+    dropped = 0
+    dropped_tokens = 0
+    separator_tokens = counter.count("\n\n---\n\n")
+
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        filename = metadata.get("filename", "알 수 없음")
+        chunk_tokens = counter.count(_chunk_block(metadata, chunk["doc_text"]))
+        header_tokens = 0
+        if filename not in files:
+            header_tokens = counter.count(_file_header(metadata)) + separator_tokens
+        cost = chunk_tokens + header_tokens
+
+        if used + cost > budget_tokens:
+            if packed:
+                dropped += 1
+                dropped_tokens += chunk_tokens
+                continue
+            # 첫 청크만으로 예산을 넘으면 예산에 맞게 잘라서라도 포함
+            keep_ratio = max(0.0, (budget_tokens - header_tokens) / max(chunk_tokens, 1))
+            text = chunk["doc_text"][:int(len(chunk["doc_text"]) * keep_ratio)]
+            if not text:
+                # 파일 헤더만으로 예산이 차면 빈 청크를 넣지 않고 제외
+                dropped += 1
+                dropped_tokens += chunk_tokens
+                continue
+            dropped_tokens += chunk_tokens
+            chunk = dict(chunk, doc_text=text)
+            chunk_tokens = counter.count(_chunk_block(metadata, text))
+            dropped_tokens -= chunk_tokens
+            cost = chunk_tokens + header_tokens
+
+        if filename not in files:
+            files[filename] = header_tokens
+        packed.append(chunk)
+        used += cost
+
+    # 출력: 파일명 → 페이지 순
+    packed.sort(key=lambda c: (c["metadata"].get("filename") or "", _page_sort_key(c["metadata"])))
+    sections = []
+    current_file = None
+    for chunk in packed:
+        metadata = chunk["metadata"]
+        filename = metadata.get("filename", "알 수 없음")
+        if filename != current_file:
+            sections.append(_file_header(metadata))
+            current_file = filename
+        sections[-1] += _chunk_block(metadata, chunk["doc_text"])
+
+    return {
+        "context_text": "\n\n---\n\n".join(sections),
+        "chunks": packed,
+        "tokens": used,
+        "dropped": dropped,
+        "dropped_tokens": dropped_tokens,
+    }
+
+
+def num_ctx_for(prompt_tokens: int, num_predict: int, limit: int) -> int:
+    """프롬프트 + 생성 토큰을 담을 num_ctx (256 단위 올림, limit 이하)"""
+    needed = prompt_tokens + num_predict + CHAT_TEMPLATE_OVERHEAD
+    return min(limit, ((needed + 255) // 256) * 256)
@@ -0,0 +1,81 @@
+"""
+MMR(Maximal Marginal Relevance) 기반 컨텍스트 선택
+
+검색/재순위화된 후보 청크에서 LLM에 전달할 청크를 고릅니다.
+
+- 후보 임베딩(정규화)으로 유사도 행렬을 한 번 계산하고,
+  선택할 때마다 "이미 선택된 청크와의 최대 유사도" 벡터만 갱신 (O(k·n), numpy 벡터 연산)
+- 점수: MMR_LAMBDA · 관련도 − (1 − MMR_LAMBDA) · 선택된 청크와의 최대 유사도
+- 선택된 청크와 유사도가 중복 기준 이상인 후보는 제외 (거의 같은 내용의 청크)
+- 파일당 최대 청크 수(MAX_CHUNKS_PER_FILE), 최대 개수(MAX_CONTEXT_COUNT) 적용
+  최소 개수(MIN_CONTEXT_COUNT)에 못 미치면 파일당 제한만 풀어서 채움 (중복 제외는 유지)
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def select_mmr(embeddings: Sequence[Sequence[float]], relevance: Sequence[float], file_keys: Sequence,
+               max_count: int, min_count: int = 0, per_file_cap: Optional[int] = None,
+               mmr_lambda: float = 0.7, duplicate_threshold: float = 0.95) -> List[int]:
+    """MMR로 후보 인덱스 선택
+
+    Args:
+        embeddings: 후보 임베딩 (n × d, 정규화)
+        relevance: 후보 관련도 (클수록 관련, 0~1 범위 권장)
+        file_keys: 후보별 파일 식별자 (파일당 제한용)
+        max_count: 최대 선택 개수
+        min_count: 파일당 제한 때문에 이 개수에 못 미치면 제한을 풀어서 채움
+        per_file_cap: 파일당 최대 선택 개수 (None이면 제한 없음)
+
+    Returns:
+        선택 순서대로의 후보 인덱스
+    """
+    n = len(relevance)
+    if n == 0 or max_count <= 0:
+        return []
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    _, file_index = np.unique(np.asarray([str(key) for key in file_keys]), return_inverse=True)
+    file_counts = np.zeros(file_index.max() + 1, dtype=np.int32)
+
+    max_similarity = np.zeros(n, dtype=np.float32)   # 선택된 청크와의 최대 유사도
+    available = np.ones(n, dtype=bool)               # 선택/중복 제외되지 않은 후보
+    capped = np.zeros(n, dtype=bool)                 # 파일당 제한에 걸린 후보
+    selected: List[int] = []
+
+    def pick(candidates: np.ndarray) -> Optional[int]:
+        if not candidates.any():
+            return None
+        scores = mmr_lambda * relevance - (1.0 - mmr_lambda) * max_similarity
+        return int(np.argmax(np.where(candidates, scores, -np.inf)))
+
+    while len(selected) < max_count:
+        best = pick(available & ~capped)
+        if best is None:
+            # 파일당 제한만 남은 경우 최소 개수까지만 제한을 풀어서 채움
+            if len(selected) >= min_count:
+                break
+            best = pick(available)
+            if best is None:
+                break
+
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+        # 선택된 청크와 거의 같은 후보 제외
+        available &= similarity[best] < duplicate_threshold
+
+        file_counts[file_index[best]] += 1
+        if per_file_cap is not None and file_counts[file_index[best]] >= per_file_cap:
+            capped |= file_index == file_index[best]
+
+    return selected
+
+
+def rank_relevance(n: int) -> np.ndarray:
+    """입력 순서(관련도 내림차순) 기반 관련도 1.0 → 1/n"""
+    return 1.0 - np.arange(n, dtype=np.float32) / max(n, 1)
@@ -0,0 +1,277 @@
+"""
+문서 단위 메타데이터 카탈로그
+
+벡터 DB 전체를 매번 스캔(collection.get())하지 않도록
+문서(file_id) 단위 메타데이터를 메모리 인덱스 + JSON 파일로 유지합니다.
+
+항목 구조:
+    {
+        "file_id": "...",
+        "filename": "250211_재직증명서_센싱플러스.pdf",
+        "doc_type": "재직증명서",
+        "date": "250211",
+        "doc_title": "센싱플러스",
+        "chunk_count": 12,
+        "first_page": 1,
+        "embedding_backend": "fp32",  # 벡터를 만든 임베딩 추론 백엔드 (없으면 fp32)
+        "content_hash": "...",        # 인덱싱한 파일 내용 SHA-256 (벡터 DB에서 재구성한 항목은 없음)
+        "processor_version": "1:1000:200"  # DocumentProcessor.processor_version() (파서 버전 + 청킹 설정)
+    }
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from .query_matcher import CatalogMatcher
+
+
+class DocumentCatalog:
+    """문서 메타데이터 카탈로그 (index_document / delete_document*와 동기화)"""
+
+    # 전체 재구성 시 한 번에 가져올 청크 수
+    REBUILD_PAGE_SIZE = 5000
+
+    def __init__(self, catalog_path: Path):
+        self.catalog_path = Path(catalog_path)
+        self._lock = threading.RLock()
+
+        self._docs: Dict[str, Dict] = {}             # file_id -> 문서 항목
+        self._by_filename: Dict[str, Set[str]] = {}  # filename -> {file_id}
+        self._by_doc_type: Dict[str, Set[str]] = {}  # doc_type -> {file_id}
+        self._by_date: Dict[str, Set[str]] = {}      # date -> {file_id}
+        self._matcher = CatalogMatcher()              # 질의 내 파일명/문서 유형/날짜 매칭
+
+        self.loaded = self._load()
+
+    # ==================== 영속화 ====================
+
+    def _load(self) -> bool:
+        """카탈로그 파일 로드 (없거나 손상되었으면 False)"""
+        if not self.catalog_path.exists():
+            return False
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                self._clear()
+                for entry in data.get("documents", []):
+                    self._add_entry(entry)
+            self._matcher.rebuild(self._lock)
+            print(f"[Catalog] 카탈로그 로드 완료: 문서 {len(self._docs)}개")
+            return True
+        except Exception as e:
+            print(f"[Catalog] 카탈로그 로드 오류: {e}")
+            return False
+
+    def _save(self):
+        """카탈로그 파일 저장 (임시 파일에 쓰고 교체하여 손상 방지)"""
+        # 여러 인덱싱 작업이 동시에 저장할 수 있으므로 임시 파일 쓰기까지 잠금 유지
+        with self._lock:
+            data = {"version": 1, "documents": list(self._docs.values())}
+            tmp_path = self.catalog_path.with_suffix(self.catalog_path.suffix + ".tmp")
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.catalog_path)
+            except Exception as e:
+                print(f"[Catalog] 카탈로그 저장 오류: {e}")
+
+    # ==================== 내부 인덱스 관리 ====================
+
+    def _clear(self):
+        self._docs.clear()
+        self._by_filename.clear()
+        self._by_doc_type.clear()
+        self._by_date.clear()
+        self._matcher.clear()
+
+    def _add_entry(self, entry: Dict):
+        file_id = entry["file_id"]
+        if file_id in self._docs:
+            self._remove_entry(file_id)
+        self._docs[file_id] = entry
+        self._by_filename.setdefault(entry.get("filename"), set()).add(file_id)
+        if entry.get("doc_type"):
+            self._by_doc_type.setdefault(entry["doc_type"], set()).add(file_id)
+        if entry.get("date"):
+            self._by_date.setdefault(entry["date"], set()).add(file_id)
+        self._matcher.add_document(entry)
+
+    def _remove_entry(self, file_id: str) -> Optional[Dict]:
+        entry = self._docs.pop(file_id, None)
+        if entry is None:
+            return None
+        for index, key in ((self._by_filename, entry.get("filename")),
+                           (self._by_doc_type, entry.get("doc_type")),
+                           (self._by_date, entry.get("date"))):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(file_id)
+                if not ids:
+                    del index[key]
+        self._matcher.remove_document(entry)
+        return entry
+
+    # ==================== 갱신 ====================
+
+    def rebuild_from_collection(self, collection):
+        """벡터 DB 메타데이터로 카탈로그 재구성 (최초 1회 또는 불일치 시)"""
+        print(f"[Catalog] 벡터 DB에서 카탈로그 재구성 중...")
+        entries: Dict[str, Dict] = {}
+        offset = 0
+        while True:
+            batch = collection.get(
+                include=["metadatas"],
+                limit=self.REBUILD_PAGE_SIZE,
+                offset=offset
+            )
+            metadatas = batch.get("metadatas") or []
+            if not metadatas:
+                break
+            for metadata in metadatas:
+                file_id = metadata.get("file_id")
+                if not file_id:
+                    continue
+                page = metadata.get("page", 1)
+                entry = entries.get(file_id)
+                if entry is None:
+                    entries[file_id] = {
+                        "file_id": file_id,
+                        "filename": metadata.get("filename"),
+                        "doc_type": metadata.get("doc_type"),
+                        "date": metadata.get("date"),
+                        "doc_title": metadata.get("doc_title"),
+                        "chunk_count": 1,
+                        "first_page": page,
+                        "embedding_backend": metadata.get("embedding_backend") or "fp32"
+                    }
+                else:
+                    entry["chunk_count"] += 1
+                    if isinstance(page, int) and (not isinstance(entry["first_page"], int) or page < entry["first_page"]):
+                        entry["first_page"] = page
+            if len(metadatas) < self.REBUILD_PAGE_SIZE:
+                break
+            offset += self.REBUILD_PAGE_SIZE
+
+        with self._lock:
+            self._clear()
+            for entry in entries.values():
+                self._add_entry(entry)
+        self._matcher.rebuild(self._lock)
+        self._save()
+        print(f"[Catalog] 카탈로그 재구성 완료: 문서 {len(entries)}개")
+
+    def upsert(self, file_id: str, filename: str, parsed_info: Dict, chunk_count: int, first_page,
+               embedding_backend: str = "fp32", content_hash: Optional[str] = None,
+               processor_version: Optional[str] = None):
+        """문서 항목 추가/갱신 (index_document에서 호출)"""
+        entry = {
+            "file_id": file_id,
+            "filename": filename,
+            "doc_type": parsed_info.get("doc_type") if parsed_info.get("parsed") else None,
+            "date": parsed_info.get("date") if parsed_info.get("parsed") else None,
+            "doc_title": parsed_info.get("doc_title") if parsed_info.get("parsed") else None,
+            "chunk_count": chunk_count,
+            "first_page": first_page,
+            "embedding_backend": embedding_backend,
+            "content_hash": content_hash,
+            "processor_version": processor_version
+        }
+        with self._lock:
+            self._add_entry(entry)
+        self._matcher.rebuild(self._lock)
+        self._save()
+
+    def remove(self, file_id: str) -> Optional[Dict]:
+        """file_id로 문서 항목 제거"""
+        with self._lock:
+            entry = self._remove_entry(file_id)
+        if entry is not None:
+            self._matcher.rebuild(self._lock)
+            self._save()
+        return entry
+
+    def remove_by_filename(self, filename: str) -> List[Dict]:
+        """파일명으로 문서 항목 제거"""
+        with self._lock:
+            file_ids = list(self._by_filename.get(filename, ()))
+            removed = [self._remove_entry(file_id) for file_id in file_ids]
+        if removed:
+            self._matcher.rebuild(self._lock)
+            self._save()
+        return removed
+
+    # ==================== 조회 ====================
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def total_chunks(self) -> int:
+        """카탈로그에 기록된 전체 청크 수 (벡터 DB와 일치 여부 확인용)"""
+        with self._lock:
+            return sum(entry.get("chunk_count", 0) for entry in self._docs.values())
+
+    def embedding_backend_counts(self) -> Dict[str, int]:
+        """임베딩 백엔드별 문서 수 (이전 버전 항목은 fp32)"""
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for entry in self._docs.values():
+                backend = entry.get("embedding_backend") or "fp32"
+                counts[backend] = counts.get(backend, 0) + 1
+        return counts
+
+    def get(self, file_id: str) -> Optional[Dict]:
+        return self._docs.get(file_id)
+
+    def get_by_filename(self, filename: str) -> Optional[Dict]:
+        """파일명으로 문서 항목 조회 (같은 파일명이 여러 개면 첫 번째)"""
+        with self._lock:
+            file_ids = self._by_filename.get(filename)
+            if not file_ids:
+                return None
+            return self._docs[next(iter(file_ids))]
+
+    def has_filename(self, filename: str) -> bool:
+        return filename in self._by_filename
+
+    def filenames(self) -> List[str]:
+        """등록된 모든 고유 파일명"""
+        with self._lock:
+            return [f for f in self._by_filename.keys() if f]
+
+    def documents(self) -> List[Dict]:
+        """모든 문서 항목 (복사본)"""
+        with self._lock:
+            return [dict(entry) for entry in self._docs.values()]
+
+    def doc_type_counts(self) -> Dict[str, int]:
+        """문서 유형별 고유 파일 개수"""
+        with self._lock:
+            return {
+                doc_type: len({self._docs[fid]["filename"] for fid in file_ids})
+                for doc_type, file_ids in self._by_doc_type.items()
+            }
+
+    def find(self, date: Optional[str] = None, doc_type: Optional[str] = None,
+             filename: Optional[str] = None) -> List[Dict]:
+        """날짜/문서 유형/파일명 조건에 맞는 문서 항목 조회"""
+        with self._lock:
+            candidates = None
+            if filename is not None:
+                candidates = set(self._by_filename.get(filename, ()))
+            if date is not None:
+                date_ids = self._by_date.get(date, set())
+                candidates = set(date_ids) if candidates is None else candidates & date_ids
+            if doc_type is not None:
+                type_ids = self._by_doc_type.get(doc_type, set())
+                candidates = set(type_ids) if candidates is None else candidates & type_ids
+            if candidates is None:
+                candidates = self._docs.keys()
+            return [dict(self._docs[fid]) for fid in candidates]
+
+    def match_query(self, query_text: str) -> Dict:
+        """질의에 나타난 파일명/파일명 구성 요소/문서 유형/날짜 (CatalogMatcher.match 참고)"""
+        with self._lock:
+            return self._matcher.match(query_text)
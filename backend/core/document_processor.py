@@ -45,8 +45,10 @@ DocumentProcessor - 문서 파싱 및 표 추출 모듈
 ├─────────────────────────────────────────────────────────────────────────────┤
 │                                                                             │
 │  PDF 처리 시:                                                               │
-│    1. OpenCV 표 선 감지 (우선) → 성공 시 셀별 OCR                            │
-│    2. pdfplumber 텍스트 표 추출 (폴백)                                       │
+│    0. 렌더링 전 페이지 분류 (선/사각형, 글자 수, 이미지 면적)                │
+│       → 표 없음 / 벡터 표 / 이미지 표 (_classify_pdf_page)                   │
+│    1. OpenCV 표 선 감지 (이미지 표 페이지만) → 성공 시 셀별 OCR              │
+│    2. pdfplumber 텍스트 표 추출 (벡터 표 페이지, OpenCV 실패 시 폴백)        │
 │    3. 일반 텍스트 추출                                                      │
 │                                                                             │
 │  Excel 처리 시:                                                             │
@@ -56,8 +58,19 @@ DocumentProcessor - 문서 파싱 및 표 추출 모듈
 │                                                                             │
 └─────────────────────────────────────────────────────────────────────────────┘
 
+파싱 캐시 (ParseCache, 선택):
+    청킹 전 파싱 결과를 파일 내용 해시 기준으로 저장 (PDF는 페이지 단위)
+    → 재인덱싱 시 OCR/표 감지를 다시 실행하지 않고, 일부 페이지만 바뀐 PDF는 바뀐 페이지만 파싱
+    파싱 결과가 달라지는 수정을 하면 PARSER_VERSION을 올릴 것
+
+PDF 페이지 병렬 처리 (page_workers > 1, fork 가능한 환경):
+    pdfplumber 모드에서 캐시에 없는 페이지를 프로세스 풀에 나눠 파싱하고 페이지 순서대로 합침
+    (렌더링 + OpenCV + 셀별 EasyOCR이 페이지마다 독립적이므로 코어 수만큼 빨라짐)
+    워커는 PDF를 한 번만 열어 두고 OCR 리더를 로드한 채로 유지, torch/OpenCV 스레드 1개 + 낮은 우선순위(nice)
+    풀은 start_page_pool()로 프로세스 시작 시(스레드 생성 전) 한 번만 fork, 워커 오류로 닫히면 이후 순차 처리
+
 사용법:
-    processor = DocumentProcessor()
+    processor = DocumentProcessor(parse_cache=ParseCache(PARSE_CACHE_DIR))
     chunks = processor.extract_text_with_layout(file_path)
     
     # chunks 구조:
@@ -67,12 +80,23 @@ DocumentProcessor - 문서 파싱 및 표 추출 모듈
     # ]
 """
 
+import hashlib
+import multiprocessing
+import os
 import re
+import signal
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional, Tuple
 import PyPDF2
+from PyPDF2.generic import IndirectObject, StreamObject
 from docx import Document
 
+from .parse_cache import content_hash
+
 # pdfplumber를 사용한 표 추출 (Python 3.14 호환)
 try:
     import pdfplumber
@@ -141,31 +165,159 @@ except ImportError:
     HAS_PDF2IMAGE = False
     print("Warning: pdf2image not available, PDF OCR disabled")
 
+class ProcessingCancelled(Exception):
+    """진행 상황 콜백에서 발생시켜 문서 처리를 중단 (인덱싱 작업 취소)"""
+
+
+# ==================== PDF 페이지 병렬 처리 워커 (프로세스 풀) ====================
+
+# 워커 프로세스에서 열어 둔 PDF 수 (동시 인덱싱 작업 수만큼이면 충분)
+_WORKER_OPEN_PDFS = 2
+
+_worker_processor = None       # 워커의 DocumentProcessor (EasyOCR 리더를 로드한 채로 유지)
+_worker_pdfs = OrderedDict()   # (경로, 수정 시각, 크기) -> 열어 둔 pdfplumber PDF
+
+
+def _init_page_worker(nice: int):
+    """PDF 페이지 워커 초기화 (fork 직후)"""
+    global _worker_processor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C는 부모 프로세스가 처리
+    if nice:
+        try:
+            os.nice(nice)  # 질의 처리보다 낮은 우선순위
+        except OSError:
+            pass
+    # 워커 수만큼 코어를 나눠 쓰므로 워커마다 스레드 1개
+    # (부모가 이미 torch 연산을 했더라도 fork 후 OpenMP 스레드 풀을 쓰지 않으므로 멈추지 않음)
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    if HAS_CV2:
+        cv2.setNumThreads(1)
+    _worker_processor = DocumentProcessor()
+    _worker_pdfs.clear()  # 부모에서 물려받은 항목 없음 (fork 시점 기준)
+
+
+def _page_worker_ready() -> int:
+    """워커 시작 확인용 (start_page_pool)"""
+    return os.getpid()
+
+
+def _parse_pdf_page(file_path: str, page_num: int):
+    """워커에서 PDF 페이지 1개 파싱 (같은 파일은 한 번만 열어 두고 재사용) -> (표 경로, 원본 청크)"""
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    pdf = _worker_pdfs.get(key)
+    if pdf is None:
+        pdf = _worker_pdfs[key] = pdfplumber.open(file_path)
+        while len(_worker_pdfs) > _WORKER_OPEN_PDFS:
+            _, oldest = _worker_pdfs.popitem(last=False)
+            oldest.close()
+    else:
+        _worker_pdfs.move_to_end(key)
+    page = pdf.pages[page_num - 1]
+    try:
+        route = _worker_processor._classify_pdf_page(page)
+        return route, _worker_processor._extract_pdfplumber_page(page, page_num, route)
+    finally:
+        # 파싱한 페이지 객체 캐시 해제 (PDF를 열어 둔 동안 메모리가 계속 늘지 않도록)
+        if hasattr(page, "close"):
+            page.close()
+
+
 class DocumentProcessor:
     """Layout-aware 문서 처리 클래스"""
     
-    def __init__(self):
+    # 파싱(청킹 전) 결과가 달라지는 수정 시 올림 → 파싱 캐시의 이전 항목은 적중하지 않음
+    PARSER_VERSION = 2
+    
+    # PDF 처리 방식(표 추출 여부) 결정 시 검사하는 앞 페이지 수
+    TABLE_PROBE_PAGES = 5
+    
+    # 페이지별 표 처리 경로 (렌더링 전에 pdfplumber 객체만으로 분류 - _classify_pdf_page)
+    #   none  : 표 없음 → 텍스트만 추출
+    #   vector: 선/사각형으로 그린 표 → pdfplumber 표 추출
+    #   image : 스캔/이미지 표 → 렌더링 + OpenCV + EasyOCR (실패 시 pdfplumber 표 추출)
+    PAGE_ROUTES = ("none", "vector", "image")
+    IMAGE_TABLE_MIN_COVERAGE = 0.15  # 이미지가 페이지 면적의 이 비율 이상이면 이미지 표 후보 (로고/도장 제외)
+    SCANNED_MAX_CHARS = 50           # 텍스트 레이어 글자 수가 이보다 적으면 스캔 페이지로 봄
+    TABLE_EDGE_MIN_COUNT = 2         # 가로/세로 선이 각각 이 개수 이상이면 벡터 표 후보
+    TABLE_EDGE_MIN_LENGTH = 20       # 표 선으로 볼 최소 길이 (pt, 밑줄/구분 기호 제외)
+    
+    # 페이지 해시에서 제외하는 키 (페이지 트리, 다른 페이지를 가리키는 링크/역참조 - 페이지 내용과 무관)
+    _DIGEST_SKIP_KEYS = {"/Parent", "/P", "/Dest", "/A", "/B", "/Thumb"}
+    
+    def __init__(self, parse_cache=None, page_workers: int = 1, page_worker_nice: int = 10):
+        """
+        Args:
+            parse_cache: ParseCache (None이면 캐시 없이 매번 파싱)
+            page_workers: PDF 페이지 병렬 처리 프로세스 수 (1 이하 또는 fork가 없는 환경이면 순차 처리)
+            page_worker_nice: 페이지 워커 프로세스의 nice 값 (질의 처리에 CPU를 양보)
+        """
         self.chunk_size = 1000
         self.chunk_overlap = 200
         self.ocr_reader = None  # Lazy loading for EasyOCR
+        self._ocr_lock = threading.Lock()  # 여러 인덱싱 작업이 동시에 초기화하지 않도록
+        self.parse_cache = parse_cache
+        self.page_workers = page_workers
+        self.page_worker_nice = page_worker_nice
+        self._page_pool = None  # start_page_pool()로 생성 (여러 인덱싱 작업이 공유)
+        self._page_pool_lock = threading.Lock()
     
     def _get_ocr_reader(self):
         """OCR 리더 초기화 (지연 로딩)"""
-        if self.ocr_reader is None and HAS_EASYOCR:
-            print("[DocumentProcessor] EasyOCR 모델 로딩 중... (처음 실행 시 시간이 소요됩니다)")
-            self.ocr_reader = easyocr.Reader(['ko', 'en'], gpu=False)  # 한국어 + 영어 지원
-            print("[DocumentProcessor] EasyOCR 모델 로딩 완료")
+        with self._ocr_lock:
+            if self.ocr_reader is None and HAS_EASYOCR:
+                print("[DocumentProcessor] EasyOCR 모델 로딩 중... (처음 실행 시 시간이 소요됩니다)")
+                self.ocr_reader = easyocr.Reader(['ko', 'en'], gpu=False)  # 한국어 + 영어 지원
+                print("[DocumentProcessor] EasyOCR 모델 로딩 완료")
         return self.ocr_reader
     
-    def extract_text_with_layout(self, file_path: Path) -> List[Dict]:
+    def extract_text_with_layout(self, file_path: Path,
+                                 progress_callback: Optional[Callable] = None,
+                                 stats: Optional[Dict] = None) -> List[Dict]:
         """
         문서에서 텍스트, 표, 이미지를 추출하여 구조화된 청크 리스트 반환
         각 청크는 페이지 번호와 메타데이터를 포함
+        
+        Args:
+            progress_callback: PDF 페이지 처리마다 progress_callback("parsing", pages_done=, pages_total=) 호출
+                               (ProcessingCancelled를 발생시키면 처리 중단)
+            stats: 지정하면 파싱 통계를 채움
+                   (parse_cache_hit: 파일 전체 캐시 적중 여부,
+                    page_routes: pdfplumber 모드 PDF의 표 경로별 페이지 수 {"cached", "none", "vector", "image"})
         """
         file_ext = file_path.suffix.lower()
-        
+        if stats is None:
+            stats = {}
+        stats["parse_cache_hit"] = False
+        
+        if self.parse_cache is None:
+            return self._chunk_documents(self._parse(file_path, file_ext, progress_callback, stats))
+        
+        # 파일 전체 캐시 (내용 해시 기준, 청킹 전 결과이므로 청킹 설정이 바뀌어도 재사용)
+        key = self.parse_cache.make_key("document", self.PARSER_VERSION, self._parse_options(), file_ext,
+                                        content_hash(file_path))
+        raw_chunks = self.parse_cache.get(key)
+        if raw_chunks is not None:
+            print(f"[ParseCache] 파싱 캐시 적중: {file_path.name} (원본 청크 {len(raw_chunks)}개)")
+            stats["parse_cache_hit"] = True
+        else:
+            raw_chunks = self._parse(file_path, file_ext, progress_callback, stats)
+            self.parse_cache.put(key, raw_chunks, "document", file_path.name)
+        return self._chunk_documents(raw_chunks)
+    
+    def processor_version(self) -> str:
+        """청크 결과가 달라지는 처리 설정 식별자 (파서 버전 + 청킹 설정, 카탈로그에 기록 → 재인덱싱 필요 여부 판단)"""
+        return f"{self.PARSER_VERSION}:{self.chunk_size}:{self.chunk_overlap}"
+    
+    def _parse(self, file_path: Path, file_ext: str, progress_callback: Optional[Callable] = None,
+               stats: Optional[Dict] = None) -> List[Dict]:
+        """파일 형식별 파싱 (청킹 전 원본 청크 리스트)"""
         if file_ext == ".pdf":
-            return self._process_pdf(file_path)
+            return self._process_pdf(file_path, progress_callback, stats)
         elif file_ext == ".docx":
             return self._process_docx(file_path)
         elif file_ext in [".txt", ".md"]:
@@ -177,7 +329,92 @@ class DocumentProcessor:
         else:
             raise ValueError(f"Unsupported file type: {file_ext}")
     
-    def _process_pdf(self, file_path: Path) -> List[Dict]:
+    def _parse_options(self) -> Dict:
+        """파싱 결과에 영향을 주는 설정 (캐시 키에 포함 - 설치된 라이브러리가 바뀌면 다시 파싱)"""
+        return {
+            "pdfplumber": HAS_PDFPLUMBER,
+            "unstructured": HAS_UNSTRUCTURED,
+            "easyocr": HAS_EASYOCR,
+            "pil": HAS_PIL,
+            "cv2": HAS_CV2,
+            "pdf2image": HAS_PDF2IMAGE,
+            "openpyxl": HAS_OPENPYXL,
+            "xlrd": HAS_XLRD,
+            "ocr_languages": ["ko", "en"],
+        }
+    
+    # ==================== PDF 페이지 캐시 ====================
+    
+    def _pdf_page_hashes(self, file_path: Path) -> Optional[List[str]]:
+        """PDF 페이지별 내용 해시 (실패 시 None)
+        
+        페이지 객체(콘텐츠 스트림, 폰트/이미지 리소스, 크기/회전 등)를 재귀적으로 해시하며,
+        페이지 트리(/Parent)와 페이지 번호는 포함하지 않으므로 페이지를 넣거나 빼도 나머지 페이지 해시는 같음.
+        스트림은 디코딩하지 않은 원본 바이트를 사용 (렌더링/텍스트 추출 없이 빠르게 계산)
+        """
+        try:
+            with open(file_path, "rb") as f:
+                reader = PyPDF2.PdfReader(f)
+                memo = {}
+                return [self._pdf_object_digest(page, memo, set()).hex() for page in reader.pages]
+        except Exception as e:
+            print(f"[ParseCache] PDF 페이지 해시 계산 실패, 페이지 캐시 생략: {e}")
+            return None
+    
+    def _pdf_object_digest(self, obj, memo: Dict, visiting: set) -> bytes:
+        """PDF 객체 해시 (간접 참조 객체는 문서 안에서 한 번만 계산 - 여러 페이지가 공유하는 폰트 등)"""
+        if isinstance(obj, IndirectObject):
+            ref = (obj.idnum, obj.generation)
+            if ref in memo:
+                return memo[ref]
+            if ref in visiting:
+                return b"cycle"
+            visiting.add(ref)
+            digest = self._pdf_object_digest(obj.get_object(), memo, visiting)
+            visiting.discard(ref)
+            memo[ref] = digest
+            return digest
+        
+        h = hashlib.sha256()
+        if isinstance(obj, StreamObject):
+            data = getattr(obj, "_data", None)
+            h.update(b"stream")
+            h.update(data if data is not None else obj.get_data())
+        if isinstance(obj, dict):
+            h.update(b"dict")
+            for name in sorted(obj.keys()):
+                if name in self._DIGEST_SKIP_KEYS:
+                    continue
+                h.update(str(name).encode('utf-8'))
+                h.update(self._pdf_object_digest(obj.raw_get(name) if hasattr(obj, "raw_get") else obj[name],
+                                                 memo, visiting))
+        elif isinstance(obj, list):
+            h.update(b"array")
+            for item in obj:
+                h.update(self._pdf_object_digest(item, memo, visiting))
+        elif not isinstance(obj, StreamObject):
+            h.update(repr(obj).encode('utf-8'))
+        return h.digest()
+    
+    def _page_cache_key(self, mode: str, page_hash: str) -> str:
+        return self.parse_cache.make_key("page", self.PARSER_VERSION, self._parse_options(), mode, page_hash)
+    
+    def _cached_page(self, key: Optional[str], page_num: int) -> Optional[List[Dict]]:
+        """캐시된 페이지 원본 청크 (페이지 번호는 현재 문서 기준으로 다시 지정)"""
+        if key is None:
+            return None
+        page_chunks = self.parse_cache.get(key)
+        if page_chunks is None:
+            return None
+        return [dict(chunk, page=page_num) for chunk in page_chunks]
+    
+    def _store_page(self, key: Optional[str], page_chunks: List[Dict], file_path: Path, page_num: int):
+        if key is not None:
+            self.parse_cache.put(key, [{k: v for k, v in chunk.items() if k != "page"} for chunk in page_chunks],
+                                 "page", f"{file_path.name} p{page_num}")
+    
+    def _process_pdf(self, file_path: Path, progress_callback: Optional[Callable] = None,
+                     stats: Optional[Dict] = None) -> List[Dict]:
         """PDF 처리 (스마트 표 감지 + 자동 추출)"""
         chunks = []
         
@@ -187,19 +424,31 @@ class DocumentProcessor:
         
         if HAS_PDFPLUMBER:
             try:
-                # 1단계: 표 존재 여부 빠르게 확인
-                has_tables = False
-                with pdfplumber.open(file_path) as pdf:
-                    for page in pdf.pages[:5]:  # 처음 5페이지만 검사 (속도 최적화)
-                        tables = page.extract_tables()
-                        if tables and any(t for t in tables if t and len(t) > 1):
-                            has_tables = True
-                            break
+                # 페이지 캐시용 페이지별 해시 (캐시가 없으면 계산하지 않음)
+                page_hashes = self._pdf_page_hashes(file_path) if self.parse_cache is not None else None
+                
+                # 1단계: 표 존재 여부 빠르게 확인 (앞 페이지가 같으면 이전 결정 재사용)
+                mode_key = None
+                has_tables = None
+                if page_hashes is not None:
+                    mode_key = self.parse_cache.make_key("pdf-mode", self.PARSER_VERSION,
+                                                         page_hashes[:self.TABLE_PROBE_PAGES])
+                    has_tables = self.parse_cache.get(mode_key)
+                if has_tables is None:
+                    has_tables = False
+                    with pdfplumber.open(file_path) as pdf:
+                        for page in pdf.pages[:self.TABLE_PROBE_PAGES]:  # 처음 몇 페이지만 검사 (속도 최적화)
+                            tables = page.extract_tables()
+                            if tables and any(t for t in tables if t and len(t) > 1):
+                                has_tables = True
+                                break
+                    if mode_key is not None:
+                        self.parse_cache.put(mode_key, has_tables, "pdf-mode", file_path.name)
                 
                 if has_tables:
                     # 표가 감지됨 → pdfplumber로 표+텍스트 모두 추출
                     print(f"[DocumentProcessor] 표 감지됨! pdfplumber로 표 추출 모드 활성화")
-                    self._process_pdf_with_pdfplumber(file_path, chunks)
+                    self._process_pdf_with_pdfplumber(file_path, chunks, progress_callback, page_hashes, stats)
                     
                     # 표 청크 수 카운트
                     table_count = sum(1 for c in chunks if c.get("type") == "table")
@@ -208,13 +457,15 @@ class DocumentProcessor:
                 else:
                     # 표 없음 → PyPDF2로 빠르게 텍스트만 추출
                     print(f"[DocumentProcessor] 표 없음, PyPDF2로 텍스트 추출")
-                    self._process_pdf_with_pypdf2(file_path, chunks)
+                    self._process_pdf_with_pypdf2(file_path, chunks, progress_callback)
                     print(f"[DocumentProcessor] PyPDF2 처리 완료: {len(chunks)} 청크")
                     
+            except ProcessingCancelled:
+                raise
             except Exception as e:
                 print(f"[DocumentProcessor] pdfplumber 오류: {e}, PyPDF2로 폴백")
                 chunks = []
-                self._process_pdf_with_pypdf2(file_path, chunks)
+                self._process_pdf_with_pypdf2(file_path, chunks, progress_callback)
         
         # pdfplumber가 없으면 unstructured 시도
         elif HAS_UNSTRUCTURED:
@@ -264,101 +515,263 @@ class DocumentProcessor:
             
                 print(f"[DocumentProcessor] unstructured로 PDF 처리 완료: {len(chunks)} 청크")
             
+            except ProcessingCancelled:
+                raise
             except Exception as e:
                 # Fallback: pdfplumber 사용
                 print(f"[DocumentProcessor] Unstructured 처리 실패: {e}")
                 chunks = []
                 if HAS_PDFPLUMBER:
                     try:
-                        self._process_pdf_with_pdfplumber(file_path, chunks)
+                        self._process_pdf_with_pdfplumber(file_path, chunks, progress_callback, stats=stats)
                         print(f"[DocumentProcessor] pdfplumber로 PDF 처리 완료: {len(chunks)} 청크")
+                    except ProcessingCancelled:
+                        raise
                     except Exception as e2:
                         print(f"[DocumentProcessor] pdfplumber 처리 실패: {e2}")
                         chunks = []
-                        self._process_pdf_with_pypdf2(file_path, chunks)
+                        self._process_pdf_with_pypdf2(file_path, chunks, progress_callback)
                 else:
-                    self._process_pdf_with_pypdf2(file_path, chunks)
+                    self._process_pdf_with_pypdf2(file_path, chunks, progress_callback)
         
         # 2순위: pdfplumber 사용
         elif HAS_PDFPLUMBER:
             try:
-                self._process_pdf_with_pdfplumber(file_path, chunks)
+                self._process_pdf_with_pdfplumber(file_path, chunks, progress_callback, stats=stats)
                 print(f"[DocumentProcessor] pdfplumber로 PDF 처리 완료: {len(chunks)} 청크")
+            except ProcessingCancelled:
+                raise
             except Exception as e:
                 print(f"[DocumentProcessor] pdfplumber 처리 실패: {e}")
                 chunks = []
-                self._process_pdf_with_pypdf2(file_path, chunks)
+                self._process_pdf_with_pypdf2(file_path, chunks, progress_callback)
         
         else:
             # 둘 다 없으면 PyPDF2 사용
-            self._process_pdf_with_pypdf2(file_path, chunks)
+            self._process_pdf_with_pypdf2(file_path, chunks, progress_callback)
         
-        # 청크 분할
-        return self._chunk_documents(chunks)
+        return chunks
     
-    def _process_pdf_with_pdfplumber(self, file_path: Path, chunks: List[Dict]):
+    def _process_pdf_with_pdfplumber(self, file_path: Path, chunks: List[Dict],
+                                     progress_callback: Optional[Callable] = None,
+                                     page_hashes: Optional[List[str]] = None,
+                                     stats: Optional[Dict] = None):
         """
         ========================================================================
         [방법 1] pdfplumber를 사용한 PDF 처리
         ========================================================================
         
         처리 순서:
-        1. OpenCV 표 선 감지 (우선) - _detect_table_cells_opencv()
-        2. pdfplumber 텍스트 표 추출 (폴백) - page.extract_tables()
+        0. 페이지 표 경로 분류 (렌더링 전) - _classify_pdf_page()
+        1. OpenCV 표 선 감지 (image 페이지만) - _detect_table_cells_opencv()
+        2. pdfplumber 텍스트 표 추출 (vector 페이지 또는 OpenCV 실패 시) - page.extract_tables()
         3. 일반 텍스트 추출 - page.extract_text()
         
         장점: 텍스트 기반 PDF에서 빠르고 정확한 표 추출
         단점: 이미지로 된 표는 인식 불가 (OpenCV/OCR로 대체)
+        
+        page_hashes가 있으면 페이지 캐시에 있는 페이지는 파싱하지 않음
+        page_workers > 1이면 나머지 페이지를 프로세스 풀에서 병렬 파싱 (결과는 페이지 순서대로)
+        페이지마다 렌더링 전에 표 경로(none / vector / image)를 분류하여 OCR은 image 페이지에서만 실행
         """
         with pdfplumber.open(file_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, 1):
-                table_bboxes = []  # 표 영역 좌표 저장 (텍스트 중복 방지용)
-                tables_found = 0
-                
-                # ====== 1단계: OpenCV 기반 표 감지 (우선) ======
-                if HAS_CV2 and HAS_EASYOCR and HAS_PIL:
-                    print(f"[OpenCV] 페이지 {page_num}: OpenCV 표 감지 시도 (우선)")
-                    image_tables = self._extract_image_tables_with_ocr(page, page_num)
-                    if image_tables:
-                        chunks.extend(image_tables)
-                        tables_found += len(image_tables)
-                        print(f"[OpenCV] 페이지 {page_num}: OpenCV로 표 {len(image_tables)}개 추출 성공!")
-                    else:
-                        print(f"[OpenCV] 페이지 {page_num}: OpenCV 표 감지 실패 -> pdfplumber로 전환")
-                
-                # ====== 2단계: pdfplumber 텍스트 기반 표 추출 (OpenCV 실패 시) ======
-                if tables_found == 0:
-                    tables = page.extract_tables()
-                    
-                    if tables:
-                        for table_idx, table in enumerate(tables):
-                            if table and len(table) > 1:  # 최소 2행 이상
-                                # 표를 Markdown으로 변환 (Cell Merging + Fill-down 적용)
-                                table_text = self._pdfplumber_table_to_markdown(table)
-                                if table_text.strip():
-                                    chunks.append({
-                                        "text": f"\n\n[표 {table_idx + 1} 시작]\n{table_text}\n[표 {table_idx + 1} 끝]\n\n",
-                                        "page": page_num,
-                                        "type": "table"
-                                    })
-                                    tables_found += 1
-                                    
-                                    # 표 미리보기 로그 (처음 3행만)
-                                    preview_lines = table_text.split('\n')[:5]
-                                    preview = '\n    '.join(preview_lines)
-                                    print(f"[pdfplumber TABLE] 페이지 {page_num}, 표 {table_idx + 1} ({len(table)}행 x {len(table[0]) if table[0] else 0}열)")
-                                    print(f"    {preview}")
-                                    if len(table_text.split('\n')) > 5:
-                                        print(f"    ... (총 {len(table)}행)")
-                
-                # ====== 3단계: 일반 텍스트 추출 ======
-                text = page.extract_text()
-                if text and text.strip():
-                    chunks.append({
-                        "text": text.strip(),
-                        "page": page_num,
-                        "type": "text"
-                    })
+            total_pages = len(pdf.pages)
+            if page_hashes is not None and len(page_hashes) != total_pages:
+                print(f"[ParseCache] 페이지 수 불일치 (PyPDF2 {len(page_hashes)} / pdfplumber {total_pages}), 페이지 캐시 생략")
+                page_hashes = None
+            
+            # 캐시에 있는 페이지
+            keys = [self._page_cache_key("pdfplumber", page_hash) for page_hash in page_hashes] if page_hashes else [None] * total_pages
+            pages = [self._cached_page(key, page_num) for page_num, key in enumerate(keys, 1)]
+            missing = [page_num for page_num, page_chunks in enumerate(pages, 1) if page_chunks is None]
+            if page_hashes:
+                print(f"[ParseCache] 페이지 캐시 적중 {total_pages - len(missing)}/{total_pages} (나머지 {len(missing)}페이지 파싱)")
+            
+            # 나머지 페이지 파싱 (프로세스 풀이 있으면 병렬, 풀 오류 시 남은 페이지는 순차)
+            parsed = {}
+            pool = self._get_page_pool() if len(missing) > 1 else None
+            if pool is not None:
+                parsed = self._parse_pages_parallel(pool, file_path, missing, total_pages, progress_callback)
+            routes = {"cached": total_pages - len(missing), **{route: 0 for route in self.PAGE_ROUTES}}
+            for page_num in missing:
+                result = parsed.get(page_num)
+                if result is None:
+                    if progress_callback:
+                        progress_callback("parsing", pages_done=total_pages - len(missing) + len(parsed),
+                                          pages_total=total_pages)
+                    page = pdf.pages[page_num - 1]
+                    route = self._classify_pdf_page(page)
+                    result = parsed[page_num] = (route, self._extract_pdfplumber_page(page, page_num, route))
+                route, page_chunks = result
+                routes[route] += 1
+                pages[page_num - 1] = page_chunks
+                self._store_page(keys[page_num - 1], page_chunks, file_path, page_num)
+            
+            # 페이지 순서대로 합침
+            for page_chunks in pages:
+                chunks.extend(page_chunks)
+        
+        print(f"[DocumentProcessor] 페이지 표 경로: 표 없음 {routes['none']}, 벡터 표 {routes['vector']}, "
+              f"이미지 표(OCR) {routes['image']}, 캐시 {routes['cached']}")
+        if stats is not None:
+            stats["page_routes"] = routes
+    
+    def start_page_pool(self) -> bool:
+        """PDF 페이지 워커 프로세스 풀 생성 + 워커 fork (병렬 처리를 쓰지 않으면 생성하지 않음)
+        
+        다른 스레드를 만들기 전(RAGSystem 초기화 시작 시)에 호출: 다른 스레드가 잠금(stdout 버퍼,
+        모델 로드 잠금 등)을 잡은 상태로 fork하면 워커에서 그 잠금이 풀리지 않으므로 인덱싱 도중에는 fork하지 않음
+        fork로 만듦: spawn은 메인 모듈(app.py)을 다시 실행하므로 워커마다 RAGSystem이 생성됨
+        
+        Returns:
+            풀 생성 여부 (False면 PDF 페이지 순차 처리)
+        """
+        if self.page_workers <= 1 or not hasattr(os, "fork"):
+            return False
+        with self._page_pool_lock:
+            if self._page_pool is not None:
+                return True
+            pool = ProcessPoolExecutor(
+                max_workers=self.page_workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_page_worker,
+                initargs=(self.page_worker_nice,)
+            )
+            try:
+                # fork 컨텍스트는 첫 submit 때 워커를 모두 fork함 (이후 새로 fork하지 않음)
+                pool.submit(_page_worker_ready).result()
+            except BrokenProcessPool as e:
+                print(f"[DocumentProcessor] PDF 페이지 워커 시작 실패, 순차 처리: {e}")
+                pool.shutdown(wait=False, cancel_futures=True)
+                return False
+            self._page_pool = pool
+        print(f"[DocumentProcessor] PDF 페이지 병렬 처리 프로세스 {self.page_workers}개 시작")
+        return True
+    
+    def _get_page_pool(self) -> Optional[ProcessPoolExecutor]:
+        """PDF 페이지 워커 프로세스 풀 (start_page_pool을 호출하지 않았거나 워커 오류로 닫혔으면 None → 순차 처리)"""
+        with self._page_pool_lock:
+            return self._page_pool
+    
+    def _parse_pages_parallel(self, pool: ProcessPoolExecutor, file_path: Path, page_nums: List[int],
+                              total_pages: int, progress_callback: Optional[Callable] = None) -> Dict[int, Tuple[str, List[Dict]]]:
+        """페이지를 워커 프로세스에 나눠 파싱
+        
+        Returns:
+            {페이지 번호: (표 경로, 원본 청크)} - 워커가 비정상 종료되면 그때까지 끝난 페이지만 (나머지는 호출한 쪽에서 순차 처리)
+        """
+        done_before = total_pages - len(page_nums)
+        parsed = {}
+        futures = {pool.submit(_parse_pdf_page, str(file_path), page_num): page_num for page_num in page_nums}
+        try:
+            for future in as_completed(futures):
+                parsed[futures[future]] = future.result()
+                if progress_callback:
+                    progress_callback("parsing", pages_done=done_before + len(parsed), pages_total=total_pages)
+        except BrokenProcessPool as e:
+            print(f"[DocumentProcessor] PDF 페이지 워커 오류 ({e}), 남은 {len(page_nums) - len(parsed)}페이지와 "
+                  f"이후 PDF는 순차 처리 (재시작 시 복구)")
+            with self._page_pool_lock:
+                if self._page_pool is pool:
+                    self._page_pool = None  # 스레드가 실행 중이므로 새 풀을 fork하지 않음
+            pool.shutdown(wait=False, cancel_futures=True)
+        except BaseException:
+            # 취소(ProcessingCancelled) 등: 아직 시작하지 않은 페이지는 실행하지 않음
+            for future in futures:
+                future.cancel()
+            raise
+        return parsed
+    
+    def _classify_pdf_page(self, page) -> str:
+        """렌더링 전 페이지 표 경로 분류 (pdfplumber의 선/사각형 객체, 텍스트 밀도, 이미지 면적)
+        
+        Returns:
+            "image"  : 큰 이미지가 있고 텍스트 레이어가 거의 없음 (스캔 페이지), 또는 표 선 없이 큰 이미지가 있음
+            "vector" : 가로/세로 표 선이 있음
+            "none"   : 둘 다 아님 (pdfplumber 표 추출도 선 기준이므로 표가 나오지 않음)
+        """
+        try:
+            page_area = float(page.width * page.height) or 1.0
+            image_area = 0.0
+            for image in page.images:
+                # 페이지 밖으로 나간 부분 제외
+                width = min(image["x1"], page.width) - max(image["x0"], 0)
+                height = min(image["bottom"], page.height) - max(image["top"], 0)
+                if width > 0 and height > 0:
+                    image_area += width * height
+            image_coverage = min(1.0, image_area / page_area)
+            
+            if image_coverage >= self.IMAGE_TABLE_MIN_COVERAGE and len(page.chars) < self.SCANNED_MAX_CHARS:
+                return "image"
+            
+            horizontal = sum(1 for edge in page.horizontal_edges
+                             if edge["x1"] - edge["x0"] >= self.TABLE_EDGE_MIN_LENGTH)
+            vertical = sum(1 for edge in page.vertical_edges
+                           if edge["bottom"] - edge["top"] >= self.TABLE_EDGE_MIN_LENGTH)
+            if horizontal >= self.TABLE_EDGE_MIN_COUNT and vertical >= self.TABLE_EDGE_MIN_COUNT:
+                return "vector"
+            
+            if image_coverage >= self.IMAGE_TABLE_MIN_COVERAGE:
+                return "image"  # 텍스트는 있지만 이미지로 붙인 표일 수 있음
+            return "none"
+        except Exception as e:
+            print(f"[DocumentProcessor] 페이지 표 경로 분류 오류, OCR 경로 사용: {e}")
+            return "image"
+    
+    def _extract_pdfplumber_page(self, page, page_num: int, route: str = "image") -> List[Dict]:
+        """pdfplumber 페이지 1개 파싱 (OpenCV 표 → pdfplumber 표 → 텍스트)
+        
+        Args:
+            route: _classify_pdf_page 결과 (image 페이지만 OpenCV/OCR, none 페이지는 표 추출 생략)
+        """
+        chunks = []
+        tables_found = 0
+        
+        # ====== 1단계: OpenCV 기반 표 감지 (이미지 표 후보 페이지만) ======
+        if route == "image" and HAS_CV2 and HAS_EASYOCR and HAS_PIL:
+            print(f"[OpenCV] 페이지 {page_num}: OpenCV 표 감지 시도 (우선)")
+            image_tables = self._extract_image_tables_with_ocr(page, page_num)
+            if image_tables:
+                chunks.extend(image_tables)
+                tables_found += len(image_tables)
+                print(f"[OpenCV] 페이지 {page_num}: OpenCV로 표 {len(image_tables)}개 추출 성공!")
+            else:
+                print(f"[OpenCV] 페이지 {page_num}: OpenCV 표 감지 실패 -> pdfplumber로 전환")
+        
+        # ====== 2단계: pdfplumber 텍스트 기반 표 추출 (벡터 표 후보 또는 OpenCV 실패 시) ======
+        if tables_found == 0 and route != "none":
+            tables = page.extract_tables()
+            
+            if tables:
+                for table_idx, table in enumerate(tables):
+                    if table and len(table) > 1:  # 최소 2행 이상
+                        # 표를 Markdown으로 변환 (Cell Merging + Fill-down 적용)
+                        table_text = self._pdfplumber_table_to_markdown(table)
+                        if table_text.strip():
+                            chunks.append({
+                                "text": f"\n\n[표 {table_idx + 1} 시작]\n{table_text}\n[표 {table_idx + 1} 끝]\n\n",
+                                "page": page_num,
+                                "type": "table"
+                            })
+                            tables_found += 1
+                            
+                            # 표 미리보기 로그 (처음 3행만)
+                            preview_lines = table_text.split('\n')[:5]
+                            preview = '\n    '.join(preview_lines)
+                            print(f"[pdfplumber TABLE] 페이지 {page_num}, 표 {table_idx + 1} ({len(table)}행 x {len(table[0]) if table[0] else 0}열)")
+                            print(f"    {preview}")
+                            if len(table_text.split('\n')) > 5:
+                                print(f"    ... (총 {len(table)}행)")
+        
+        # ====== 3단계: 일반 텍스트 추출 ======
+        text = page.extract_text()
+        if text and text.strip():
+            chunks.append({
+                "text": text.strip(),
+                "page": page_num,
+                "type": "text"
+            })
+        return chunks
     
     def _pdfplumber_table_to_markdown(self, table: List[List]) -> str:
         """
@@ -810,11 +1223,15 @@ class DocumentProcessor:
         
         return chunks
     
-    def _process_pdf_with_pypdf2(self, file_path: Path, chunks: List[Dict]):
+    def _process_pdf_with_pypdf2(self, file_path: Path, chunks: List[Dict],
+                                 progress_callback: Optional[Callable] = None):
         """PyPDF2를 사용한 PDF 처리 (Fallback)"""
         with open(file_path, "rb") as f:
                 pdf_reader = PyPDF2.PdfReader(f)
+                total_pages = len(pdf_reader.pages)
                 for page_num, page in enumerate(pdf_reader.pages, 1):
+                    if progress_callback:
+                        progress_callback("parsing", pages_done=page_num - 1, pages_total=total_pages)
                     text = page.extract_text()
                     if text.strip():
                         chunks.append({
@@ -822,9 +1239,6 @@ class DocumentProcessor:
                             "page": page_num,
                             "type": "text"
                         })
-        
-        # 청크 분할
-        return self._chunk_documents(chunks)
     
     def _process_docx(self, file_path: Path) -> List[Dict]:
         """DOCX 처리"""
@@ -861,18 +1275,18 @@ class DocumentProcessor:
                 "type": "text"
             })
         
-        return self._chunk_documents(chunks)
+        return chunks
     
     def _process_text(self, file_path: Path) -> List[Dict]:
         """텍스트 파일 처리"""
         with open(file_path, "r", encoding="utf-8") as f:
             text = f.read()
         
-        return self._chunk_documents([{
+        return [{
             "text": text,
             "page": 1,
             "type": "text"
-        }])
+        }]
     
     def _process_image(self, file_path: Path) -> List[Dict]:
         """이미지 파일에서 OCR로 텍스트 추출"""
@@ -926,7 +1340,7 @@ class DocumentProcessor:
                 "type": "ocr"
             })
         
-        return self._chunk_documents(chunks)
+        return chunks
     
     def _process_pdf_with_ocr(self, file_path: Path) -> List[Dict]:
         """PDF 페이지를 이미지로 변환 후 OCR 처리 (스캔 PDF용)"""
@@ -973,7 +1387,7 @@ class DocumentProcessor:
             chunks = []
             self._process_pdf_with_pypdf2(file_path, chunks)
         
-        return self._chunk_documents(chunks)
+        return chunks
     
     def _process_excel(self, file_path: Path) -> List[Dict]:
         """엑셀 파일 처리 (.xlsx, .xls)"""
@@ -1064,7 +1478,7 @@ class DocumentProcessor:
             raise ValueError(f"Excel file processing not available for {file_ext}")
         
         print(f"[DocumentProcessor] Excel 처리 완료: {len(chunks)} 시트")
-        return self._chunk_documents(chunks)
+        return chunks
     
     def _excel_table_to_markdown(self, table_data: List[List], sheet_name: str = "") -> str:
         """엑셀 테이블 데이터를 계층형 텍스트 + 마크다운 형식으로 변환"""
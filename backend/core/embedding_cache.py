@@ -0,0 +1,215 @@
+"""
+문서 청크 임베딩 영구 캐시 (SQLite, RAGSystem.index_document)
+
+같은 파일 재업로드, reindex_documents.py, 여러 문서에 반복되는 표지/양식 페이지처럼
+청크 텍스트가 이전 인덱싱과 같으면 bge-m3를 다시 실행하지 않고 저장된 벡터를 사용합니다.
+
+- 키: (모델 키, 청크 텍스트 SHA-256)
+  모델 키 = 임베딩 모델 + 백엔드 + max_seq_length (잘리는 길이가 바뀌면 벡터도 달라지므로 별도 항목)
+- 값: float16 벡터 (1024차원 기준 2KB), 자르기 전 토큰 수 (잘림 통계용),
+  lexical 가중치 (토큰 id int32 + 가중치 float16, lexical을 쓰지 않을 때 저장한 항목은 없음 → lexical 요청 시 미적중)
+- SQLite WAL 모드: writer 워커와 재인덱싱 스크립트가 같은 파일을 동시에 사용
+- 항목 수가 max_entries를 넘으면 마지막 사용 시각이 오래된 항목부터 삭제
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def text_hash(text: str) -> bytes:
+    """청크 텍스트 SHA-256 (32바이트)"""
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+
+class EmbeddingCache:
+    """청크 텍스트 해시 → 임베딩 영구 캐시 (스레드/프로세스 안전)"""
+
+    # 삭제 시 항목 수를 이 비율까지 줄임 (저장할 때마다 삭제하지 않도록)
+    EVICT_TARGET = 0.9
+    # SQLite 변수 개수 제한 대비 조회 단위
+    QUERY_CHUNK = 500
+
+    def __init__(self, db_path: Path, model_key: str, max_entries: int = 1_000_000):
+        self.db_path = Path(db_path)
+        self.model_key = model_key
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash BLOB NOT NULL,
+                    embedding BLOB NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    lexical_ids BLOB,
+                    lexical_weights BLOB,
+                    used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+            self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # ==================== 조회 / 저장 ====================
+
+    def get_many(self, texts: List[str], lexical: bool = False) -> List[Optional[Tuple]]:
+        """텍스트별 (임베딩 float32, 토큰 수, lexical 가중치 또는 None), 없으면 None
+
+        Args:
+            lexical: lexical 가중치가 없는 항목은 미적중으로 처리
+        """
+        hashes = [text_hash(text) for text in texts]
+        rows = {}
+        with self._lock:
+            for start in range(0, len(hashes), self.QUERY_CHUNK):
+                part = list(set(hashes[start:start + self.QUERY_CHUNK]))
+                placeholders = ",".join("?" * len(part))
+                cursor = self._conn.execute(
+                    f"SELECT text_hash, embedding, tokens, lexical_ids, lexical_weights FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_key, *part]
+                )
+                for digest, embedding, tokens, lexical_ids, lexical_weights in cursor:
+                    if lexical and lexical_ids is None:
+                        continue
+                    rows[digest] = (embedding, tokens, lexical_ids, lexical_weights)
+            if rows:
+                # LRU 사용 시각 갱신
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany("UPDATE embeddings SET used = ? WHERE model = ? AND text_hash = ?",
+                                           [(now, self.model_key, digest) for digest in rows])
+
+        results = []
+        for digest in hashes:
+            row = rows.get(digest)
+            if row is None:
+                results.append(None)
+                continue
+            embedding, tokens, lexical_ids, lexical_weights = row
+            weights = None
+            if lexical_ids is not None:
+                weights = (np.frombuffer(lexical_ids, dtype=np.int32),
+                           np.frombuffer(lexical_weights, dtype=np.float16).astype(np.float32))
+            results.append((np.frombuffer(embedding, dtype=np.float16).astype(np.float32), tokens, weights))
+
+        found = sum(1 for result in results if result is not None)
+        with self._lock:
+            self.hits += found
+            self.misses += len(results) - found
+        return results
+
+    def put_many(self, texts: List[str], embeddings: np.ndarray, token_counts: np.ndarray,
+                 lexical_weights: Optional[List] = None):
+        """인코딩 결과 저장 (같은 텍스트가 있으면 교체)"""
+        now = time.time()
+        rows = []
+        for i, text in enumerate(texts):
+            lexical_ids = lexical_values = None
+            if lexical_weights is not None and lexical_weights[i] is not None:
+                token_ids, token_weights = lexical_weights[i]
+                lexical_ids = np.asarray(token_ids, dtype=np.int32).tobytes()
+                lexical_values = np.asarray(token_weights, dtype=np.float16).tobytes()
+            rows.append((self.model_key, text_hash(text), np.asarray(embeddings[i], dtype=np.float16).tobytes(),
+                         int(token_counts[i]), lexical_ids, lexical_values, now))
+        if not rows:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._count += len(rows)  # 교체된 항목도 더하므로 상한 확인 시 다시 셈
+        except sqlite3.Error as e:
+            print(f"[EmbeddingCache] 캐시 저장 오류: {e}")
+            return
+        if self._count > self.max_entries:
+            self.evict()
+
+    def get_or_encode(self, texts: List[str], encode: Callable[[List[str]], Tuple],
+                      lexical: bool = False) -> Tuple[np.ndarray, np.ndarray, Optional[List], int]:
+        """캐시에 없는 텍스트만 encode로 인코딩하여 저장 후 전체 결과 반환
+
+        Args:
+            encode: texts -> (임베딩, 토큰 수, lexical 가중치 목록 또는 None) - EmbeddingClient.encode_with_lexical 등
+            lexical: lexical 가중치도 필요 (가중치가 없는 캐시 항목은 다시 인코딩)
+
+        Returns:
+            (임베딩 float32 [n, dim], 토큰 수 [n], lexical 가중치 목록 또는 None, 캐시 적중 수)
+            lexical 가중치는 lexical=True이고 인코딩에서 가중치를 계산했을 때만 반환
+        """
+        if not texts:
+            embeddings, token_counts, weights = encode(texts)
+            return embeddings, token_counts, weights, 0
+
+        cached = self.get_many(texts, lexical)
+        # 같은 텍스트가 여러 번 나오면 한 번만 인코딩
+        missing = list(dict.fromkeys(text for text, hit in zip(texts, cached) if hit is None))
+        encoded = {}
+        lexical_available = lexical
+        if missing:
+            embeddings, token_counts, weights = encode(missing)
+            if weights is None:
+                lexical_available = False
+            self.put_many(missing, embeddings, token_counts, weights)
+            for i, text in enumerate(missing):
+                encoded[text] = (embeddings[i], int(token_counts[i]), weights[i] if weights is not None else None)
+
+        results = [hit if hit is not None else encoded[text] for text, hit in zip(texts, cached)]
+        embeddings = np.vstack([result[0] for result in results]).astype(np.float32, copy=False)
+        token_counts = np.array([result[1] for result in results], dtype=np.int32)
+        weights = [result[2] for result in results] if lexical_available else None
+        return embeddings, token_counts, weights, len(texts) - sum(1 for hit in cached if hit is None)
+
+    # ==================== 관리 ====================
+
+    def evict(self, target_entries: Optional[int] = None) -> int:
+        """마지막 사용 시각이 오래된 항목부터 삭제하여 항목 수를 target_entries 이하로
+        (기본: max_entries × EVICT_TARGET, 다른 모델 키의 항목도 함께 셈)
+
+        Returns:
+            삭제한 항목 수
+        """
+        if target_entries is None:
+            target_entries = int(self.max_entries * self.EVICT_TARGET)
+        try:
+            with self._lock, self._conn:
+                self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                excess = self._count - target_entries
+                if excess <= 0:
+                    return 0
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY used LIMIT ?)",
+                    (excess,)
+                )
+                self._count -= excess
+        except sqlite3.Error as e:
+            print(f"[EmbeddingCache] 캐시 정리 오류: {e}")
+            return 0
+        print(f"[EmbeddingCache] 오래된 항목 {excess}개 삭제 (현재 {self._count}개)")
+        return excess
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "path": str(self.db_path),
+                "model": self.model_key,
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,567 @@
+"""
+임베딩 서버 (호스트당 bge-m3 1개, 동시 요청 마이크로 배치)
+
+API/인덱싱 프로세스마다 SentenceTransformer.encode를 직접 호출하면 프로세스마다 모델이 올라가고,
+동시 질의도 하나씩 인코딩됩니다. 임베딩 서버 프로세스가 모델을 갖고, 다른 프로세스는
+EmbeddingClient로 localhost HTTP 요청을 보냅니다.
+
+- 마이크로 배치: 요청을 최대 EMBEDDING_BATCH_WAIT_MS 동안 모아 EMBEDDING_MAX_BATCH개 단위로
+  한 번에 패딩하여 인코딩 (동시 질의 여러 개 = encode 1회)
+- 우선순위: 질의(PRIORITY_QUERY)가 문서 청크(PRIORITY_DOCUMENT)보다 먼저 배치에 들어감
+  (대용량 문서 인덱싱 중에도 질의 인코딩이 뒤로 밀리지 않음, 문서 요청은 배치 크기 단위로 나눠 대기)
+- 길이 버킷: 배치 안에서 토큰 수로 정렬해 (최대 길이 × 개수)가 EMBEDDING_BATCH_TOKENS 이하가 되도록 나눠 인코딩
+  (긴 표 청크와 짧은 텍스트가 한 배치에서 같은 길이로 패딩되지 않음, 결과는 원래 순서로 복원)
+  max_seq_length(EMBEDDING_MAX_SEQ_LENGTH)를 넘는 텍스트는 잘리며, 자르기 전 토큰 수를 함께 반환
+- lexical 가중치 (LEXICAL_ENABLED): bge-m3의 sparse 헤드를 같은 forward의 토큰별 은닉 상태에 적용해
+  텍스트별 (토큰 id, 가중치)를 함께 반환 (같은 토큰은 최대값, 특수 토큰 제외 - 모델을 두 번 실행하지 않음)
+- 응답: float32 바이너리 (shape는 X-Embedding-Shape, 텍스트별 토큰 수는 X-Embedding-Tokens 헤더,
+  모델 식별자는 X-Embedding-Model 헤더 - 클라이언트가 응답마다 같은 모델/백엔드인지 확인)
+  lexical 요청이면 임베딩 뒤에 CSR 형식(offsets int32 [n+1], 토큰 id int32 [nnz], 가중치 float32 [nnz])을
+  이어 붙이고 nnz는 X-Embedding-Lexical 헤더
+- 클라이언트 대체 경로: 서버에 연결할 수 없거나 모델/lexical 지원이 다르면 프로세스 내 모델로 인코딩하고,
+  EMBEDDING_SERVER_RETRY_INTERVAL초 뒤에 /health로 모델/lexical 지원을 다시 확인한 후 서버 사용
+
+모든 임베딩은 L2 정규화되어 반환됩니다 (코사인 유사도 검색 기준).
+"""
+import heapq
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from config import EMBEDDING_BATCH_TOKENS
+
+# 우선순위 (작을수록 먼저)
+PRIORITY_QUERY = 0
+PRIORITY_DOCUMENT = 10
+
+# 텍스트 1개의 lexical 가중치: (토큰 id int32 오름차순, 가중치 float32)
+LexicalWeights = Tuple[np.ndarray, np.ndarray]
+
+
+class MicroBatcher:
+    """요청을 잠깐 모아 한 번에 인코딩하는 배치 스레드"""
+
+    def __init__(self, encode_batch: Callable[[List[str]], Tuple], max_batch: int = 32,
+                 max_wait_ms: float = 5.0):
+        """
+        Args:
+            encode_batch: texts -> (임베딩, 텍스트별 토큰 수, lexical 가중치 목록 또는 None) - encode_bucketed 결과
+        """
+        self.encode_batch = encode_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+
+        self._condition = threading.Condition()
+        self._queue: List = []  # heap: (priority, seq, texts, future)
+        self._seq = itertools.count()
+        self._stopped = False
+
+        self.batches = 0
+        self.texts = 0
+        self.requests = 0
+        self.encode_ms = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str], priority: int = PRIORITY_QUERY) -> Future:
+        """인코딩 요청 (배치 크기보다 크면 나눠서 대기열에 넣고 결과를 합침)
+
+        Returns:
+            Future: (임베딩, 텍스트별 토큰 수, lexical 가중치 목록 또는 None)
+        """
+        parts = []
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("임베딩 배치 처리가 종료되었습니다")
+            for start in range(0, len(texts), self.max_batch):
+                future = Future()
+                heapq.heappush(self._queue, (priority, next(self._seq), texts[start:start + self.max_batch], future))
+                parts.append(future)
+            self.requests += 1
+            self._condition.notify()
+
+        if len(parts) == 1:
+            return parts[0]
+        combined = Future()
+        remaining = [len(parts)]
+        lock = threading.Lock()
+
+        def on_part_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                results = [part.result() for part in parts]
+                lexical = [w for r in results for w in r[2]] if results[0][2] is not None else None
+                combined.set_result((np.vstack([r[0] for r in results]), np.concatenate([r[1] for r in results]), lexical))
+            except BaseException as e:
+                combined.set_exception(e)
+
+        for part in parts:
+            part.add_done_callback(on_part_done)
+        return combined
+
+    def _take_batch(self) -> List:
+        """대기열에서 최대 max_batch개 텍스트 분량을 꺼냄 (첫 요청 후 max_wait 동안 더 기다림)"""
+        with self._condition:
+            while not self._queue and not self._stopped:
+                self._condition.wait()
+            if not self._queue:
+                return []
+            deadline = time.time() + self.max_wait
+            while sum(len(entry[2]) for entry in self._queue) < self.max_batch and not self._stopped:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch, size = [], 0
+            while self._queue and (not batch or size + len(self._queue[0][2]) <= self.max_batch):
+                entry = heapq.heappop(self._queue)
+                batch.append(entry)
+                size += len(entry[2])
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            texts = [text for entry in batch for text in entry[2]]
+            start = time.time()
+            try:
+                embeddings, token_counts, lexical = self.encode_batch(texts)
+            except BaseException as e:
+                for entry in batch:
+                    entry[3].set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            self.encode_ms += (time.time() - start) * 1000
+            offset = 0
+            for entry in batch:
+                end = offset + len(entry[2])
+                entry[3].set_result((embeddings[offset:end], token_counts[offset:end],
+                                     lexical[offset:end] if lexical is not None else None))
+                offset = end
+
+    def stop(self, timeout: Optional[float] = None):
+        """남은 요청을 모두 처리한 뒤 종료"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            queued = sum(len(entry[2]) for entry in self._queue)
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts": self.texts,
+            "queued_texts": queued,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "avg_encode_ms": round(self.encode_ms / self.batches, 1) if self.batches else 0.0,
+        }
+
+
+def lexical_weights(input_ids: np.ndarray, token_weights: np.ndarray, special_ids: np.ndarray) -> LexicalWeights:
+    """토큰별 가중치 → 토큰 id별 최대 가중치 (특수 토큰 / 0 이하 제외, id 오름차순)"""
+    keep = (token_weights > 0) & ~np.isin(input_ids, special_ids)
+    ids, weights = input_ids[keep], token_weights[keep]
+    order = np.lexsort((-weights, ids))  # id 오름차순, 같은 id는 가중치 내림차순
+    ids, weights = ids[order], weights[order]
+    first = np.ones(len(ids), dtype=bool)
+    first[1:] = ids[1:] != ids[:-1]
+    return ids[first].astype(np.int32), weights[first].astype(np.float32)
+
+
+def _encode_with_lexical(model, lexical_head, texts: List[str]) -> Tuple[np.ndarray, List[LexicalWeights]]:
+    """임베딩 + lexical 가중치 (forward 1회: 문장 임베딩과 토큰별 은닉 상태를 함께 사용)"""
+    import torch
+
+    features = model.tokenize(texts)
+    features = {key: value.to(model.device) for key, value in features.items()}
+    with torch.no_grad():
+        output = model.forward(features)
+        embeddings = torch.nn.functional.normalize(output["sentence_embedding"], p=2, dim=1)
+        token_weights = torch.relu(lexical_head(output["token_embeddings"])).squeeze(-1)
+
+    input_ids = features["input_ids"].cpu().numpy()
+    mask = features["attention_mask"].cpu().numpy().astype(bool)
+    token_weights = token_weights.float().cpu().numpy()
+    special_ids = np.array(model.tokenizer.all_special_ids)
+    lexical = [lexical_weights(input_ids[row][mask[row]], token_weights[row][mask[row]], special_ids)
+               for row in range(len(texts))]
+    return embeddings.float().cpu().numpy(), lexical
+
+
+def encode_bucketed(model, texts: List[str], batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+                    lexical_head=None) -> Tuple[np.ndarray, np.ndarray, Optional[List[LexicalWeights]]]:
+    """길이 버킷 배치 인코딩 (L2 정규화)
+
+    토큰 수로 정렬한 뒤 (배치 최대 길이 × 개수) ≤ batch_tokens가 되도록 묶어 배치마다 패딩 1번으로 인코딩하고,
+    원래 순서로 복원합니다. (짧은 텍스트는 큰 배치, 긴 표 청크는 작은 배치)
+
+    Args:
+        lexical_head: load_lexical_head 결과 (지정하면 같은 forward에서 lexical 가중치도 계산)
+
+    Returns:
+        (임베딩 [n, dim] float32, 자르기 전 토큰 수 [n] int32 - 특수 토큰 포함, max_seq_length 초과분은 잘림,
+         lexical 가중치 목록 - lexical_head가 없으면 None)
+    """
+    token_counts = np.array(
+        [len(ids) for ids in model.tokenizer(texts, add_special_tokens=True, truncation=False, verbose=False)["input_ids"]],
+        dtype=np.int32
+    )
+    padded = np.minimum(token_counts, model.max_seq_length)
+    order = np.argsort(padded, kind="stable")
+
+    embeddings = [None] * len(texts)
+    lexical = [None] * len(texts) if lexical_head is not None else None
+    start = 0
+    while start < len(order):
+        # 오름차순이므로 마지막으로 추가한 텍스트 길이가 배치 패딩 길이
+        end = start + 1
+        while end < len(order) and padded[order[end]] * (end - start + 1) <= batch_tokens:
+            end += 1
+        batch = order[start:end]
+        group = [texts[i] for i in batch]
+        if lexical_head is None:
+            vectors = model.encode(group, batch_size=len(batch), normalize_embeddings=True,
+                                   show_progress_bar=False, convert_to_numpy=True)
+        else:
+            vectors, weights = _encode_with_lexical(model, lexical_head, group)
+            for i, item in zip(batch, weights):
+                lexical[i] = item
+        for i, vector in zip(batch, vectors):
+            embeddings[i] = vector
+        start = end
+    return np.asarray(embeddings, dtype=np.float32), token_counts, lexical
+
+
+def _pack_lexical(lexical: List[LexicalWeights]) -> Tuple[bytes, int]:
+    """lexical 가중치 목록 → CSR 바이너리 (offsets, 토큰 id, 가중치), nnz"""
+    offsets = np.zeros(len(lexical) + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum([len(ids) for ids, _ in lexical])
+    ids = np.concatenate([ids for ids, _ in lexical]).astype(np.int32) if lexical else np.zeros(0, dtype=np.int32)
+    weights = np.concatenate([w for _, w in lexical]).astype(np.float32) if lexical else np.zeros(0, dtype=np.float32)
+    return offsets.tobytes() + ids.tobytes() + weights.tobytes(), int(offsets[-1])
+
+
+def _unpack_lexical(buffer: bytes, rows: int, nnz: int) -> List[LexicalWeights]:
+    offsets = np.frombuffer(buffer, dtype=np.int32, count=rows + 1)
+    ids = np.frombuffer(buffer, dtype=np.int32, count=nnz, offset=(rows + 1) * 4)
+    weights = np.frombuffer(buffer, dtype=np.float32, count=nnz, offset=(rows + 1 + nnz) * 4)
+    return [(ids[start:end], weights[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def truncation_stats(token_counts: np.ndarray, max_seq_length: int) -> Dict:
+    """max_seq_length 초과로 잘린 텍스트 수 / 잘린 토큰 수 (청크 크기 조정용)"""
+    over = token_counts[token_counts > max_seq_length] - max_seq_length
+    return {
+        "texts": int(len(token_counts)),
+        "max_seq_length": int(max_seq_length),
+        "truncated": int(len(over)),
+        "truncated_tokens": int(over.sum()) if len(over) else 0,
+        "max_truncated_tokens": int(over.max()) if len(over) else 0,
+        "max_tokens": int(token_counts.max()) if len(token_counts) else 0,
+    }
+
+
+class EmbeddingServer:
+    """임베딩 HTTP 서버 (POST /encode, GET /health)"""
+
+    def __init__(self, model, model_name: str, max_batch: int = 32, max_wait_ms: float = 5.0, lexical_head=None):
+        """
+        Args:
+            model_name: 모델 식별자 (embedding_model_id, 클라이언트가 같은 모델/백엔드인지 확인)
+            lexical_head: 지정하면 모든 배치에서 lexical 가중치도 계산 (요청에 "lexical": true가 있으면 응답에 포함)
+        """
+        self.model_name = model_name
+        self.lexical = lexical_head is not None
+        self.batcher = MicroBatcher(lambda texts: encode_bucketed(model, texts, lexical_head=lexical_head),
+                                    max_batch, max_wait_ms)
+        self.active = 0
+        self._lock = threading.Lock()
+        self.httpd: Optional[ThreadingHTTPServer] = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # 요청마다 로그를 남기지 않음 (통계는 /health)
+
+            def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, status: int, payload: Dict):
+                self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), "application/json")
+
+            def do_GET(self):
+                if self.path != "/health":
+                    return self._send_json(404, {"error": "Not found"})
+                self._send_json(200, {"status": "healthy", "model": server.model_name, "lexical": server.lexical,
+                                      **server.batcher.stats()})
+
+            def do_POST(self):
+                if self.path != "/encode":
+                    return self._send_json(404, {"error": "Not found"})
+                with server._lock:
+                    server.active += 1
+                try:
+                    data = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                    texts = data.get("texts") or []
+                    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                        return self._send_json(400, {"error": "texts must be a list of strings"})
+                    with_lexical = bool(data.get("lexical"))
+                    if with_lexical and not server.lexical:
+                        return self._send_json(400, {"error": "lexical weights are not enabled on this server"})
+                    if not texts:
+                        headers = {"X-Embedding-Shape": "0,0", "X-Embedding-Tokens": "",
+                                   "X-Embedding-Model": server.model_name}
+                        if with_lexical:
+                            headers["X-Embedding-Lexical"] = "0"
+                        return self._send(200, np.zeros(1, dtype=np.int32).tobytes() if with_lexical else b"",
+                                          "application/octet-stream", headers)
+                    embeddings, token_counts, lexical = server.batcher.submit(
+                        texts, int(data.get("priority", PRIORITY_QUERY))).result()
+                    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+                    body = embeddings.tobytes()
+                    headers = {
+                        "X-Embedding-Shape": f"{embeddings.shape[0]},{embeddings.shape[1]}",
+                        "X-Embedding-Tokens": ",".join(str(int(count)) for count in token_counts),
+                        "X-Embedding-Model": server.model_name
+                    }
+                    if with_lexical:
+                        lexical_body, nnz = _pack_lexical(lexical)
+                        body += lexical_body
+                        headers["X-Embedding-Lexical"] = str(nnz)
+                    self._send(200, body, "application/octet-stream", headers)
+                except Exception as e:
+                    self._send_json(500, {"error": str(e)})
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+        return Handler
+
+    def serve(self, sock=None, host: str = "127.0.0.1", port: int = 5002):
+        """요청 처리 (shutdown() 호출 시 반환)
+
+        Args:
+            sock: 미리 열어 둔 listen 소켓 (serve.py 마스터가 fork 전에 생성), 없으면 host:port에 바인드
+        """
+        if sock is not None:
+            self.httpd = ThreadingHTTPServer(sock.getsockname()[:2], self._handler(), bind_and_activate=False)
+            self.httpd.socket.close()
+            self.httpd.socket = sock
+        else:
+            self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        address = self.httpd.socket.getsockname()
+        print(f"[Embedding] 임베딩 서버 시작: http://{address[0]}:{address[1]} ({self.model_name}, "
+              f"배치 {self.batcher.max_batch}개 / {self.batcher.max_wait * 1000:.0f}ms"
+              f"{', lexical 가중치 포함' if self.lexical else ''})")
+        self.httpd.serve_forever()
+
+    def shutdown(self, timeout: float = 30.0):
+        """새 요청 수신 중단 → 진행 중 요청 완료 대기 → 배치 스레드 종료"""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+        deadline = time.time() + timeout
+        while self.active > 0 and time.time() < deadline:
+            time.sleep(0.05)
+        self.batcher.stop(max(0.0, deadline - time.time()))
+        print(f"[Embedding] 임베딩 서버 종료 ({self.batcher.stats()})")
+
+
+class EmbeddingServerMismatch(ValueError):
+    """임베딩 서버의 모델/백엔드가 클라이언트와 다름 (다른 벡터 공간의 결과를 쓰지 않음)"""
+
+
+class EmbeddingClient:
+    """임베딩 서버 클라이언트 (서버에 연결할 수 없으면 프로세스 내 모델로 인코딩)"""
+
+    # 문서 인코딩 요청 1회에 보내는 최대 텍스트 수 (응답 타임아웃 기준)
+    REQUEST_CHUNK = 256
+
+    def __init__(self, model_name: str, device: str = "cpu", server_url: Optional[str] = None,
+                 timeout: float = 120.0, retry_interval: float = 30.0, backend: str = "fp32", lexical: bool = False):
+        """
+        Args:
+            lexical: encode_with_lexical에서 lexical 가중치도 계산 (lexical 헤드를 로드할 수 없으면 False로 바뀜)
+        """
+        from .models import embedding_model_id
+
+        self.model_name = model_name
+        self.backend = backend
+        self.model_id = embedding_model_id(model_name, backend)
+        self.device = device
+        self.server_url = server_url.rstrip("/") if server_url else None
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.lexical = lexical
+
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._server_down_until = 0.0
+        self._server_verified = False  # /health로 모델/lexical 지원을 확인함 (오류/불일치 시 False → 재시도 때 다시 확인)
+        self._local_model = None
+        self._lexical_head = None
+        self.remote_texts = 0
+        self.local_texts = 0
+        self.fallbacks = 0
+
+        self._server_verified = self._server_healthy()
+        if not self._server_verified:
+            # 서버가 없으면 시작할 때 모델을 로드 (첫 질의가 모델 로드를 기다리지 않도록)
+            if self.server_url:
+                print(f"[Embedding] 임베딩 서버에 연결할 수 없음 ({self.server_url}), 프로세스 내 모델 사용")
+                self._server_down_until = time.time() + self.retry_interval
+            self._get_local_model()
+
+    def _server_healthy(self) -> bool:
+        if not self.server_url:
+            return False
+        try:
+            response = self._session.get(f"{self.server_url}/health", timeout=2)
+            health = response.json() if response.status_code == 200 else {}
+            if health.get("model") != self.model_id:
+                # 다른 모델/백엔드의 벡터를 섞지 않도록 서버를 쓰지 않음
+                print(f"[Embedding] 임베딩 서버의 모델이 다름: {health.get('model')} (필요: {self.model_id})")
+            elif self.lexical and not health.get("lexical"):
+                print(f"[Embedding] 임베딩 서버에서 lexical 가중치를 사용할 수 없음 (서버의 LEXICAL_ENABLED 확인)")
+            else:
+                print(f"[Embedding] 임베딩 서버 사용: {self.server_url}")
+                return True
+        except (requests.RequestException, ValueError):
+            pass
+        return False
+
+    def _server_available(self) -> bool:
+        """임베딩 서버 사용 여부 (사용 중지 후 재시도 시점이 지나면 /health로 모델/lexical 지원을 다시 확인)"""
+        if not self.server_url or time.time() < self._server_down_until:
+            return False
+        if self._server_verified:
+            return True
+        if self._server_healthy():
+            self._server_verified = True
+            return True
+        self._server_down_until = time.time() + self.retry_interval
+        return False
+
+    def _get_local_model(self):
+        with self._lock:
+            if self._local_model is None:
+                from .models import load_embedding_model
+                self._local_model = load_embedding_model(self.model_name, self.device, self.backend)
+            if self.lexical and self._lexical_head is None:
+                from .models import load_lexical_head
+                try:
+                    self._lexical_head = load_lexical_head(self.model_name, self.device)
+                except Exception as e:
+                    print(f"[Embedding] lexical 가중치 헤드 로드 실패, lexical 가중치 비활성화: {e}")
+                    self.lexical = False
+            return self._local_model
+
+    def _encode_remote(self, texts: List[str], priority: int, lexical: bool) -> Tuple:
+        parts, token_counts, weights = [], [], []
+        for start in range(0, len(texts), self.REQUEST_CHUNK):
+            payload = {"texts": texts[start:start + self.REQUEST_CHUNK], "priority": priority}
+            if lexical:
+                payload["lexical"] = True
+            response = self._session.post(f"{self.server_url}/encode", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            server_model = response.headers.get("X-Embedding-Model")
+            if server_model != self.model_id:
+                raise EmbeddingServerMismatch(f"임베딩 서버의 모델이 다름: {server_model} (필요: {self.model_id})")
+            rows, dim = (int(value) for value in response.headers["X-Embedding-Shape"].split(","))
+            embedding_bytes = rows * dim * 4
+            parts.append(np.frombuffer(response.content, dtype=np.float32, count=rows * dim).reshape(rows, dim))
+            token_counts.append(np.array([int(count) for count in response.headers["X-Embedding-Tokens"].split(",")],
+                                         dtype=np.int32))
+            if lexical:
+                weights.extend(_unpack_lexical(response.content[embedding_bytes:], rows,
+                                               int(response.headers["X-Embedding-Lexical"])))
+        return np.vstack(parts), np.concatenate(token_counts), weights if lexical else None
+
+    def encode(self, texts, priority: int = PRIORITY_QUERY) -> np.ndarray:
+        """L2 정규화된 임베딩 (str이면 1차원, 리스트면 2차원 배열)"""
+        single = isinstance(texts, str)
+        if not single and not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        embeddings, _ = self.encode_with_tokens([texts] if single else list(texts), priority)
+        return embeddings[0] if single else embeddings
+
+    def encode_with_tokens(self, texts: List[str], priority: int = PRIORITY_QUERY) -> Tuple[np.ndarray, np.ndarray]:
+        """L2 정규화된 임베딩 + 텍스트별 토큰 수 (자르기 전, truncation_stats 입력)"""
+        embeddings, token_counts, _ = self._encode(texts, priority, lexical=False)
+        return embeddings, token_counts
+
+    def encode_with_lexical(self, texts: List[str], priority: int = PRIORITY_QUERY) -> Tuple:
+        """임베딩 + 텍스트별 토큰 수 + lexical 가중치 목록 (같은 forward, lexical을 쓸 수 없으면 마지막 값은 None)"""
+        return self._encode(texts, priority, lexical=self.lexical)
+
+    def _encode(self, texts: List[str], priority: int, lexical: bool) -> Tuple:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int32), [] if lexical else None
+        # 길이순으로 보내면 서버 요청/배치마다 비슷한 길이끼리 묶임 (결과는 원래 순서로 복원)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batch = [texts[i] for i in order]
+
+        result = None
+        if self._server_available():
+            try:
+                result = self._encode_remote(batch, priority, lexical)
+                self.remote_texts += len(batch)
+            except (requests.RequestException, KeyError, ValueError) as e:
+                # 재시도 전에 /health로 모델/lexical 지원을 다시 확인
+                self._server_verified = False
+                self._server_down_until = time.time() + self.retry_interval
+                self.fallbacks += 1
+                print(f"[Embedding] 임베딩 서버 오류, 프로세스 내 모델로 인코딩 ({self.retry_interval:.0f}초 후 재시도): {e}")
+        if result is None:
+            model = self._get_local_model()
+            result = encode_bucketed(model, batch, lexical_head=self._lexical_head if lexical and self.lexical else None)
+            self.local_texts += len(batch)
+
+        embeddings = np.empty_like(result[0])
+        token_counts = np.empty_like(result[1])
+        embeddings[order] = result[0]
+        token_counts[order] = result[1]
+        weights = None
+        if result[2] is not None:
+            weights = [None] * len(texts)
+            for position, index in enumerate(order):
+                weights[index] = result[2][position]
+        return embeddings, token_counts, weights
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.model_id,
+            "lexical": self.lexical,
+            "server_url": self.server_url,
+            "server_available": bool(self.server_url) and self._server_verified and time.time() >= self._server_down_until,
+            "remote_texts": self.remote_texts,
+            "local_texts": self.local_texts,
+            "fallbacks": self.fallbacks,
+            "local_model_loaded": self._local_model is not None,
+        }
@@ -0,0 +1,297 @@
+"""
+Semantic Metadata Tagging - 백그라운드 엔티티 추출 파이프라인
+
+index_document는 임베딩 저장 직후 청크 ID를 큐에 넣고 바로 반환하며,
+엔티티 태깅은 백그라운드 스레드가 처리합니다 (업로드 지연 시간에 LLM 시간 미포함).
+
+- date_value / money: 정규식으로 추출 (LLM 호출 없음)
+- 나머지 ENTITY_TYPES: ENTITY_EXTRACTION_BATCH_SIZE개 청크를 Ollama 호출 1회로 처리
+- 결과는 collection.update로 청크 메타데이터에 엔티티 키만 기록 (LLM 호출 중 텍스트가 바뀐 청크는 제외)
+    {"entity_person": "홍길동, 김철수", "entity_money": "1,000만원", ..., "entities_extracted": True}
+  (ChromaDB 메타데이터는 스칼라 값만 허용하므로 쉼표로 연결한 문자열로 저장)
+- 대기 중인 배치는 JSON 파일에 저장되어 서버 재시작 시 이어서 처리
+"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .llm_scheduler import PRIORITY_BACKGROUND
+
+
+# ==================== 정규식 추출기 ====================
+
+_DATE_PATTERNS = [
+    re.compile(r'\d{4}\s*년\s*\d{1,2}\s*월(?:\s*\d{1,2}\s*일)?'),   # 2025년 1월 (15일)
+    re.compile(r'\d{1,2}\s*월\s*\d{1,2}\s*일'),                     # 1월 15일
+    re.compile(r'\d{4}[.\-/]\d{1,2}[.\-/]\d{1,2}'),                 # 2025.01.15, 2025-01-15
+    re.compile(r'\d+\s*(?:개월|주일|주|일간|년간)'),                 # 3개월, 2주
+]
+
+_MONEY_PATTERNS = [
+    re.compile(r'\d[\d,]*(?:\.\d+)?\s*(?:조|억|천만|백만|만)\s*(?:\d[\d,]*\s*(?:천만|백만|만)\s*)?원'),  # 1억 5천만원, 1,000만원
+    re.compile(r'\d[\d,]*(?:\.\d+)?\s*원'),                          # 50,000원
+    re.compile(r'[$₩€]\s*\d[\d,]*(?:\.\d+)?'),                       # $500, ₩10,000
+    re.compile(r'\d[\d,]*(?:\.\d+)?\s*(?:달러|USD|KRW)'),            # 500달러
+]
+
+# 정규식으로 처리하여 LLM 프롬프트에서 제외하는 유형
+REGEX_ENTITY_TYPES = {"date_value", "money"}
+
+
+def _unique(values: Iterable[str]) -> List[str]:
+    seen = set()
+    result = []
+    for value in values:
+        value = value.strip()
+        if value and value not in seen:
+            seen.add(value)
+            result.append(value)
+    return result
+
+
+def _find_all(patterns: List[re.Pattern], text: str) -> List[str]:
+    """여러 패턴의 매칭 결과 (겹치는 구간은 먼저 매칭된 패턴 우선)"""
+    spans = []
+    for pattern in patterns:
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if any(start < s_end and s_start < end for s_start, s_end in spans):
+                continue
+            spans.append((start, end))
+    spans.sort()
+    return _unique(text[start:end] for start, end in spans)
+
+
+def extract_regex_entities(text: str) -> Dict[str, List[str]]:
+    """LLM 없이 추출 가능한 엔티티 (date_value, money)"""
+    return {
+        "date_value": _find_all(_DATE_PATTERNS, text),
+        "money": _find_all(_MONEY_PATTERNS, text),
+    }
+
+
+def entities_to_metadata(entities: Dict[str, List[str]]) -> Dict:
+    """엔티티 딕셔너리를 ChromaDB 메타데이터 형식으로 변환"""
+    metadata = {f"entity_{entity_type}": ", ".join(values) for entity_type, values in entities.items() if values}
+    metadata["entities_extracted"] = True
+    return metadata
+
+
+# ==================== 백그라운드 큐 ====================
+
+class EntityExtractionQueue:
+    """엔티티 추출 작업 큐 (백그라운드 스레드 1개, JSON 파일로 영속화)"""
+
+    # LLM 프롬프트에 넣을 청크 최대 길이
+    MAX_CHUNK_CHARS = 1500
+
+    def __init__(self, queue_path: Path, collection, llm, entity_types: List[str], batch_size: int = 5,
+                 llm_timeout: float = 300.0):
+        self.queue_path = Path(queue_path)
+        self.collection = collection
+        self.llm = llm  # LLMGateway (RAGSystem과 연결 풀 공유)
+        self.llm_timeout = llm_timeout
+        self.entity_types = list(entity_types)
+        self.llm_entity_types = [t for t in self.entity_types if t not in REGEX_ENTITY_TYPES]
+        self.batch_size = max(1, batch_size)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._batches: List[Dict] = []  # [{"file_id": ..., "chunk_ids": [...]}]
+        self._processing: Optional[Dict] = None  # 처리 중인 배치 (맨 앞 배치의 복사본)
+        self._thread: Optional[threading.Thread] = None
+
+        self._load()
+
+    # ==================== 영속화 ====================
+
+    def _load(self):
+        if not self.queue_path.exists():
+            return
+        try:
+            with open(self.queue_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._batches = data.get("batches", [])
+            if self._batches:
+                print(f"[Entity] 미완료 배치 {len(self._batches)}개 복구 (재시작 후 이어서 처리)")
+        except Exception as e:
+            print(f"[Entity] 큐 파일 로드 오류: {e}")
+            self._batches = []
+
+    def _save(self):
+        """큐 파일 저장 (self._lock 보유 상태에서 호출)"""
+        tmp_path = self.queue_path.with_suffix(self.queue_path.suffix + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": 1, "batches": self._batches}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.queue_path)
+        except Exception as e:
+            print(f"[Entity] 큐 파일 저장 오류: {e}")
+
+    # ==================== 큐 조작 ====================
+
+    def start(self):
+        """백그라운드 작업 스레드 시작"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="entity-extraction", daemon=True)
+        self._thread.start()
+        if self._batches:
+            self._wakeup.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def enqueue(self, file_id: str, chunk_ids: List[str]):
+        """문서의 청크를 배치 단위로 큐에 추가
+        
+        같은 문서의 대기 배치는 유지하고 아직 대기 중이 아닌 청크만 추가
+        (재인덱싱은 바뀐 청크만 넘기므로 대체하면 첫 추출을 기다리던 나머지 청크가 빠짐)
+        처리 중인 배치의 청크는 대기 중으로 보지 않음: 텍스트가 바뀌었으면 그 결과는 버려지므로 다시 추가
+        """
+        with self._lock:
+            waiting = set()
+            for batch in self._batches:
+                if batch["file_id"] == file_id and batch != self._processing:
+                    waiting.update(batch["chunk_ids"])
+            new_ids = [cid for cid in dict.fromkeys(chunk_ids) if cid not in waiting]
+            for i in range(0, len(new_ids), self.batch_size):
+                self._batches.append({"file_id": file_id, "chunk_ids": new_ids[i:i + self.batch_size]})
+            if new_ids:
+                self._save()
+            pending = len(self._batches)
+        print(f"[Entity] 엔티티 추출 대기열 추가: {len(new_ids)}개 청크 "
+              f"(이미 대기 중 {len(chunk_ids) - len(new_ids)}개, 대기 배치 {pending}개)")
+        self._wakeup.set()
+
+    def discard_chunks(self, chunk_ids: Iterable[str]):
+        """삭제된 청크를 대기 배치에서 제거"""
+        removed = set(chunk_ids)
+        with self._lock:
+            batches = []
+            for batch in self._batches:
+                remaining = [cid for cid in batch["chunk_ids"] if cid not in removed]
+                if remaining:
+                    batches.append({"file_id": batch["file_id"], "chunk_ids": remaining})
+            if batches != self._batches:
+                self._batches = batches
+                self._save()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(batch["chunk_ids"]) for batch in self._batches)
+
+    # ==================== 작업 처리 ====================
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                batch = dict(self._batches[0]) if self._batches else None
+                self._processing = batch
+            if batch is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            try:
+                self._process_batch(batch["chunk_ids"])
+            except Exception as e:
+                # 처리 실패한 배치는 버리지 않고 잠시 후 재시도 (Ollama 미실행 등)
+                print(f"[Entity] 배치 처리 오류, 30초 후 재시도: {e}")
+                with self._lock:
+                    self._processing = None
+                self._stop.wait(30)
+                continue
+
+            with self._lock:
+                # 처리 중 enqueue/discard로 큐가 바뀌었을 수 있으므로 같은 배치일 때만 제거
+                if self._batches and self._batches[0] == batch:
+                    self._batches.pop(0)
+                    self._save()
+                self._processing = None
+
+    def _process_batch(self, chunk_ids: List[str]):
+        existing = self.collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+        ids = existing.get("ids") or []
+        if not ids:
+            return
+
+        texts = existing["documents"]
+        text_hashes = [(metadata or {}).get("text_hash") for metadata in existing["metadatas"]]
+        entities = [extract_regex_entities(text or "") for text in texts]
+
+        if self.llm_entity_types:
+            llm_entities = self._extract_with_llm(texts)
+            for chunk_entities, extracted in zip(entities, llm_entities):
+                chunk_entities.update(extracted)
+
+        # LLM 호출 중 재인덱싱으로 텍스트가 바뀌었거나 삭제된 청크는 결과를 버림 (바뀐 청크는 다시 큐에 추가됨)
+        current = self.collection.get(ids=ids, include=["metadatas"])
+        current_metadatas = {chunk_id: (metadata or {})
+                             for chunk_id, metadata in zip(current["ids"], current["metadatas"])}
+        update_ids, metadatas = [], []
+        for chunk_id, text_hash, chunk_entities in zip(ids, text_hashes, entities):
+            metadata = current_metadatas.get(chunk_id)
+            if metadata is None or metadata.get("text_hash") != text_hash:
+                continue
+            # 엔티티 키만 갱신 (update는 키 단위 병합 - 처리 중 바뀐 파일명/날짜 등 다른 메타데이터를 덮어쓰지 않음)
+            # 이번에 나오지 않은 유형의 이전 값은 비움 (ChromaDB 메타데이터는 None 불가)
+            entity_metadata = {key: "" for key in metadata if key.startswith("entity_")}
+            entity_metadata.update(entities_to_metadata(chunk_entities))
+            update_ids.append(chunk_id)
+            metadatas.append(entity_metadata)
+
+        skipped = len(ids) - len(update_ids)
+        if update_ids:
+            self.collection.update(ids=update_ids, metadatas=metadatas)
+        tagged = sum(1 for metadata in metadatas if any(metadata[key] for key in metadata if key.startswith("entity_")))
+        print(f"[Entity] 엔티티 태깅 완료: {len(update_ids)}개 청크 중 {tagged}개에서 엔티티 발견"
+              + (f" (처리 중 바뀌거나 삭제된 청크 {skipped}개 제외)" if skipped else ""))
+
+    def _extract_with_llm(self, texts: List[str]) -> List[Dict[str, List[str]]]:
+        """청크 배치를 Ollama 호출 1회로 처리"""
+        chunk_blocks = "\n\n".join(
+            f"[청크 {i}]\n{(text or '')[:self.MAX_CHUNK_CHARS]}" for i, text in enumerate(texts)
+        )
+        example = {t: [] for t in self.llm_entity_types}
+        prompt = f"""다음 청크들에서 엔티티를 추출하세요.
+추출할 유형: {", ".join(self.llm_entity_types)}
+문서에 실제로 나온 표현만 그대로 추출하고, 없으면 빈 배열로 두세요.
+
+{chunk_blocks}
+
+JSON으로만 답하세요. 형식: {{"0": {json.dumps(example)}, "1": ...}}"""
+
+        response = self.llm.chat(
+            [{"role": "user", "content": prompt}],
+            options={"temperature": 0, "num_predict": 200 * len(texts)},
+            timeout=self.llm_timeout,
+            priority=PRIORITY_BACKGROUND,  # 사용자 질의가 먼저 실행됨
+            format="json"
+        )
+
+        try:
+            parsed = json.loads(response["message"]["content"])
+        except (ValueError, TypeError) as e:
+            print(f"[Entity] LLM 응답 파싱 실패, 정규식 결과만 사용: {e}")
+            parsed = {}
+
+        results = []
+        for i in range(len(texts)):
+            chunk_result = parsed.get(str(i)) if isinstance(parsed, dict) else None
+            extracted = {}
+            for entity_type in self.llm_entity_types:
+                values = chunk_result.get(entity_type) if isinstance(chunk_result, dict) else None
+                if isinstance(values, str):
+                    values = [values]
+                extracted[entity_type] = _unique(str(v) for v in values) if isinstance(values, list) else []
+            results.append(extracted)
+        return results
@@ -1,4 +1,6 @@
 import hashlib
+import os
+import threading
 import uuid
 import json
 from pathlib import Path
@@ -11,6 +13,7 @@ class FileManager:
     def __init__(self):
         self.upload_dir = UPLOAD_DIR
         self.file_registry = {}  # file_id -> file_info 매핑
+        self._lock = threading.RLock()  # 레지스트리 변경 + 메타데이터 저장 (요청 스레드 / 색인 작업 스레드 공용)
         self.metadata_file = self.upload_dir / ".file_metadata.json"
         self._load_metadata()
     
@@ -41,29 +44,33 @@ class FileManager:
     
     def _save_metadata(self):
         """메타데이터 파일에 원본 파일명 정보 저장"""
-        metadata = {}
-        for file_id, info in self.file_registry.items():
-            if info["path"].exists():
-                # 파일명 파싱
-                parsed_info = parse_filename(info["filename"])
+        with self._lock:
+            metadata = {}
+            for file_id, info in list(self.file_registry.items()):
+                if info["path"].exists():
+                    # 파일명 파싱
+                    parsed_info = parse_filename(info["filename"])
                 
-                file_metadata = {
-                    "original_filename": info["filename"],
-                    "safe_filename": info["path"].name.split("_", 1)[1] if "_" in info["path"].name else info["path"].name
-                }
+                    file_metadata = {
+                        "original_filename": info["filename"],
+                        "safe_filename": info["path"].name.split("_", 1)[1] if "_" in info["path"].name else info["path"].name
+                    }
                 
-                # 파싱된 정보 추가
-                if parsed_info["parsed"]:
-                    file_metadata["date"] = parsed_info["date"]
-                    file_metadata["doc_type"] = parsed_info["doc_type"]
-                    file_metadata["doc_title"] = parsed_info["doc_title"]
+                    # 파싱된 정보 추가
+                    if parsed_info["parsed"]:
+                        file_metadata["date"] = parsed_info["date"]
+                        file_metadata["doc_type"] = parsed_info["doc_type"]
+                        file_metadata["doc_title"] = parsed_info["doc_title"]
                 
-                metadata[file_id] = file_metadata
-        try:
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"메타데이터 저장 오류: {e}")
+                    metadata[file_id] = file_metadata
+            try:
+                # 임시 파일에 쓴 뒤 교체 (저장 중 다른 프로세스가 읽어도 깨진 파일을 보지 않음)
+                tmp_path = self.metadata_file.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(metadata, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.metadata_file)
+            except Exception as e:
+                print(f"메타데이터 저장 오류: {e}")
     
     def save_file(self, file, safe_filename, original_filename=None):
         """파일 저장 및 ID 반환"""
@@ -77,16 +84,17 @@ class FileManager:
         
         file.save(str(file_path))
         
-        # 레지스트리에 등록 (원본 파일명 저장)
-        self.file_registry[file_id] = {
-            "id": file_id,
-            "filename": original_filename,  # 원본 파일명 저장
-            "path": file_path,
-            "size": file_path.stat().st_size
-        }
-        
-        # 메타데이터 저장
-        self._save_metadata()
+        with self._lock:
+            # 레지스트리에 등록 (원본 파일명 저장)
+            self.file_registry[file_id] = {
+                "id": file_id,
+                "filename": original_filename,  # 원본 파일명 저장
+                "path": file_path,
+                "size": file_path.stat().st_size
+            }
+            
+            # 메타데이터 저장
+            self._save_metadata()
         
         return file_path
     
@@ -106,7 +114,7 @@ class FileManager:
         files = []
         
         # 먼저 레지스트리에서 파일 정보 가져오기 (원본 파일명 보존)
-        for file_id, file_info in self.file_registry.items():
+        for file_id, file_info in list(self.file_registry.items()):
             if file_info["path"].exists():
                 files.append({
                     "id": file_id,
@@ -139,7 +147,7 @@ class FileManager:
         
         # 여전히 레지스트리에 없는 파일은 파일 시스템에서 검색
         for file_path in self.upload_dir.glob("*"):
-            if file_path.is_file() and file_path.name != ".file_metadata.json":
+            if file_path.is_file() and not file_path.name.startswith(".file_metadata"):  # 메타데이터 파일 + 저장 중 임시 파일 제외
                 # 파일명 형식: {file_id}_{safe_filename}
                 # file_id는 MD5 해시이므로 32자리
                 file_name = file_path.name
@@ -184,10 +192,10 @@ class FileManager:
         file_path = self.get_file_path(file_id)
         if file_path and file_path.exists():
             file_path.unlink()
-            if file_id in self.file_registry:
-                del self.file_registry[file_id]
-            # 메타데이터 업데이트
-            self._save_metadata()
+            with self._lock:
+                self.file_registry.pop(file_id, None)
+                # 메타데이터 업데이트
+                self._save_metadata()
             return True
         return False
 
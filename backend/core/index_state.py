@@ -0,0 +1,51 @@
+"""
+프로세스 간 인덱스 변경 알림 (세대 번호 파일)
+
+멀티 프로세스 서버(serve.py)에서는 writer 프로세스만 문서를 추가/삭제하고,
+reader 프로세스는 카탈로그/BM25/벡터 DB를 메모리에 들고 질의를 처리합니다.
+writer는 인덱스를 바꾼 뒤 세대 번호를 올리고, reader는 요청마다 파일의 변경 시각만 확인하여
+세대가 바뀌었으면 인덱스를 다시 로드합니다.
+"""
+import os
+from pathlib import Path
+
+
+class IndexGeneration:
+    """인덱스 세대 번호 (파일 1개, writer만 증가)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._mtime_ns = None
+        self.seen = self.current()
+
+    def _stat(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def current(self) -> int:
+        self._mtime_ns = self._stat()
+        try:
+            return int(self.path.read_text(encoding='utf-8').strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump(self) -> int:
+        """세대 번호 증가 (인덱스 파일을 모두 저장한 뒤 호출)"""
+        generation = max(self.current(), self.seen) + 1
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(str(generation), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[Index] 세대 번호 저장 오류: {e}")
+        self.seen = generation
+        self._mtime_ns = self._stat()
+        return generation
+
+    def changed(self) -> bool:
+        """마지막으로 확인한 이후 다른 프로세스가 세대를 올렸는지 (파일 변경 시각으로 먼저 확인)"""
+        if self._stat() == self._mtime_ns:
+            return False
+        return self.current() != self.seen
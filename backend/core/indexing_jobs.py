@@ -0,0 +1,277 @@
+"""
+비동기 문서 인덱싱 작업 큐
+
+/api/upload는 파일 저장 후 작업 ID만 반환하고, 파싱(OCR 포함)/임베딩/저장은
+제한된 크기의 작업 스레드 풀에서 처리합니다.
+
+작업 항목 구조:
+    {
+        "id": "3f2a...",
+        "filename": "250211_재직증명서_센싱플러스.pdf",
+        "file_path": ".../uploads/<upload_id>_<safe_filename>",
+        "upload_id": "...",             # FileManager의 file_id
+        "status": "running",            # queued / running / completed / failed / cancelled
+        "stage": "parsing",             # queued / parsing / embedding / storing / done
+        "pages_done": 3, "pages_total": 12,
+        "chunks_count": null,
+        "timings": {"queued": 0.1, "parsing": 41.2, ...},   # 단계별 소요 시간 (초)
+        "error": null,
+        "created_at": ..., "started_at": ..., "finished_at": ...
+    }
+
+- 작업 목록은 JSON 파일로 저장되어, 서버가 인덱싱 도중 종료되면 재시작 시
+  queued/running 작업을 다시 실행합니다 (index_document는 같은 file_id의 저장된 청크와
+  비교하여 바뀐 청크만 반영하므로 다시 실행해도 중간 상태의 청크가 남지 않음)
+- 취소는 진행 상황 콜백에서 ProcessingCancelled를 발생시켜 벡터 DB 저장 전에 중단
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .document_processor import ProcessingCancelled
+
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class IndexingJobQueue:
+    """문서 인덱싱 작업 큐 (스레드 풀 + JSON 파일 영속화)"""
+
+    # 완료/실패/취소된 작업 기록 보관 개수
+    MAX_FINISHED_JOBS = 200
+
+    def __init__(self, jobs_path: Path, rag_system, max_workers: int = 2,
+                 on_cancelled: Optional[Callable[[Dict], None]] = None):
+        self.jobs_path = Path(jobs_path)
+        self.rag_system = rag_system
+        self.on_cancelled = on_cancelled
+        self._lock = threading.RLock()
+        self._finished = threading.Condition(self._lock)  # 작업 종료 알림 (wait)
+        self._jobs: Dict[str, Dict] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="indexing")
+
+        self._load()
+
+    # ==================== 영속화 ====================
+
+    def _load(self):
+        if not self.jobs_path.exists():
+            return
+        try:
+            with open(self.jobs_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for job in data.get("jobs", []):
+                self._jobs[job["id"]] = job
+        except Exception as e:
+            print(f"[Jobs] 작업 목록 로드 오류: {e}")
+
+    def _save(self):
+        """작업 목록 저장 (self._lock 보유 상태에서 호출)"""
+        tmp_path = self.jobs_path.with_suffix(self.jobs_path.suffix + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": 1, "jobs": list(self._jobs.values())}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.jobs_path)
+        except Exception as e:
+            print(f"[Jobs] 작업 목록 저장 오류: {e}")
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job["status"] not in ACTIVE_STATUSES]
+        if len(finished) > self.MAX_FINISHED_JOBS:
+            finished.sort(key=lambda job: job.get("finished_at") or 0)
+            for job in finished[:len(finished) - self.MAX_FINISHED_JOBS]:
+                del self._jobs[job["id"]]
+
+    def resume_pending(self):
+        """재시작 전에 끝나지 않은 작업을 다시 실행"""
+        with self._lock:
+            pending = [job for job in self._jobs.values() if job["status"] in ACTIVE_STATUSES]
+            pending.sort(key=lambda job: job["created_at"])
+            for job in pending:
+                if not Path(job["file_path"]).exists():
+                    self._finish(job, "failed", error="업로드 파일이 없습니다")
+                    continue
+                print(f"[Jobs] 미완료 인덱싱 작업 재개: {job['filename']} (이전 단계: {job['stage']})")
+                job.update(status="queued", stage="queued", pages_done=0, pages_total=None,
+                           resumed=True, _stage_started=time.time())
+                self._schedule(job)
+            self._save()
+
+    # ==================== 작업 관리 ====================
+
+    def submit(self, file_path: Path, filename: str, upload_id: Optional[str] = None) -> Dict:
+        """인덱싱 작업 등록 후 작업 정보 반환"""
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "filename": filename,
+            "file_path": str(file_path),
+            "upload_id": upload_id,
+            "status": "queued",
+            "stage": "queued",
+            "pages_done": 0,
+            "pages_total": None,
+            "chunks_count": None,
+            "timings": {},
+            "error": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "_stage_started": now,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._schedule(job)
+            self._save()
+        print(f"[Jobs] 인덱싱 작업 등록: {filename} (job_id={job['id']})")
+        return self.get(job["id"])
+
+    def _schedule(self, job: Dict):
+        self._cancel_events[job["id"]] = threading.Event()
+        self._executor.submit(self._run, job["id"])
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if not k.startswith("_")}
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job["created_at"], reverse=True)
+            return [{k: v for k, v in job.items() if not k.startswith("_")} for job in jobs]
+
+    def find_active(self, filename: str) -> Optional[Dict]:
+        """같은 파일명으로 대기/진행 중인 작업 (중복 업로드 확인용)"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job["filename"] == filename and job["status"] in ACTIVE_STATUSES:
+                    return self.get(job["id"])
+        return None
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """작업 취소 요청 (대기 중이면 즉시, 실행 중이면 다음 진행 보고 시점에 중단)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            cancelled = False
+            if job["status"] == "queued":
+                # 작업 스레드를 기다리지 않고 바로 종료 (_run은 queued가 아닌 작업을 건너뜀)
+                job["cancel_requested"] = True
+                self._finish(job, "cancelled")
+                self._save()
+                cancelled = True
+            elif job["status"] in ACTIVE_STATUSES:
+                job["cancel_requested"] = True
+                event = self._cancel_events.get(job_id)
+                if event is not None:
+                    event.set()
+                self._save()
+        if cancelled:
+            print(f"[Jobs] 인덱싱 취소: {job['filename']}")
+            self._notify_cancelled(job)
+        return self.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """작업이 끝날 때까지(완료/실패/취소) 최대 timeout초 대기 후 작업 정보 반환 (시간 초과 시 status가 진행 중)"""
+        with self._finished:
+            self._finished.wait_for(
+                lambda: job_id not in self._jobs or self._jobs[job_id]["status"] not in ACTIVE_STATUSES,
+                timeout
+            )
+            return self.get(job_id)
+
+    # ==================== 실행 ====================
+
+    def _set_stage(self, job: Dict, stage: str):
+        """단계 전환 및 이전 단계 소요 시간 기록 (self._lock 보유 상태에서 호출)"""
+        now = time.time()
+        previous = job["stage"]
+        job["timings"][previous] = round(job["timings"].get(previous, 0) + now - job.get("_stage_started", now), 3)
+        job["stage"] = stage
+        job["_stage_started"] = now
+
+    def _finish(self, job: Dict, status: str, error: Optional[str] = None):
+        self._set_stage(job, "done")
+        job["status"] = status
+        job["error"] = error
+        job["finished_at"] = time.time()
+        job.pop("_stage_started", None)
+        self._cancel_events.pop(job["id"], None)
+        self._prune()
+        self._finished.notify_all()
+
+    def _run(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                return
+            cancel_event = self._cancel_events.get(job_id)
+            if job.get("cancel_requested"):
+                self._finish(job, "cancelled")
+                self._save()
+                cancelled = True
+            else:
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                self._save()
+                cancelled = False
+        if cancelled:
+            self._notify_cancelled(job)
+            return
+
+        def progress(stage: str, **info):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ProcessingCancelled()
+            with self._lock:
+                if stage != job["stage"]:
+                    if job["pages_total"]:
+                        job["pages_done"] = job["pages_total"]
+                    self._set_stage(job, stage)
+                    self._save()
+                if "pages_done" in info:
+                    job["pages_done"] = info["pages_done"]
+                    job["pages_total"] = info.get("pages_total")
+                if "chunks_total" in info:
+                    job["chunks_total"] = info["chunks_total"]
+
+        try:
+            result = self.rag_system.index_document(Path(job["file_path"]), job["filename"], progress_callback=progress)
+            with self._lock:
+                job["chunks_count"] = result["chunks_count"]
+                job["file_id"] = result["file_id"]
+                job["embedding"] = result.get("embedding")  # 임베딩 처리량 / 잘린 청크 통계
+                job["changes"] = result.get("changes")      # 추가/수정/삭제/그대로인 청크 수
+                job["parsing"] = result.get("parsing")      # PDF 페이지 표 경로별 페이지 수 등 파싱 통계
+                self._finish(job, "completed")
+                self._save()
+            print(f"[Jobs] 인덱싱 완료: {job['filename']} ({job['timings']})")
+        except ProcessingCancelled:
+            with self._lock:
+                self._finish(job, "cancelled")
+                self._save()
+            print(f"[Jobs] 인덱싱 취소: {job['filename']}")
+            self._notify_cancelled(job)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            with self._lock:
+                self._finish(job, "failed", error=str(e))
+                self._save()
+            print(f"[Jobs] 인덱싱 실패: {job['filename']}: {e}")
+
+    def _notify_cancelled(self, job: Dict):
+        if self.on_cancelled is None:
+            return
+        try:
+            self.on_cancelled(self.get(job["id"]) or job)
+        except Exception as e:
+            print(f"[Jobs] 취소 후처리 오류: {e}")
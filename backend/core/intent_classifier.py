@@ -0,0 +1,141 @@
+"""
+임베딩 기반 질의 의도 분류기 (GLOBAL / DETAIL)
+
+규칙 기반 패턴으로 분류되지 않는 질의를 LLM 호출 없이 분류합니다.
+
+- 학습 데이터: 저장소에 포함된 시드 질문 (core/intent_seeds.json)
+- 모델: 질의 임베딩(bge-m3, 정규화) 위의 로지스틱 회귀 (numpy, L2 정규화)
+  임베딩끼리의 유사도가 전반적으로 높으므로 시드 평균을 빼고 평균 노름이 1이 되도록 맞춘 뒤 학습
+- 분류 비용: 임베딩 1개와 가중치 벡터의 내적 (1ms 미만, 질의 임베딩은 검색에서도 재사용)
+- 학습된 가중치는 시드 파일 해시 + 임베딩 모델명과 함께 저장하여
+  시드가 바뀌지 않았다면 서버 시작 시 시드 질문을 다시 인코딩하지 않음
+- 신뢰도가 INTENT_CONFIDENCE_THRESHOLD 미만이면 호출 측에서 LLM 분류로 대체
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+LABELS = ("DETAIL", "GLOBAL")  # 0, 1
+
+
+def _train_logistic_regression(features: np.ndarray, labels: np.ndarray,
+                               l2: float = 1e-3, learning_rate: float = 1.0,
+                               iterations: int = 500) -> Tuple[np.ndarray, float]:
+    """이진 로지스틱 회귀 (경사 하강법)"""
+    n_samples, n_features = features.shape
+    weights = np.zeros(n_features, dtype=np.float64)
+    bias = 0.0
+    # 클래스 불균형 보정
+    positive = max(1, int(labels.sum()))
+    negative = max(1, n_samples - positive)
+    sample_weights = np.where(labels == 1, n_samples / (2 * positive), n_samples / (2 * negative))
+
+    for _ in range(iterations):
+        probs = 1.0 / (1.0 + np.exp(-(features @ weights + bias)))
+        error = (probs - labels) * sample_weights
+        weights -= learning_rate * (features.T @ error / n_samples + l2 * weights)
+        bias -= learning_rate * float(error.mean())
+    return weights, bias
+
+
+class IntentClassifier:
+    """시드 질문으로 학습한 임베딩 기반 의도 분류기"""
+
+    VERSION = 2
+
+    def __init__(self, seed_path: Path, model_name: str, cache_path: Optional[Path] = None):
+        self.seed_path = Path(seed_path)
+        self.model_name = model_name
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.weights: Optional[np.ndarray] = None
+        self.bias = 0.0
+        self.mean: Optional[np.ndarray] = None
+        self.scale = 1.0
+
+    @property
+    def ready(self) -> bool:
+        return self.weights is not None
+
+    def _seed_signature(self, seed_bytes: bytes) -> str:
+        return hashlib.md5(seed_bytes + self.model_name.encode()).hexdigest()
+
+    def fit(self, encode: Callable[[List[str]], np.ndarray]):
+        """시드 질문으로 학습 (캐시된 가중치가 유효하면 재사용)
+
+        Args:
+            encode: 질문 목록 → 정규화된 임베딩 행렬
+        """
+        try:
+            seed_bytes = self.seed_path.read_bytes()
+            seeds = json.loads(seed_bytes.decode('utf-8'))
+        except Exception as e:
+            print(f"[Intent] 시드 파일 로드 실패, 임베딩 분류기 비활성화: {e}")
+            return
+
+        signature = self._seed_signature(seed_bytes)
+        if self._load(signature):
+            return
+
+        texts, labels = [], []
+        for label_index, label in enumerate(LABELS):
+            for text in seeds.get(label, []):
+                texts.append(text)
+                labels.append(label_index)
+        if len(set(labels)) < 2:
+            print("[Intent] 시드 질문이 부족하여 임베딩 분류기 비활성화")
+            return
+
+        features = np.asarray(encode(texts), dtype=np.float64)
+        self.mean = features.mean(axis=0)
+        self.scale = 1.0 / max(float(np.linalg.norm(features - self.mean, axis=1).mean()), 1e-6)
+        features = (features - self.mean) * self.scale
+        self.weights, self.bias = _train_logistic_regression(features, np.asarray(labels, dtype=np.float64))
+
+        train_accuracy = float(np.mean((self._probabilities(features / self.scale + self.mean) >= 0.5) == np.asarray(labels)))
+        print(f"[Intent] 임베딩 분류기 학습 완료: 시드 {len(texts)}개, 학습 정확도 {train_accuracy:.2f}")
+        self._save(signature)
+
+    def _probabilities(self, features: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-((features - self.mean) * self.scale @ self.weights + self.bias)))
+
+    def predict(self, query_embedding: List[float]) -> Tuple[str, float]:
+        """(의도, 신뢰도) 반환 - 신뢰도는 선택된 의도의 확률 (0.5~1.0)"""
+        prob_global = float(self._probabilities(np.asarray(query_embedding, dtype=np.float64)))
+        if prob_global >= 0.5:
+            return "GLOBAL", prob_global
+        return "DETAIL", 1.0 - prob_global
+
+    # ==================== 영속화 ====================
+
+    def _load(self, signature: str) -> bool:
+        if self.cache_path is None or not self.cache_path.exists():
+            return False
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if int(data["version"]) != self.VERSION or str(data["signature"]) != signature:
+                    return False
+                self.weights = data["weights"]
+                self.mean = data["mean"]
+                self.scale = float(data["scale"])
+                self.bias = float(data["bias"])
+            print("[Intent] 임베딩 분류기 가중치 로드")
+            return True
+        except Exception as e:
+            print(f"[Intent] 분류기 가중치 로드 오류: {e}")
+            return False
+
+    def _save(self, signature: str):
+        if self.cache_path is None:
+            return
+        tmp_path = self.cache_path.with_suffix(".tmp.npz")
+        try:
+            np.savez(tmp_path, version=self.VERSION, signature=signature,
+                     weights=self.weights, bias=self.bias, mean=self.mean, scale=self.scale)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"[Intent] 분류기 가중치 저장 오류: {e}")
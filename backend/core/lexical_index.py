@@ -0,0 +1,265 @@
+"""
+bge-m3 lexical(sparse) 가중치 역색인 - 하이브리드 검색의 두 번째 키워드 신호
+
+임베딩과 같은 forward에서 계산한 청크별 (토큰 id, 가중치)를 토큰 id -> (doc 배열, 가중치 배열)로 저장합니다.
+- 별도 토크나이저 없이 bge-m3 토크나이저(XLM-R sentencepiece)의 토큰 단위로 매칭
+  (한국어 이름/코드처럼 BM25 2-gram이 놓치거나 과하게 맞추는 경우를 모델이 학습한 가중치로 보완)
+- 점수: 질의와 청크에 공통인 토큰의 가중치 곱의 합 (bge-m3 lexical matching score)
+- posting은 array('i') / array('f')로 압축 저장하고 검색 시 numpy로 감싸서 점수 계산
+- 삭제는 tombstone, 비활성 비율이 COMPACT_RATIO를 넘으면 저장 시 정리 (BM25Index와 같은 방식)
+- 텍스트만으로 재구성할 수 없으므로 벡터 DB와 어긋나면 청크를 다시 인코딩하여 재구성
+"""
+import os
+import pickle
+import threading
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+class LexicalIndex:
+    """증분 갱신 가능한 lexical 가중치 역색인"""
+
+    VERSION = 1
+
+    # 비활성(삭제된) 슬롯 비율이 이 값을 넘으면 posting 정리
+    COMPACT_RATIO = 0.3
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()  # 동시 저장 직렬화
+        self._reset_state()
+        self.loaded = self._load()
+
+    def _reset_state(self):
+        self._postings: Dict[int, Tuple[array, array]] = {}  # 토큰 id -> (doc 배열, 가중치 배열)
+        self._chunk_ids: List[Optional[str]] = []            # doc -> chunk_id (삭제 시 None)
+        self._doc_file: List[Optional[str]] = []             # doc -> file_id
+        self._alive = np.zeros(0, dtype=bool)                # doc -> 활성 여부
+        self._doc_lookup: Dict[str, int] = {}                # chunk_id -> doc
+        self._file_docs: Dict[str, Set[int]] = {}            # file_id -> {doc}
+
+    # ==================== 영속화 ====================
+
+    def _load(self) -> bool:
+        if not self.index_path.exists():
+            return False
+        try:
+            with open(self.index_path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get("version") != self.VERSION:
+                return False
+            with self._lock:
+                self._postings = state["postings"]
+                self._chunk_ids = state["chunk_ids"]
+                self._doc_file = state["doc_file"]
+                self._rebuild_lookups()
+            print(f"[Lexical] 인덱스 로드 완료: 청크 {len(self)}개, 토큰 {len(self._postings)}개")
+            return True
+        except Exception as e:
+            print(f"[Lexical] 인덱스 로드 오류: {e}")
+            with self._lock:
+                self._reset_state()
+            return False
+
+    def _rebuild_lookups(self):
+        """저장 대상이 아닌 보조 인덱스를 chunk_ids / doc_file에서 재구성"""
+        self._alive = np.fromiter((cid is not None for cid in self._chunk_ids),
+                                  dtype=bool, count=len(self._chunk_ids))
+        self._doc_lookup = {cid: doc for doc, cid in enumerate(self._chunk_ids) if cid is not None}
+        self._file_docs = {}
+        for doc, file_id in enumerate(self._doc_file):
+            if self._chunk_ids[doc] is not None:
+                self._file_docs.setdefault(file_id, set()).add(doc)
+
+    def save(self):
+        """인덱스 저장 (락 안에서 복사한 상태를 락 밖에서 임시 파일에 쓰고 교체)"""
+        with self._save_lock:
+            with self._lock:
+                if len(self._chunk_ids) and (len(self._chunk_ids) - len(self._doc_lookup)) > self.COMPACT_RATIO * len(self._chunk_ids):
+                    self._compact()
+                state = {
+                    "version": self.VERSION,
+                    "postings": {token_id: (docs[:], values[:]) for token_id, (docs, values) in self._postings.items()},
+                    "chunk_ids": list(self._chunk_ids),
+                    "doc_file": list(self._doc_file),
+                }
+            tmp_path = self.index_path.with_suffix(self.index_path.suffix + ".tmp")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.index_path)
+            except Exception as e:
+                print(f"[Lexical] 인덱스 저장 오류: {e}")
+
+    def _compact(self):
+        """비활성 슬롯을 제거하고 doc 번호를 다시 매김"""
+        alive_docs = np.nonzero(self._alive)[0]
+        remap = np.full(len(self._chunk_ids), -1, dtype=np.int32)
+        remap[alive_docs] = np.arange(len(alive_docs), dtype=np.int32)
+
+        postings = {}
+        for token_id, (docs, weights) in self._postings.items():
+            doc_arr = np.frombuffer(docs, dtype=np.int32)
+            keep = self._alive[doc_arr]
+            if not keep.any():
+                continue
+            postings[token_id] = (array('i', remap[doc_arr[keep]].tobytes()),
+                                  array('f', np.frombuffer(weights, dtype=np.float32)[keep].tobytes()))
+        self._postings = postings
+        self._chunk_ids = [self._chunk_ids[doc] for doc in alive_docs]
+        self._doc_file = [self._doc_file[doc] for doc in alive_docs]
+        self._rebuild_lookups()
+
+    # ==================== 갱신 ====================
+
+    def __len__(self) -> int:
+        return len(self._doc_lookup)
+
+    def add_chunks(self, file_id: str, chunk_ids: List[str], weights: List[Tuple[np.ndarray, np.ndarray]]):
+        """청크 추가 (같은 chunk_id가 있으면 교체)
+
+        Args:
+            weights: 청크별 (토큰 id 배열, 가중치 배열) - EmbeddingClient.encode_with_lexical 결과
+        """
+        with self._lock:
+            start = len(self._chunk_ids)
+            for chunk_id, (token_ids, token_weights) in zip(chunk_ids, weights):
+                if chunk_id in self._doc_lookup:
+                    self._remove_doc(self._doc_lookup[chunk_id])
+
+                doc = len(self._chunk_ids)
+                self._chunk_ids.append(chunk_id)
+                self._doc_file.append(file_id)
+                self._doc_lookup[chunk_id] = doc
+                self._file_docs.setdefault(file_id, set()).add(doc)
+
+                for token_id, weight in zip(token_ids.tolist(), token_weights.tolist()):
+                    posting = self._postings.get(token_id)
+                    if posting is None:
+                        posting = self._postings[token_id] = (array('i'), array('f'))
+                    posting[0].append(doc)
+                    posting[1].append(weight)
+
+            added = len(self._chunk_ids) - start
+            if added:
+                self._alive = np.concatenate([self._alive, np.ones(added, dtype=bool)])
+
+    def _remove_doc(self, doc: int):
+        chunk_id = self._chunk_ids[doc]
+        file_id = self._doc_file[doc]
+        self._doc_lookup.pop(chunk_id, None)
+        docs = self._file_docs.get(file_id)
+        if docs is not None:
+            docs.discard(doc)
+            if not docs:
+                del self._file_docs[file_id]
+        self._chunk_ids[doc] = None
+        self._alive[doc] = False
+
+    def remove_file(self, file_id: str) -> int:
+        """file_id에 속한 모든 청크 제거"""
+        with self._lock:
+            docs = list(self._file_docs.get(file_id, ()))
+            for doc in docs:
+                self._remove_doc(doc)
+            return len(docs)
+
+    def remove_chunks(self, chunk_ids: Iterable[str]) -> int:
+        """chunk_id 목록으로 청크 제거"""
+        removed = 0
+        with self._lock:
+            for chunk_id in chunk_ids:
+                doc = self._doc_lookup.get(chunk_id)
+                if doc is not None:
+                    self._remove_doc(doc)
+                    removed += 1
+        return removed
+
+    def rebuild_from_collection(self, collection, encode_lexical: Callable[[List[str]], Optional[List]],
+                                page_size: int = 256):
+        """벡터 DB에 저장된 청크 텍스트를 다시 인코딩하여 인덱스 재구성
+
+        Args:
+            encode_lexical: texts -> lexical 가중치 목록 (None이면 중단)
+        """
+        total = collection.count()
+        print(f"[Lexical] 벡터 DB 청크 {total}개를 다시 인코딩하여 lexical 인덱스 재구성 중...")
+        with self._lock:
+            self._reset_state()
+            offset = 0
+            while True:
+                batch = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                ids = batch.get("ids") or []
+                if not ids:
+                    break
+                weights = encode_lexical([text or "" for text in batch["documents"]])
+                if weights is None:
+                    print(f"[Lexical] lexical 가중치를 계산할 수 없어 재구성 중단")
+                    self._reset_state()
+                    return
+                by_file: Dict[str, Tuple[List[str], List]] = {}
+                for chunk_id, item, metadata in zip(ids, weights, batch["metadatas"]):
+                    group = by_file.setdefault((metadata or {}).get("file_id", ""), ([], []))
+                    group[0].append(chunk_id)
+                    group[1].append(item)
+                for file_id, (chunk_ids, items) in by_file.items():
+                    self.add_chunks(file_id, chunk_ids, items)
+                offset += len(ids)
+                print(f"[Lexical] 재구성 진행: {offset}/{total}")
+                if len(ids) < page_size:
+                    break
+        self.save()
+        self.loaded = True
+        print(f"[Lexical] 인덱스 재구성 완료: 청크 {len(self)}개, 토큰 {len(self._postings)}개")
+
+    # ==================== 검색 ====================
+
+    def search(self, query_weights: Tuple[np.ndarray, np.ndarray], top_k: int,
+               file_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """lexical 가중치 검색
+
+        Args:
+            query_weights: 질의의 (토큰 id 배열, 가중치 배열)
+            top_k: 반환할 최대 결과 수
+            file_ids: 지정 시 해당 file_id의 청크만 검색 (메타데이터 필터 대응)
+
+        Returns:
+            [(chunk_id, score), ...] 점수 내림차순
+        """
+        token_ids, token_weights = query_weights
+        if len(token_ids) == 0:
+            return []
+
+        with self._lock:
+            if not self._doc_lookup:
+                return []
+
+            alive = self._alive
+            if file_ids is not None:
+                allowed_docs = [doc for fid in file_ids for doc in self._file_docs.get(fid, ())]
+                if not allowed_docs:
+                    return []
+                alive = np.zeros(len(self._chunk_ids), dtype=bool)
+                alive[allowed_docs] = True
+
+            scores = np.zeros(len(self._chunk_ids), dtype=np.float32)
+            for token_id, query_weight in zip(token_ids.tolist(), token_weights.tolist()):
+                posting = self._postings.get(token_id)
+                if posting is None:
+                    continue
+                docs = np.frombuffer(posting[0], dtype=np.int32)
+                scores[docs] += query_weight * np.frombuffer(posting[1], dtype=np.float32)
+
+            scores[~alive] = 0.0
+            candidates = np.flatnonzero(scores)
+            if len(candidates) == 0:
+                return []
+            if len(candidates) > top_k:
+                part = np.argpartition(scores[candidates], -top_k)[-top_k:]
+                candidates = candidates[part]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._chunk_ids[doc], float(scores[doc])) for doc in ranked]
@@ -0,0 +1,251 @@
+"""
+Ollama LLM 게이트웨이 (RAGSystem 전체에서 공유)
+
+호출할 때마다 ollama.Client를 새로 만들던 방식을 대체합니다.
+
+- HTTP 연결 재사용: 타임아웃 설정별로 ollama.Client(httpx 연결 풀) 1개를 만들어 재사용
+- 호출별 타임아웃: 연결 타임아웃은 공통, 읽기 타임아웃은 호출 종류별로 지정
+  (의도 분류처럼 짧은 호출은 짧게, 답변 스트림은 토큰 간 대기 기준으로 길게)
+- keep_alive 고정: 모든 요청에 같은 keep_alive를 보내 유휴 시간 동안 모델이 내려가지 않게 함
+- 시스템 프롬프트 prefix: messages()로 만든 메시지는 항상 같은 시스템 프롬프트 문자열로 시작하므로
+  Ollama가 직전 요청의 KV 캐시(prefix)를 재사용
+- num_ctx: Ollama는 num_ctx가 바뀌면 모델을 다시 로드하므로,
+  요청한 값이 현재 로드된 값 이하이면 로드된 값을 그대로 사용 (커질 때만 다시 로드)
+  → 예열한 default_num_ctx가 하한이 됨. 실제 값은 effective_num_ctx()로 확인
+- 시작 시 예열(warm_up): 모델 로드 + 시스템 프롬프트 prefix 계산을 첫 사용자 질의 전에 수행
+- probe(): 콜드/웜 요청 지연 시간을 측정 (unload=True일 때만 모델을 내림)
+- 모든 호출은 LLMScheduler를 거침 (동시 실행 제한, 우선순위, 같은 프롬프트 병합, 대기열 초과 시 LLMQueueFull)
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+import ollama
+
+from .llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
+
+class LLMGateway:
+    """공유 Ollama 클라이언트 (연결 풀, 타임아웃, keep_alive, 예열)"""
+
+    # 예열/프로브에 쓰는 짧은 사용자 메시지
+    PING_MESSAGE = "안녕하세요"
+
+    def __init__(self, base_url: str, model: str, system_prompt: str, keep_alive,
+                 connect_timeout: float = 5.0, default_timeout: float = 120.0,
+                 default_num_ctx: Optional[int] = None, scheduler: Optional[LLMScheduler] = None):
+        self.base_url = base_url
+        self.model = model
+        self.system_prompt = system_prompt
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.default_timeout = default_timeout
+        self.default_num_ctx = default_num_ctx
+        self.scheduler = scheduler or LLMScheduler()
+
+        self._clients: Dict[float, ollama.Client] = {}
+        self._lock = threading.Lock()
+        self._loaded_num_ctx: Optional[int] = None
+        self._warm = False
+        self._calls = 0
+        self._errors = 0
+        self._last_load_ms: Optional[float] = None
+
+    # ==================== 클라이언트 ====================
+
+    def _client(self, timeout: Optional[float]) -> ollama.Client:
+        """읽기 타임아웃별 공유 클라이언트 (httpx 연결 풀 재사용)"""
+        timeout = float(timeout or self.default_timeout)
+        with self._lock:
+            client = self._clients.get(timeout)
+            if client is None:
+                client = ollama.Client(
+                    host=self.base_url,
+                    timeout=httpx.Timeout(timeout, connect=self.connect_timeout)
+                )
+                self._clients[timeout] = client
+            return client
+
+    def effective_num_ctx(self, requested: Optional[int] = None) -> Optional[int]:
+        """실제로 Ollama에 보낼 num_ctx
+
+        로드된 모델을 다시 로드하지 않도록 num_ctx는 올라가기만 함:
+        요청 값이 로드된 값 이하이면 로드된 값(예열 시 default_num_ctx)을 그대로 사용하므로
+        질의별로 작게 계산한 num_ctx는 모델이 내려간 뒤(unload/keep_alive 만료)에만 적용됨
+        """
+        requested = requested or self.default_num_ctx
+        with self._lock:
+            loaded = self._loaded_num_ctx
+        if loaded and (requested is None or requested <= loaded):
+            return loaded
+        return requested
+
+    def _options(self, options: Optional[Dict]) -> Dict:
+        """요청 옵션 (num_ctx는 effective_num_ctx()로 조정)"""
+        options = dict(options or {})
+        num_ctx = self.effective_num_ctx(options.get("num_ctx"))
+        if num_ctx:
+            options["num_ctx"] = num_ctx
+        return options
+
+    def _record(self, options: Dict, response: Optional[Dict] = None):
+        """호출 결과 기록 (로드된 num_ctx, 모델 로드 시간)"""
+        with self._lock:
+            self._calls += 1
+            if options.get("num_ctx"):
+                self._loaded_num_ctx = options["num_ctx"]
+            self._warm = True
+            if response is not None and response.get("load_duration") is not None:
+                self._last_load_ms = response["load_duration"] / 1e6
+
+    def _record_error(self):
+        with self._lock:
+            self._calls += 1
+            self._errors += 1
+
+    # ==================== 호출 ====================
+
+    def messages(self, user_content: str) -> List[Dict]:
+        """시스템 프롬프트 + 사용자 메시지 (모든 질의가 같은 prefix로 시작)"""
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+
+    def _request_key(self, messages: List[Dict], options: Dict, **kwargs) -> str:
+        """요청 병합 키 (모델 + 메시지 + 옵션이 모두 같으면 같은 요청)"""
+        payload = json.dumps([self.model, messages, options, kwargs], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+    def chat(self, messages: List[Dict], options: Optional[Dict] = None,
+             timeout: Optional[float] = None, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """단일 응답 호출 (format 등 추가 인자는 ollama chat에 그대로 전달)
+
+        Raises:
+            LLMQueueFull: 스케줄러 대기열이 가득 찬 경우
+        """
+        options = self._options(options)
+
+        def call():
+            try:
+                response = self._client(timeout).chat(
+                    model=self.model,
+                    messages=messages,
+                    options=options,
+                    keep_alive=self.keep_alive,
+                    **kwargs
+                )
+            except Exception:
+                self._record_error()
+                raise
+            self._record(options, response)
+            return response
+
+        return self.scheduler.run(self._request_key(messages, options, **kwargs), call, priority)
+
+    def stream_chat(self, messages: List[Dict], options: Optional[Dict] = None,
+                    timeout: Optional[float] = None, priority: int = PRIORITY_INTERACTIVE) -> Iterator[Dict]:
+        """토큰 스트림 호출 (timeout은 토큰 사이 최대 대기 시간)
+
+        Raises:
+            LLMQueueFull: 스케줄러 대기열이 가득 찬 경우 (호출 즉시, 스트림을 읽기 전)
+        """
+        options = self._options(options)
+
+        def produce():
+            final_part = None
+            try:
+                for part in self._client(timeout).chat(
+                    model=self.model,
+                    messages=messages,
+                    options=options,
+                    keep_alive=self.keep_alive,
+                    stream=True
+                ):
+                    if part.get("done"):
+                        final_part = part
+                    yield part
+            except Exception:
+                self._record_error()
+                raise
+            self._record(options, final_part)
+
+        return self.scheduler.stream(self._request_key(messages, options, stream=True), produce, priority)
+
+    def list_models(self, timeout: Optional[float] = None) -> List[str]:
+        models = self._client(timeout or self.connect_timeout).list()
+        return [m['name'] for m in models.get('models', [])]
+
+    # ==================== 예열 / 프로브 ====================
+
+    def _ping(self, priority: int = PRIORITY_INTERACTIVE) -> Dict:
+        """시스템 프롬프트 + 짧은 메시지로 1토큰 생성 (지연 시간 측정용, 스케줄러 대기 시간 포함)"""
+        start = time.time()
+        response = self.chat(self.messages(self.PING_MESSAGE), options={"temperature": 0, "num_predict": 1},
+                             priority=priority)
+        return {
+            "total_ms": round((time.time() - start) * 1000, 1),
+            "load_ms": round((response.get("load_duration") or 0) / 1e6, 1),
+            "prompt_eval_count": response.get("prompt_eval_count"),
+            "prompt_eval_ms": round((response.get("prompt_eval_duration") or 0) / 1e6, 1),
+        }
+
+    def warm_up(self) -> bool:
+        """모델 로드 + 시스템 프롬프트 prefix 계산 (실패해도 질의 처리에는 영향 없음)"""
+        try:
+            result = self._ping(priority=PRIORITY_BACKGROUND)
+            print(f"[LLM] 모델 예열 완료: {self.model} ({result['total_ms']:.0f}ms, 로드 {result['load_ms']:.0f}ms, "
+                  f"keep_alive={self.keep_alive})")
+            return True
+        except Exception as e:
+            print(f"[LLM] 모델 예열 실패: {e}")
+            return False
+
+    def start_warm_up(self) -> threading.Thread:
+        """백그라운드에서 예열 (서버 시작을 막지 않음)"""
+        thread = threading.Thread(target=self.warm_up, name="llm-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self):
+        """모델 언로드 (keep_alive=0)"""
+        self._client(self.default_timeout).generate(model=self.model, keep_alive=0)
+        with self._lock:
+            self._loaded_num_ctx = None
+            self._warm = False
+
+    def probe(self, unload: bool = False) -> Dict:
+        """콜드/웜 지연 시간 측정
+
+        Args:
+            unload: True면 모델을 먼저 내린 뒤 측정 (콜드 = 모델 로드 포함)
+                    False면 첫 요청도 이미 로드된 모델로 처리됨 (운영 중 안전한 기본값)
+
+        Returns:
+            {"cold": {...}, "warm": {...}} - total_ms, load_ms, prompt_eval_count, prompt_eval_ms
+            웜 요청은 모델 로드가 없고, 시스템 프롬프트 prefix가 재사용되면 prompt_eval_count도 작아짐
+        """
+        if unload:
+            self.unload()
+        cold = self._ping()
+        warm = self._ping()
+        print(f"[LLM] 프로브: 콜드 {cold['total_ms']:.0f}ms (로드 {cold['load_ms']:.0f}ms), "
+              f"웜 {warm['total_ms']:.0f}ms (프롬프트 토큰 {cold['prompt_eval_count']} → {warm['prompt_eval_count']})")
+        return {"model": self.model, "keep_alive": self.keep_alive, "unloaded": unload, "cold": cold, "warm": warm}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "model": self.model,
+                "keep_alive": self.keep_alive,
+                "warm": self._warm,
+                "loaded_num_ctx": self._loaded_num_ctx,
+                "calls": self._calls,
+                "errors": self._errors,
+                "last_load_ms": self._last_load_ms,
+                "pooled_clients": len(self._clients),
+                "scheduler": self.scheduler.stats(),
+            }
@@ -0,0 +1,226 @@
+"""
+LLM 요청 스케줄러 (Ollama 앞단 동시 실행 제한 / 우선순위 / 중복 요청 병합 / 백프레셔)
+
+Flask 스레드마다 Ollama를 바로 호출하면 동시 질의가 많을 때 모두가 함께 느려지므로,
+LLMGateway의 모든 호출은 이 스케줄러를 거칩니다.
+
+- 동시 실행 슬롯: max_concurrent개 (Ollama OLLAMA_NUM_PARALLEL과 맞춤)
+  요청은 전용 작업 스레드에서 실행되고, 호출 측은 결과(스트림 조각)를 버퍼에서 읽음
+- 우선순위 대기열: 숫자가 작을수록 먼저 실행 (사용자 질의 > 백그라운드 엔티티 추출)
+- 요청 병합: 같은 키(프롬프트 해시)의 요청이 실행/대기 중이면 새로 실행하지 않고 같은 결과를 구독
+  스트림도 병합되며, 늦게 합류한 구독자는 이미 생성된 조각부터 받음
+  구독자가 모두 떠나면 생성을 중단하고 슬롯을 반납
+- 백프레셔: 대기열이 max_queue개로 차면 기다리지 않고 즉시 LLMQueueFull (API는 429로 응답)
+- 지표: 대기열 길이, 실행 중 수, 대기 시간(평균/p95/최대), 병합/거절 수
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# 우선순위 (작을수록 먼저)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class LLMQueueFull(Exception):
+    """LLM 대기열이 가득 참 (잠시 후 재시도)"""
+
+    def __init__(self, queue_depth: int, retry_after: int = 5):
+        super().__init__(f"LLM 대기열이 가득 찼습니다 (대기 {queue_depth}개)")
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+
+
+class _Flight:
+    """실행 1회 (병합된 구독자들이 같은 조각 버퍼를 읽음)"""
+
+    def __init__(self, key: str, func: Callable[[], Iterable], priority: int):
+        self.key = key
+        self.func = func
+        self.priority = priority
+        self.parts: List = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 1
+        self.enqueued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.condition = threading.Condition()
+
+
+class LLMScheduler:
+    """동시 실행 제한 + 우선순위 대기열 + 요청 병합"""
+
+    WAIT_SAMPLES = 500  # 대기 시간 통계에 쓰는 최근 요청 수
+
+    def __init__(self, max_concurrent: int = 1, max_queue: int = 16):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+
+        self._lock = threading.Lock()
+        self._queue: List = []                  # heap: (priority, seq, flight)
+        self._seq = itertools.count()
+        self._inflight: Dict[str, _Flight] = {}  # 대기 + 실행 중 (병합 대상)
+        self._running = 0
+
+        self._submitted = 0
+        self._coalesced = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._wait_ms = deque(maxlen=self.WAIT_SAMPLES)
+
+    # ==================== 제출 ====================
+
+    def _submit(self, key: str, func: Callable[[], Iterable], priority: int) -> _Flight:
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                with flight.condition:
+                    flight.subscribers += 1
+                # 더 급한 요청이 합류하면 대기 중인 요청의 우선순위를 올림
+                if flight.started_at is None and priority < flight.priority:
+                    flight.priority = priority
+                    self._queue = [(flight.priority if f is flight else p, s, f) for p, s, f in self._queue]
+                    heapq.heapify(self._queue)
+                self._coalesced += 1
+                return flight
+
+            if self._running >= self.max_concurrent and len(self._queue) >= self.max_queue:
+                self._rejected += 1
+                raise LLMQueueFull(len(self._queue))
+
+            flight = _Flight(key, func, priority)
+            self._inflight[key] = flight
+            heapq.heappush(self._queue, (priority, next(self._seq), flight))
+            self._submitted += 1
+        self._dispatch()
+        return flight
+
+    def _dispatch(self):
+        """빈 슬롯만큼 대기열에서 꺼내 실행"""
+        while True:
+            with self._lock:
+                if self._running >= self.max_concurrent or not self._queue:
+                    return
+                _, _, flight = heapq.heappop(self._queue)
+                self._running += 1
+                flight.started_at = time.time()
+                self._wait_ms.append((flight.started_at - flight.enqueued_at) * 1000)
+            threading.Thread(target=self._execute, args=(flight,), name="llm-scheduler", daemon=True).start()
+
+    def _execute(self, flight: _Flight):
+        cancelled = False
+        iterator = None
+        try:
+            iterator = iter(flight.func())
+            for part in iterator:
+                with flight.condition:
+                    if flight.subscribers <= 0:
+                        # 구독자가 모두 떠남 → 생성 중단 (중단 직전에 합류한 구독자는 오류로 종료)
+                        cancelled = True
+                        flight.error = RuntimeError("LLM 요청이 취소되었습니다")
+                        break
+                    flight.parts.append(part)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            close = getattr(iterator, "close", None)
+            if cancelled and close is not None:
+                close()
+            with self._lock:
+                self._running -= 1
+                if self._inflight.get(flight.key) is flight:
+                    del self._inflight[flight.key]
+                if cancelled:
+                    self._cancelled += 1
+                elif flight.error is not None:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+            self._dispatch()
+
+    def _unsubscribe(self, flight: _Flight):
+        with flight.condition:
+            flight.subscribers -= 1
+            abandoned = flight.subscribers <= 0 and flight.started_at is None
+        if abandoned:
+            # 아직 실행 전이면 대기열에서 제거
+            with self._lock:
+                if self._inflight.get(flight.key) is flight:
+                    del self._inflight[flight.key]
+                before = len(self._queue)
+                self._queue = [entry for entry in self._queue if entry[2] is not flight]
+                if len(self._queue) != before:
+                    heapq.heapify(self._queue)
+                    self._cancelled += 1
+
+    # ==================== 호출 ====================
+
+    def stream(self, key: str, func: Callable[[], Iterable], priority: int = PRIORITY_INTERACTIVE) -> Iterator:
+        """스케줄링된 스트림 (같은 key의 진행 중 요청이 있으면 병합)
+
+        Raises:
+            LLMQueueFull: 대기열이 가득 찬 경우 (제출 시점에 즉시)
+        """
+        flight = self._submit(key, func, priority)
+        return self._read(flight)
+
+    def _read(self, flight: _Flight) -> Iterator:
+        index = 0
+        try:
+            while True:
+                with flight.condition:
+                    while index >= len(flight.parts) and not flight.done:
+                        flight.condition.wait()
+                    parts = flight.parts[index:]
+                    done = flight.done
+                for part in parts:
+                    yield part
+                index += len(parts)
+                if done and index >= len(flight.parts):
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self._unsubscribe(flight)
+
+    def run(self, key: str, func: Callable[[], object], priority: int = PRIORITY_INTERACTIVE):
+        """스케줄링된 단일 호출 (결과 1개)"""
+        parts = list(self.stream(key, lambda: [func()], priority))
+        return parts[0] if parts else None
+
+    # ==================== 지표 ====================
+
+    def is_saturated(self) -> bool:
+        """새 요청이 LLMQueueFull로 거절되는 상태인지"""
+        with self._lock:
+            return self._running >= self.max_concurrent and len(self._queue) >= self.max_queue
+
+    def stats(self) -> Dict:
+        with self._lock:
+            waits = sorted(self._wait_ms)
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": len(self._queue),
+                "submitted": self._submitted,
+                "coalesced": self._coalesced,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+                "wait_ms": {
+                    "avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+                    "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+                    "max": round(waits[-1], 1) if waits else 0.0,
+                },
+            }
@@ -0,0 +1,112 @@
+"""
+프로세스 공용 모델 로더
+
+같은 (모델, 장치, 옵션) 조합은 프로세스에서 한 번만 로드합니다.
+프로덕션 서버(serve.py)는 마스터 프로세스에서 미리 로드(preload_models)한 뒤 워커를 fork하므로,
+워커의 RAGSystem / Reranker는 마스터가 로드한 가중치를 copy-on-write로 공유합니다.
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+_models: Dict[Tuple, object] = {}
+_lock = threading.Lock()
+
+
+# 임베딩 추론 백엔드
+#   fp32: sentence-transformers 기본 (기준)
+#   int8: torch 동적 양자화 (Linear 가중치 int8, 활성값은 실행 시 양자화) - CPU 전용
+EMBEDDING_BACKENDS = ("fp32", "int8")
+
+
+def embedding_model_id(model_name: str, backend: str = "fp32") -> str:
+    """모델 + 백엔드 식별자 (캐시 키 / 임베딩 서버 일치 확인용, fp32는 모델명 그대로)"""
+    return model_name if backend == "fp32" else f"{model_name}#{backend}"
+
+
+def load_embedding_model(model_name: str, device: str = "cpu", backend: str = "fp32",
+                         max_seq_length: Optional[int] = None):
+    """SentenceTransformer 임베딩 모델 (프로세스당 1회 로드)
+
+    Args:
+        max_seq_length: 최대 토큰 수 (None이면 config의 EMBEDDING_MAX_SEQ_LENGTH)
+    """
+    if max_seq_length is None:
+        from config import EMBEDDING_MAX_SEQ_LENGTH
+        max_seq_length = EMBEDDING_MAX_SEQ_LENGTH
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"지원하지 않는 임베딩 백엔드: {backend} (가능: {', '.join(EMBEDDING_BACKENDS)})")
+    key = ("embedding", model_name, device, backend, max_seq_length)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            print(f"Loading embedding model on {device} ({backend})...")
+            model = SentenceTransformer(model_name, device=device)
+            if backend == "int8":
+                import torch
+                if device != "cpu":
+                    raise ValueError("int8 임베딩 백엔드는 CPU에서만 사용할 수 있습니다")
+                # fp32 가중치를 제자리에서 교체 (fp32 사본을 따로 유지하지 않음)
+                torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+            model.max_seq_length = max_seq_length
+            _models[key] = model
+        return model
+
+
+def load_lexical_head(model_name: str, device: str = "cpu"):
+    """bge-m3 lexical(sparse) 가중치 헤드 (sparse_linear.pt: hidden → 1 Linear, 프로세스당 1회 로드, 실패 시 예외)
+
+    토큰별 가중치 = relu(head(마지막 은닉 상태)), 임베딩과 같은 forward 출력에 적용하므로 모델을 다시 실행하지 않음
+    (int8 백엔드에서도 헤드는 fp32 그대로 사용)
+    """
+    key = ("lexical_head", model_name, device)
+    with _lock:
+        head = _models.get(key)
+        if head is None:
+            import os
+            import torch
+            if os.path.isdir(model_name):
+                path = os.path.join(model_name, "sparse_linear.pt")
+            else:
+                from huggingface_hub import hf_hub_download
+                path = hf_hub_download(model_name, "sparse_linear.pt")
+            state = torch.load(path, map_location=device)
+            head = torch.nn.Linear(state["weight"].shape[1], state["weight"].shape[0])
+            head.load_state_dict(state)
+            head.to(device).eval()
+            print(f"Loaded lexical weight head: {model_name}")
+            _models[key] = head
+        return head
+
+
+def load_cross_encoder(model_name: str, device: str = "cpu", max_length: int = 512):
+    """CrossEncoder 재순위화 모델 (프로세스당 1회 로드, 실패 시 예외)"""
+    key = ("cross_encoder", model_name, device, max_length)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            from sentence_transformers import CrossEncoder
+            print(f"Loading rerank model on {device}: {model_name}...")
+            model = CrossEncoder(model_name, device=device, max_length=max_length)
+            _models[key] = model
+        return model
+
+
+def preload_models():
+    """config 설정의 임베딩/재순위화 모델 미리 로드 (fork 전 마스터 프로세스에서 호출)"""
+    from config import (EMBEDDING_MODEL, EMBEDDING_DEVICE, EMBEDDING_BACKEND, LEXICAL_ENABLED,
+                        RERANK_ENABLED, RERANK_MODEL, RERANK_MAX_LENGTH)
+
+    load_embedding_model(EMBEDDING_MODEL, EMBEDDING_DEVICE, EMBEDDING_BACKEND)
+    if LEXICAL_ENABLED:
+        try:
+            load_lexical_head(EMBEDDING_MODEL, EMBEDDING_DEVICE)
+        except Exception as e:
+            # 임베딩 서버/RAGSystem이 다시 시도하고 실패하면 lexical 검색 비활성화
+            print(f"⚠️ lexical 가중치 헤드 미리 로드 실패: {e}")
+    if RERANK_ENABLED:
+        try:
+            load_cross_encoder(RERANK_MODEL, EMBEDDING_DEVICE, RERANK_MAX_LENGTH)
+        except Exception as e:
+            # 워커의 Reranker가 다시 시도하고 실패하면 재순위화 비활성화
+            print(f"⚠️ 재순위화 모델 미리 로드 실패: {e}")
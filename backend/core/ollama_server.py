@@ -0,0 +1,72 @@
+"""
+Ollama 서버 확인 / 백그라운드 시작 (app.py 단독 실행 또는 serve.py 마스터 프로세스에서 1회 호출)
+"""
+import subprocess
+import sys
+import time
+
+import requests
+
+from config import OLLAMA_BASE_URL
+
+
+def check_ollama_running():
+    """Ollama 서버가 실행 중인지 확인"""
+    try:
+        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=2)
+        return response.status_code == 200
+    except:
+        return False
+
+
+def start_ollama_server():
+    """Ollama 서버를 백그라운드로 시작"""
+    print("[OLLAMA] Checking Ollama server status...")
+    
+    if check_ollama_running():
+        print("[OLLAMA] Ollama server is already running")
+        return True
+    
+    print("[OLLAMA] Starting Ollama server...")
+    
+    try:
+        # Windows에서 백그라운드로 ollama serve 실행
+        if sys.platform == "win32":
+            # DETACHED_PROCESS 플래그로 별도 프로세스로 실행
+            CREATE_NO_WINDOW = 0x08000000
+            subprocess.Popen(
+                ["ollama", "serve"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=CREATE_NO_WINDOW
+            )
+        else:
+            # Linux/Mac
+            subprocess.Popen(
+                ["ollama", "serve"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+        
+        # Ollama가 준비될 때까지 대기 (최대 30초)
+        print("[OLLAMA] Waiting for Ollama to be ready...")
+        for i in range(30):
+            time.sleep(1)
+            if check_ollama_running():
+                print(f"[OLLAMA] Ollama server started successfully (took {i+1}s)")
+                return True
+            if (i + 1) % 5 == 0:
+                print(f"[OLLAMA] Still waiting... ({i+1}s)")
+        
+        print("[OLLAMA] WARNING: Ollama server did not start within 30 seconds")
+        print("[OLLAMA] Please check if Ollama is installed correctly")
+        return False
+        
+    except FileNotFoundError:
+        print("[OLLAMA] ERROR: 'ollama' command not found")
+        print("[OLLAMA] Please install Ollama from https://ollama.ai")
+        return False
+    except Exception as e:
+        print(f"[OLLAMA] ERROR: Failed to start Ollama: {e}")
+        return False
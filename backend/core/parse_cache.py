@@ -0,0 +1,207 @@
+"""
+문서 파싱 결과 디스크 캐시 (DocumentProcessor.extract_text_with_layout)
+
+재인덱싱(청킹/임베딩 변경 후 reindex_documents.py 등) 때 PDF마다 OpenCV 표 감지와 EasyOCR을
+다시 실행하지 않도록, 청킹 전 파싱 결과를 내용 해시 기준으로 저장합니다.
+
+- 키: 항목 종류 + 파서 버전(DocumentProcessor.PARSER_VERSION) + 파싱 옵션 + 내용 해시
+  (파일명/경로와 무관하므로 같은 파일을 다른 이름으로 올려도 적중, 청킹 설정은 키에 포함하지 않음)
+- 항목 종류
+    document: 파일 전체 (파일 내용 SHA-256)
+    page    : PDF 페이지 1개 (페이지 객체 해시 - 일부 페이지만 바뀐 PDF는 바뀐 페이지만 다시 파싱)
+    pdf-mode: PDF 처리 방식 결정 (앞 페이지 표 존재 여부)
+- 항목당 파일 1개 (<dir>/<키 앞 2자>/<키>.pkl, 메타데이터 → 값 순서로 pickle 2개)
+  임시 파일에 쓰고 교체하므로 여러 프로세스(writer 워커, 재인덱싱 스크립트)가 함께 써도 안전
+- LRU: 적중 시 파일 수정 시각을 갱신하고, 전체 크기가 max_bytes를 넘으면 오래된 항목부터 삭제
+- 관리 CLI: scripts/parse_cache.py (stats / list / purge)
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def content_hash(file_path: Path, block_size: int = 1 << 20) -> str:
+    """파일 내용 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """파싱 결과 LRU 디스크 캐시 (스레드/프로세스 안전)"""
+
+    # 삭제 시 전체 크기를 이 비율까지 줄임 (저장할 때마다 삭제하지 않도록)
+    EVICT_TARGET = 0.9
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 2 << 30):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = sum(entry["size"] for entry in self._scan())
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """키 구성 요소(JSON 직렬화 가능) → 캐시 키"""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.pkl"
+
+    def _scan(self) -> List[Dict]:
+        """항목 파일 목록 (경로, 크기, 마지막 사용 시각)"""
+        entries = []
+        for sub in self.cache_dir.iterdir():
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub):
+                if not entry.name.endswith(".pkl"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # 다른 프로세스가 삭제
+                entries.append({"path": Path(entry.path), "size": stat.st_size, "used": stat.st_mtime})
+        return entries
+
+    # ==================== 조회 / 저장 ====================
+
+    def get(self, key: str) -> Optional[Any]:
+        """캐시된 값 (없거나 읽을 수 없으면 None)"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                pickle.load(f)  # 메타데이터
+                value = pickle.load(f)
+            os.utime(path)  # LRU 사용 시각 갱신
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except Exception as e:
+            print(f"[ParseCache] 캐시 항목 읽기 오류 ({key[:12]}): {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, kind: str, label: str = ""):
+        """값 저장 (kind / label은 CLI 조회용)"""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        meta = {"kind": kind, "label": label, "created": time.time()}
+        try:
+            previous = path.stat().st_size if path.exists() else 0
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = tmp_path.stat().st_size
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[ParseCache] 캐시 저장 오류 ({label or key[:12]}): {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._total_bytes += size - previous
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    # ==================== 관리 ====================
+
+    def evict(self, target_bytes: Optional[int] = None) -> int:
+        """오래 사용하지 않은 항목부터 삭제하여 전체 크기를 target_bytes 이하로 (기본: max_bytes × EVICT_TARGET)
+
+        Returns:
+            삭제한 항목 수
+        """
+        if target_bytes is None:
+            target_bytes = int(self.max_bytes * self.EVICT_TARGET)
+        with self._lock:
+            entries = sorted(self._scan(), key=lambda entry: entry["used"])
+            total = sum(entry["size"] for entry in entries)
+            removed = 0
+            for entry in entries:
+                if total <= target_bytes:
+                    break
+                try:
+                    entry["path"].unlink()
+                except OSError:
+                    continue
+                total -= entry["size"]
+                removed += 1
+            self._total_bytes = total
+        if removed:
+            print(f"[ParseCache] 오래된 항목 {removed}개 삭제 (현재 {total / (1 << 20):.1f}MB)")
+        return removed
+
+    def entries(self) -> List[Dict]:
+        """전체 항목 (kind, label, created, used, size, key) - 마지막 사용 시각 내림차순"""
+        result = []
+        for entry in self._scan():
+            try:
+                with open(entry["path"], 'rb') as f:
+                    meta = pickle.load(f)
+            except Exception:
+                meta = {"kind": "?", "label": "", "created": None}
+            result.append({**meta, "used": entry["used"], "size": entry["size"], "key": entry["path"].stem,
+                           "path": entry["path"]})
+        result.sort(key=lambda item: item["used"], reverse=True)
+        return result
+
+    def purge(self, kind: Optional[str] = None, unused_days: Optional[float] = None,
+              label: Optional[str] = None) -> int:
+        """조건에 맞는 항목 삭제 (조건이 없으면 전체)
+
+        Args:
+            kind: 항목 종류 (document / page / pdf-mode)
+            unused_days: 이 기간(일) 동안 사용하지 않은 항목
+            label: 라벨(파일명)에 이 문자열이 포함된 항목
+
+        Returns:
+            삭제한 항목 수
+        """
+        cutoff = time.time() - unused_days * 86400 if unused_days is not None else None
+        removed = 0
+        with self._lock:
+            for entry in self.entries():
+                if kind is not None and entry["kind"] != kind:
+                    continue
+                if cutoff is not None and entry["used"] >= cutoff:
+                    continue
+                if label is not None and label not in (entry["label"] or ""):
+                    continue
+                try:
+                    entry["path"].unlink()
+                except OSError:
+                    continue
+                self._total_bytes -= entry["size"]
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "dir": str(self.cache_dir),
+                "size_mb": round(self._total_bytes / (1 << 20), 1),
+                "max_mb": round(self.max_bytes / (1 << 20), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,177 @@
+"""
+질의 임베딩 LRU 캐시
+
+같은 질문이 반복되는 경우 CPU에서 실행되는 bge-m3 인코딩(수백 ms)을 건너뜁니다.
+
+- 키: (임베딩 모델명, 정규화된 질의 텍스트)
+  정규화: 유니코드 NFC, 앞뒤 공백 제거, 연속 공백 1칸, 소문자
+- 최대 QUERY_EMBEDDING_CACHE_SIZE개 유지, 초과 시 가장 오래 사용하지 않은 항목 제거
+- 경로가 지정되면 pickle 파일로 저장하여 서버 재시작 후에도 유지
+  (인코딩할 때마다 쓰지 않고 SAVE_INTERVAL초에 한 번만 저장)
+- lexical 가중치 검색을 쓰면 같은 인코딩 결과의 질의 lexical 가중치도 함께 보관
+  (get_or_encode_with_lexical, 임베딩만 있는 항목은 다시 인코딩)
+"""
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query_text: str) -> str:
+    """캐시 키용 질의 정규화"""
+    text = unicodedata.normalize("NFC", query_text or "")
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """질의 임베딩 LRU 캐시 (스레드 안전, 선택적 디스크 저장)"""
+
+    VERSION = 1
+    # 디스크 저장 최소 간격 (초)
+    SAVE_INTERVAL = 30.0
+
+    def __init__(self, model_name: str, max_size: int = 2048, cache_path: Optional[Path] = None):
+        self.model_name = model_name
+        self.max_size = max(1, max_size)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lexical: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}  # 키 -> (토큰 id, 가중치)
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._last_save = time.time()
+
+        self._load()
+
+    # ==================== 영속화 ====================
+
+    def _load(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get("version") != self.VERSION:
+                print("[QueryCache] 캐시 파일 버전 불일치, 무시")
+                return
+            for key, embedding in data.get("entries", []):
+                # 다른 모델로 만든 임베딩은 차원/공간이 달라 재사용 불가
+                if key[0] == self.model_name:
+                    self._entries[key] = embedding
+            self._lexical = {key: weights for key, weights in data.get("lexical", []) if key in self._entries}
+            while len(self._entries) > self.max_size:
+                self._evict_oldest()
+            print(f"[QueryCache] 질의 임베딩 캐시 로드: {len(self._entries)}개")
+        except Exception as e:
+            print(f"[QueryCache] 캐시 파일 로드 오류: {e}")
+            self._entries.clear()
+
+    def save(self):
+        """변경 사항이 있으면 캐시 파일 저장"""
+        if self.cache_path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": self.VERSION, "entries": list(self._entries.items()),
+                    "lexical": list(self._lexical.items())}
+            # 워커 프로세스마다 따로 저장하므로 임시 파일명에 pid 포함
+            tmp_path = self.cache_path.with_suffix(f"{self.cache_path.suffix}.{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.cache_path)
+                self._dirty = False
+            except Exception as e:
+                print(f"[QueryCache] 캐시 파일 저장 오류: {e}")
+            self._last_save = time.time()
+
+    def _evict_oldest(self):
+        key, _ = self._entries.popitem(last=False)
+        self._lexical.pop(key, None)
+
+    # ==================== 조회 ====================
+
+    def get_or_encode(self, query_text: str, encode: Callable[[str], np.ndarray]) -> List[float]:
+        """캐시된 임베딩 반환, 없으면 encode(query_text) 결과를 저장 후 반환"""
+        key = (self.model_name, normalize_query(query_text))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding.tolist()
+            self.misses += 1
+
+        # 인코딩은 잠금 밖에서 수행 (다른 질의의 캐시 조회를 막지 않도록)
+        embedding = np.asarray(encode(query_text), dtype=np.float32)
+
+        self._store(key, embedding)
+        return embedding.tolist()
+
+    def get_or_encode_with_lexical(self, query_text: str, encode: Callable[[str], Tuple]) -> Tuple[List[float], Tuple]:
+        """캐시된 (임베딩, lexical 가중치) 반환, 없으면 encode(query_text) -> (임베딩, lexical 가중치) 결과를 저장
+
+        lexical 가중치가 None이면(lexical을 쓸 수 없음) 임베딩만 저장
+        """
+        key = (self.model_name, normalize_query(query_text))
+        with self._lock:
+            embedding = self._entries.get(key)
+            weights = self._lexical.get(key)
+            if embedding is not None and weights is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding.tolist(), weights
+            self.misses += 1
+
+        embedding, weights = encode(query_text)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        self._store(key, embedding, weights)
+        return embedding.tolist(), weights
+
+    def lexical(self, query_text: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """캐시된 질의 lexical 가중치 (적중률 통계에 포함하지 않음)"""
+        with self._lock:
+            return self._lexical.get((self.model_name, normalize_query(query_text)))
+
+    def _store(self, key: Tuple[str, str], embedding: np.ndarray, weights: Optional[Tuple] = None):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            if weights is not None:
+                self._lexical[key] = weights
+            while len(self._entries) > self.max_size:
+                self._evict_oldest()
+            self._dirty = True
+            save_due = time.time() - self._last_save >= self.SAVE_INTERVAL
+        if save_due:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._lexical.clear()
+            self._dirty = True
+        self.save()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,177 @@
+"""
+카탈로그 기반 질의 매칭 (Aho–Corasick 다중 패턴 오토마톤)
+
+질의에서 파일명 / 파일명 구성 요소 / 문서 유형 / 날짜를 한 번의 텍스트 순회로 모두 찾습니다.
+파일명마다 질의를 부분 문자열 검색하던 방식(파일명 구성 요소의 고유성 확인 포함 O(F²))을
+대체하며, 질의 길이에만 비례하는 비용으로 매칭합니다.
+
+- 패턴 종류
+    filename : 전체 파일명, 확장자를 제외한 파일명 → 파일명
+    part     : "_"로 나눈 파일명 구성 요소 (3자 이상) → 그 구성 요소를 가진 파일명 집합
+    doc_type : 문서 유형
+    date     : 날짜 (6자리)
+- 패턴은 대소문자를 구분하지 않음
+- 문서 추가/삭제 시 패턴 등록 정보(참조 횟수)를 갱신하고, 변경한 쪽(DocumentCatalog)이 rebuild()로
+  새 오토마톤을 구성하여 교체 (질의 처리 경로에서는 구성하지 않음)
+  구성은 잠금 밖에서 하므로 그동안의 질의는 이전 오토마톤으로 매칭
+  (삭제된 패턴은 등록 정보가 없어 결과에서 빠지고, 새 패턴은 교체 후부터 매칭)
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+# 파일명 구성 요소로 등록할 최소 길이 (기존 다중 부분 매칭 기준: 2자 초과)
+MIN_PART_LENGTH = 3
+
+
+class AhoCorasick:
+    """Aho–Corasick 오토마톤 (패턴 집합 고정, 변경 시 새로 구성)"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+
+        outputs: List[List[str]] = [[]]
+        for pattern in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][ch] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                node = next_node
+            outputs[node].append(pattern)
+
+        # 실패 링크 (BFS) 및 출력 병합
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                outputs[child].extend(outputs[self._fail[child]])
+        self._output = [tuple(out) for out in outputs]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """텍스트에 나타나는 모든 패턴 [(끝 위치, 패턴)]"""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        matches = []
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                for pattern in output[node]:
+                    matches.append((i + 1, pattern))
+        return matches
+
+
+class CatalogMatcher:
+    """카탈로그 문서로부터 만든 질의 매칭기 (DocumentCatalog가 문서 추가/삭제 시 갱신)"""
+
+    def __init__(self):
+        # 패턴 → {(종류, 값): 참조 횟수}
+        self._patterns: Dict[str, Dict[Tuple[str, str], int]] = {}
+        self._automaton = AhoCorasick(())
+        self._version = 0        # 패턴 변경 횟수
+        self._built_version = 0  # 현재 오토마톤에 반영된 변경 횟수
+
+    @staticmethod
+    def _document_patterns(entry: Dict) -> List[Tuple[str, str, str]]:
+        """문서 항목의 (패턴, 종류, 값) 목록"""
+        patterns = []
+        filename = entry.get("filename")
+        if filename:
+            stem = filename.rsplit('.', 1)[0] if '.' in filename else filename
+            patterns.append((filename, "filename", filename))
+            patterns.append((stem, "filename", filename))
+            for part in set(stem.split('_')):
+                if len(part) >= MIN_PART_LENGTH:
+                    patterns.append((part, "part", filename))
+        if entry.get("doc_type"):
+            patterns.append((entry["doc_type"], "doc_type", entry["doc_type"]))
+        if entry.get("date"):
+            patterns.append((str(entry["date"]), "date", str(entry["date"])))
+        return patterns
+
+    def add_document(self, entry: Dict):
+        for pattern, kind, value in self._document_patterns(entry):
+            payloads = self._patterns.setdefault(pattern.lower(), {})
+            payloads[(kind, value)] = payloads.get((kind, value), 0) + 1
+        self._version += 1
+
+    def remove_document(self, entry: Dict):
+        for pattern, kind, value in self._document_patterns(entry):
+            key = pattern.lower()
+            payloads = self._patterns.get(key)
+            if not payloads or (kind, value) not in payloads:
+                continue
+            payloads[(kind, value)] -= 1
+            if payloads[(kind, value)] <= 0:
+                del payloads[(kind, value)]
+            if not payloads:
+                del self._patterns[key]
+        self._version += 1
+
+    def clear(self):
+        self._patterns.clear()
+        self._version += 1
+
+    def rebuild(self, lock) -> bool:
+        """변경된 패턴으로 오토마톤을 새로 구성하여 교체 (문서 추가/삭제 후 변경한 쪽에서 호출)
+
+        Args:
+            lock: 패턴 등록 정보를 보호하는 잠금 (패턴 목록 복사와 교체 때만 잡고, 구성은 잠금 밖에서)
+
+        Returns:
+            새로 구성했는지 (변경이 없으면 False)
+        """
+        with lock:
+            if self._version == self._built_version:
+                return False
+            version = self._version
+            patterns = list(self._patterns)
+        automaton = AhoCorasick(patterns)
+        with lock:
+            # 동시에 구성한 경우 더 최근 변경을 반영한 오토마톤만 남김
+            if version > self._built_version:
+                self._automaton = automaton
+                self._built_version = version
+        return True
+
+    def match(self, text: str) -> Dict:
+        """질의 텍스트 1회 순회로 모든 매칭 결과 반환
+
+        Returns:
+            {
+                "filenames": {filename: 가장 긴 전체/확장자 제외 파일명 매칭 길이},
+                "parts": {part: {filename, ...}},   # 매칭된 파일명 구성 요소
+                "doc_types": [doc_type, ...],       # 질의에 나타난 순서
+                "dates": [date, ...]
+            }
+        """
+        result = {"filenames": {}, "parts": {}, "doc_types": [], "dates": []}
+        for _, pattern in self._automaton.find_all(text.lower()):
+            for kind, value in self._patterns.get(pattern, {}):
+                if kind == "filename":
+                    result["filenames"][value] = max(result["filenames"].get(value, 0), len(pattern))
+                elif kind == "part":
+                    result["parts"].setdefault(pattern, set()).add(value)
+                elif kind == "doc_type" and value not in result["doc_types"]:
+                    result["doc_types"].append(value)
+                elif kind == "date" and value not in result["dates"]:
+                    result["dates"].append(value)
+        return result
@@ -1,73 +1,399 @@
+import atexit
 import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-import ollama
 from config import *
 from .document_processor import DocumentProcessor
+from .parse_cache import ParseCache, content_hash
+from .embedding_cache import EmbeddingCache
 from .filename_parser import parse_filename
+from .document_catalog import DocumentCatalog
+from .bm25_index import BM25Index, fuse_rankings
+from .lexical_index import LexicalIndex
+from .reranker import Reranker
+from .entity_extractor import EntityExtractionQueue
+from .query_cache import QueryEmbeddingCache
+from .answer_cache import SemanticAnswerCache
+from .intent_classifier import IntentClassifier
+from .context_selector import select_mmr, rank_relevance
+from .context_packer import TokenCounter, pack_context, num_ctx_for, CHAT_TEMPLATE_OVERHEAD
+from .llm_gateway import LLMGateway
+from .llm_scheduler import LLMScheduler, LLMQueueFull
+from .embedding_service import EmbeddingClient, PRIORITY_DOCUMENT, truncation_stats
+from .models import embedding_model_id
+from .index_state import IndexGeneration
 
 class RAGSystem:
     """RAG 시스템 클래스 - 하이브리드 자원 분배"""
     
-    def __init__(self):
-        # ChromaDB 클라이언트 초기화
-        self.chroma_client = chromadb.PersistentClient(
-            path=CHROMA_PERSIST_DIR,
-            settings=Settings(anonymized_telemetry=False)
+    def __init__(self, read_only: bool = False):
+        """
+        Args:
+            read_only: 멀티 프로세스 서버의 reader 워커 (문서 추가/삭제는 writer 프로세스만 수행,
+                       인덱스 재구성/엔티티 추출 생략, 세대 번호가 바뀌면 인덱스를 다시 로드)
+        """
+        self.read_only = read_only
+        self._refresh_lock = threading.Lock()
+        self.index_generation = IndexGeneration(INDEX_GENERATION_PATH)
+        
+        # 문서 프로세서 초기화 (파싱 결과 캐시: 재인덱싱/재업로드 시 바뀌지 않은 파일/페이지는 다시 파싱하지 않음)
+        self.parse_cache = None
+        if PARSE_CACHE_ENABLED and not read_only:
+            self.parse_cache = ParseCache(PARSE_CACHE_DIR, max_bytes=PARSE_CACHE_MAX_MB << 20)
+        self.doc_processor = DocumentProcessor(
+            parse_cache=self.parse_cache,
+            page_workers=PDF_PAGE_WORKERS,
+            page_worker_nice=PDF_PAGE_WORKER_NICE
         )
+        # PDF 페이지 병렬 처리 워커는 다른 스레드(임베딩 배치, LLM 예열, 엔티티 추출, 요청 처리)가 생기기 전에 fork
+        # (인덱싱을 하지 않는 reader 워커는 풀을 만들지 않음)
+        if not read_only:
+            self.doc_processor.start_page_pool()
         
-        # 컬렉션 가져오기 또는 생성
-        try:
-            self.collection = self.chroma_client.get_collection(CHROMA_COLLECTION_NAME)
-        except:
-            self.collection = self.chroma_client.create_collection(
-                name=CHROMA_COLLECTION_NAME,
-                metadata={"hnsw:space": "cosine"}
-            )
+        # ChromaDB 클라이언트 초기화 + 컬렉션 가져오기 또는 생성
+        self._open_collection()
+        
+        # 문서 메타데이터 카탈로그 (전체 컬렉션 스캔 대체)
+        self.catalog = DocumentCatalog(CATALOG_PATH)
+        
+        # BM25 역색인 (하이브리드 검색의 키워드 검색 담당)
+        self.bm25_index = BM25Index(BM25_INDEX_PATH)
+        self._sync_indexes()
+        self._check_embedding_backends()
         
-        # 임베딩 모델 초기화 (CPU에서 실행)
-        print(f"Loading embedding model on {EMBEDDING_DEVICE}...")
-        self.embedding_model = SentenceTransformer(
+        # 임베딩 (임베딩 서버에 배치 요청, 서버가 없으면 프로세스 내 모델로 CPU에서 실행)
+        self.embedder = EmbeddingClient(
             EMBEDDING_MODEL,
-            device=EMBEDDING_DEVICE
+            device=EMBEDDING_DEVICE,
+            server_url=EMBEDDING_SERVER_URL if EMBEDDING_SERVER_ENABLED else None,
+            timeout=EMBEDDING_SERVER_TIMEOUT,
+            retry_interval=EMBEDDING_SERVER_RETRY_INTERVAL,
+            backend=EMBEDDING_BACKEND,
+            lexical=LEXICAL_ENABLED
         )
         
-        # 문서 프로세서 초기화
-        self.doc_processor = DocumentProcessor()
+        # 문서 청크 임베딩 캐시 (바뀌지 않은 청크는 다시 인코딩하지 않음, 인덱싱은 writer 프로세스만 수행)
+        self.embedding_cache = None
+        if EMBEDDING_CACHE_ENABLED and not read_only:
+            self.embedding_cache = EmbeddingCache(
+                EMBEDDING_CACHE_PATH,
+                f"{self.embedder.model_id}@{EMBEDDING_MAX_SEQ_LENGTH}",
+                max_entries=EMBEDDING_CACHE_MAX_ENTRIES
+            )
+        
+        # bge-m3 lexical 가중치 역색인 (임베딩과 같은 forward에서 계산, BM25와 함께 키워드 매칭 담당)
+        self.lexical_index = None
+        if LEXICAL_ENABLED:
+            self.lexical_index = LexicalIndex(LEXICAL_INDEX_PATH)
+            self._sync_lexical_index()
+        
+        # 질의 임베딩 LRU 캐시 (종료 시 디스크에 저장)
+        self.query_embedding_cache = QueryEmbeddingCache(
+            embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+            max_size=QUERY_EMBEDDING_CACHE_SIZE,
+            cache_path=QUERY_EMBEDDING_CACHE_PATH
+        )
+        atexit.register(self.query_embedding_cache.save)
+        
+        # 임베딩 기반 의도 분류기 (시드 질문으로 학습, LLM 분류 호출 대체)
+        self.intent_classifier = IntentClassifier(INTENT_SEED_PATH, embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+                                                  cache_path=INTENT_MODEL_PATH)
+        self.intent_classifier.fit(self.embedder.encode)
+        
+        # 의미 기반 답변 캐시 (문서 추가/삭제 시 영향받는 항목만 제거)
+        self.answer_cache = None
+        if ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                max_size=ANSWER_CACHE_SIZE,
+                similarity_threshold=ANSWER_CACHE_SIMILARITY
+            )
+        
+        # 재순위화 모델 초기화 (CPU에서 실행, 로드 실패 시 융합 점수 순서 사용)
+        self.reranker = None
+        if RERANK_ENABLED:
+            self.reranker = Reranker(
+                RERANK_MODEL,
+                device=EMBEDDING_DEVICE,
+                batch_size=RERANK_BATCH_SIZE,
+                max_length=RERANK_MAX_LENGTH,
+                latency_budget_ms=RERANK_LATENCY_BUDGET_MS
+            )
         
-        # Ollama 연결 확인 (GPU에서 실행됨)
+        # LLM 토크나이저 (컨텍스트 토큰 예산 / num_ctx 계산, 미설정/로드 실패 시 글자 수로 추정 - 시작 시 한 번 로드/안내)
+        self.token_counter = TokenCounter(LLM_TOKENIZER)
+        self.token_counter.load()
+        
+        # 시스템 프롬프트 (간소화 + 중복 처리)
+        self.system_prompt = """너는 기업 문서 검색 어시스턴트다.
+
+규칙:
+1. 제공된 컨텍스트만 사용하여 답변한다. 없는 정보는 "해당 정보가 없습니다"라고 답한다.
+2. 동일한 문서 제목, 참석자 명단, 항목이 여러 번 나오면 한 번만 요약하여 출력한다.
+3. 마크다운을 사용하지 않고 순수 텍스트로 답변한다.
+4. 답변 끝에 [출처: 파일명, 페이지] 형식으로 출처를 표기한다."""
+        
+        # Ollama 게이트웨이 (GPU에서 실행됨, 연결 풀 / keep_alive / 시스템 프롬프트 prefix 공유)
         self.ollama_base_url = OLLAMA_BASE_URL
         self.ollama_model = OLLAMA_MODEL
+        self.llm = LLMGateway(
+            OLLAMA_BASE_URL,
+            OLLAMA_MODEL,
+            self.system_prompt,
+            keep_alive=OLLAMA_KEEP_ALIVE,
+            connect_timeout=OLLAMA_CONNECT_TIMEOUT,
+            default_timeout=OLLAMA_STREAM_TIMEOUT,
+            # 기본 num_ctx: 컨텍스트 예산을 채운 답변 프롬프트 크기 (+ 지침/질문 1024토큰)
+            # 질의마다 num_ctx가 달라져 모델을 다시 로드하지 않도록 이 크기로 예열
+            default_num_ctx=num_ctx_for(CONTEXT_TOKEN_BUDGET + 1024, 1500, LLM_CONTEXT_LIMIT),
+            # 동시 실행 제한 + 우선순위 + 같은 프롬프트 병합 (대기열 초과 시 LLMQueueFull → 429)
+            scheduler=LLMScheduler(max_concurrent=LLM_MAX_CONCURRENT, max_queue=LLM_MAX_QUEUE)
+        )
         
-        # Ollama 연결 테스트
+        # Ollama 연결 테스트 + 모델 예열
         try:
-            host = OLLAMA_BASE_URL.replace("http://", "").replace("https://", "")
-            test_client = ollama.Client(host=host)
-            # 간단한 연결 테스트
-            models = test_client.list()
+            model_names = self.llm.list_models()
             print(f"✅ Ollama 연결 확인: {OLLAMA_BASE_URL}")
-            print(f"   사용 가능한 모델: {[m['name'] for m in models.get('models', [])]}")
+            print(f"   사용 가능한 모델: {model_names}")
             
             # 모델 존재 확인
-            model_names = [m['name'] for m in models.get('models', [])]
             if self.ollama_model not in model_names:
                 print(f"⚠️ 경고: 모델 '{self.ollama_model}'이 설치되지 않았습니다.")
                 print(f"   다음 명령어로 다운로드하세요: ollama pull {self.ollama_model}")
+            elif OLLAMA_WARMUP:
+                self.llm.start_warm_up()
         except Exception as e:
             print(f"⚠️ Ollama 연결 확인 실패: {e}")
             print(f"   Ollama가 실행 중인지 확인하세요: ollama serve")
         
-        # 시스템 프롬프트 (간소화 + 중복 처리)
-        self.system_prompt = """너는 기업 문서 검색 어시스턴트다.
-
-규칙:
-1. 제공된 컨텍스트만 사용하여 답변한다. 없는 정보는 "해당 정보가 없습니다"라고 답한다.
-2. 동일한 문서 제목, 참석자 명단, 항목이 여러 번 나오면 한 번만 요약하여 출력한다.
-3. 마크다운을 사용하지 않고 순수 텍스트로 답변한다.
-4. 답변 끝에 [출처: 파일명, 페이지] 형식으로 출처를 표기한다."""
+        # 엔티티 추출 백그라운드 큐 (인덱싱 응답에 LLM 시간 미포함, 재시작 시 미완료 배치 재개)
+        self.entity_queue = None
+        if ENTITY_EXTRACTION_ENABLED and not read_only:
+            self.entity_queue = EntityExtractionQueue(
+                ENTITY_QUEUE_PATH,
+                self.collection,
+                llm=self.llm,
+                entity_types=ENTITY_TYPES,
+                batch_size=ENTITY_EXTRACTION_BATCH_SIZE,
+                llm_timeout=OLLAMA_ENTITY_TIMEOUT
+            )
+            self.entity_queue.start()
+        
+        # 검색 전 단계 병렬화: 의도 분류/메타데이터 감지와 동시에 질의 임베딩 + 필터 없는 검색을 미리 실행
+        self._prefetch_pool = None
+        if QUERY_PREFETCH_ENABLED:
+            self._prefetch_pool = ThreadPoolExecutor(max_workers=QUERY_PREFETCH_WORKERS, thread_name_prefix="query-prefetch")
+    
+    def _open_collection(self, reopen: bool = False):
+        """ChromaDB 클라이언트 + 컬렉션 열기
+        
+        Args:
+            reopen: 다른 프로세스가 추가한 벡터는 새 클라이언트에서만 보이므로,
+                    공유 시스템 캐시를 비우고 새로 연결 (이전 클라이언트를 쓰는 진행 중 질의는 그대로 완료)
+        """
+        if reopen:
+            try:
+                from chromadb.api.client import SharedSystemClient
+                SharedSystemClient.clear_system_cache()
+            except Exception as e:
+                print(f"[RAG] ChromaDB 클라이언트 캐시 초기화 오류: {e}")
+        
+        chroma_client = chromadb.PersistentClient(
+            path=CHROMA_PERSIST_DIR,
+            settings=Settings(anonymized_telemetry=False)
+        )
+        
+        # 컬렉션 가져오기 또는 생성
+        try:
+            collection = chroma_client.get_collection(CHROMA_COLLECTION_NAME)
+        except:
+            collection = chroma_client.create_collection(
+                name=CHROMA_COLLECTION_NAME,
+                metadata={"hnsw:space": "cosine"}
+            )
+        self.chroma_client = chroma_client
+        self.collection = collection
+    
+    def _index_changed(self):
+        """문서 추가/삭제 후 세대 번호 증가 (다른 워커 프로세스가 인덱스를 다시 로드)"""
+        self.index_generation.bump()
+    
+    def refresh_if_stale(self) -> bool:
+        """다른 프로세스(writer)가 인덱스를 바꿨으면 카탈로그/BM25/벡터 DB를 다시 로드
+        
+        요청마다 호출 (세대 파일의 변경 시각만 확인하므로 평소 비용은 stat 1회)
+        
+        Returns:
+            다시 로드했으면 True
+        """
+        if not self.index_generation.changed():
+            return False
+        with self._refresh_lock:
+            generation = self.index_generation.current()
+            if generation == self.index_generation.seen:
+                return False
+            reload_start = time.time()
+            # 새 객체를 만든 뒤 참조만 바꿈 (진행 중인 질의는 이전 인덱스로 완료)
+            self._open_collection(reopen=True)
+            self.catalog = DocumentCatalog(CATALOG_PATH)
+            self.bm25_index = BM25Index(BM25_INDEX_PATH)
+            if self.lexical_index is not None:
+                self.lexical_index = LexicalIndex(LEXICAL_INDEX_PATH)
+            if self.answer_cache is not None:
+                # 어떤 문서가 바뀌었는지 알 수 없으므로 답변 캐시 전체 제거
+                self.answer_cache.clear()
+            self.index_generation.seen = generation
+            print(f"[RAG] 인덱스 변경 감지 (세대 {generation}): 다시 로드 완료 ({(time.time() - reload_start) * 1000:.0f}ms)")
+            return True
+    
+    def _sync_indexes(self):
+        """카탈로그/BM25 인덱스와 벡터 DB의 청크 수가 다르면 재구성
+        
+        유지보수 스크립트가 컬렉션을 직접 수정한 경우를 대비한 안전장치
+        """
+        try:
+            collection_count = self.collection.count()
+        except Exception as e:
+            print(f"[RAG] 컬렉션 카운트 오류: {e}")
+            return
+        
+        catalog_stale = not self.catalog.loaded or self.catalog.total_chunks() != collection_count
+        bm25_stale = not self.bm25_index.loaded or len(self.bm25_index) != collection_count
+        if self.read_only:
+            # 재구성은 writer 프로세스가 담당 (reader는 writer가 저장한 파일을 세대 변경 시 다시 로드)
+            if catalog_stale or bm25_stale:
+                print(f"[RAG] 경고: 카탈로그/BM25 인덱스가 벡터 DB와 다름 (writer 프로세스에서 재구성)")
+            return
+        
+        try:
+            if catalog_stale:
+                self.catalog.rebuild_from_collection(self.collection)
+        except Exception as e:
+            print(f"[Catalog] 카탈로그 동기화 오류: {e}")
+        
+        try:
+            if bm25_stale:
+                self.bm25_index.rebuild_from_collection(self.collection)
+        except Exception as e:
+            print(f"[BM25] 인덱스 동기화 오류: {e}")
+        
+        if catalog_stale or bm25_stale:
+            self._index_changed()
+    
+    def _sync_lexical_index(self):
+        """lexical 인덱스가 벡터 DB와 다르면 저장된 청크를 다시 인코딩하여 재구성 (LEXICAL_ENABLED를 처음 켠 경우 등)"""
+        if not self.embedder.lexical:
+            print(f"[Lexical] lexical 가중치를 계산할 수 없어 lexical 검색 비활성화")
+            self.lexical_index = None
+            return
+        try:
+            collection_count = self.collection.count()
+        except Exception as e:
+            print(f"[RAG] 컬렉션 카운트 오류: {e}")
+            return
+        if self.lexical_index.loaded and len(self.lexical_index) == collection_count:
+            return
+        if self.read_only:
+            print(f"[RAG] 경고: lexical 인덱스가 벡터 DB와 다름 (writer 프로세스에서 재구성)")
+            return
+        try:
+            self.lexical_index.rebuild_from_collection(
+                self.collection,
+                lambda texts: self.embedder.encode_with_lexical(texts, priority=PRIORITY_DOCUMENT)[2]
+            )
+            self._index_changed()
+        except Exception as e:
+            print(f"[Lexical] 인덱스 동기화 오류: {e}")
+    
+    def _check_embedding_backends(self):
+        """다른 임베딩 백엔드로 만든 벡터가 섞여 있으면 경고 (fp32/int8 벡터는 서로 비교하면 검색 품질이 떨어짐)"""
+        counts = self.catalog.embedding_backend_counts()
+        other = {backend: count for backend, count in counts.items() if backend != EMBEDDING_BACKEND}
+        if other:
+            print(f"[RAG] 경고: 현재 임베딩 백엔드({EMBEDDING_BACKEND})와 다른 백엔드로 인덱싱된 문서가 있음: "
+                  f"{other} (해당 문서 재인덱싱 권장)")
+    
+    def _encode_query(self, query_text: str) -> List[float]:
+        """질의 임베딩 생성 (캐시 우선, lexical 검색을 쓰면 같은 인코딩에서 lexical 가중치도 캐시에 저장)"""
+        if self.lexical_index is not None:
+            return self.query_embedding_cache.get_or_encode_with_lexical(query_text, self._encode_query_with_lexical)[0]
+        return self.query_embedding_cache.get_or_encode(
+            query_text,
+            self.embedder.encode
+        )
+    
+    def _encode_query_with_lexical(self, query_text: str):
+        embeddings, _, weights = self.embedder.encode_with_lexical([query_text])
+        return embeddings[0], (weights[0] if weights else None)
+    
+    def _query_lexical_weights(self, query_text: str):
+        """질의 lexical 가중치 (보통 _encode_query에서 캐시에 저장한 값)"""
+        weights = self.query_embedding_cache.lexical(query_text)
+        if weights is None:
+            _, weights = self.query_embedding_cache.get_or_encode_with_lexical(query_text, self._encode_query_with_lexical)
+        return weights
+    
+    def get_cache_stats(self) -> Dict:
+        """캐시 적중률 통계"""
+        stats = {
+            "query_embedding": self.query_embedding_cache.stats(),
+            "embedder": self.embedder.stats(),
+            "collection_embedding_backends": self.catalog.embedding_backend_counts()
+        }
+        if self.answer_cache is not None:
+            stats["answer"] = self.answer_cache.stats()
+        if self.parse_cache is not None:
+            stats["parse"] = self.parse_cache.stats()
+        if self.embedding_cache is not None:
+            stats["chunk_embedding"] = self.embedding_cache.stats()
+        return stats
+    
+    def _encode_chunks(self, texts: List[str]):
+        """문서 청크 인코딩 (임베딩 캐시에 없는 청크만 모델 실행)
+        
+        Returns:
+            (임베딩, 토큰 수, lexical 가중치 목록 또는 None, 캐시 적중 수)
+        """
+        lexical = self.lexical_index is not None
+        
+        def encode(batch):
+            if lexical:
+                # lexical 가중치도 같은 forward에서 계산 (모델을 다시 실행하지 않음)
+                return self.embedder.encode_with_lexical(batch, priority=PRIORITY_DOCUMENT)
+            embeddings, token_counts = self.embedder.encode_with_tokens(batch, priority=PRIORITY_DOCUMENT)
+            return embeddings, token_counts, None
+        
+        if self.embedding_cache is None:
+            return (*encode(texts), 0)
+        return self.embedding_cache.get_or_encode(texts, encode, lexical=lexical)
+    
+    def _remove_chunks_from_indexes(self, chunk_ids: List[str]):
+        """삭제된 청크를 BM25 인덱스와 엔티티 추출 대기열에서도 제거"""
+        try:
+            if self.bm25_index.remove_chunks(chunk_ids):
+                self.bm25_index.save()
+        except Exception as e:
+            print(f"[BM25] 인덱스 갱신 오류: {e}")
+        
+        if self.lexical_index is not None:
+            try:
+                if self.lexical_index.remove_chunks(chunk_ids):
+                    self.lexical_index.save()
+            except Exception as e:
+                print(f"[Lexical] 인덱스 갱신 오류: {e}")
+        
+        if self.entity_queue is not None:
+            self.entity_queue.discard_chunks(chunk_ids)
+        
+        if self.answer_cache is not None:
+            # 청크 ID 형식: {file_id}_chunk_{i}
+            self.answer_cache.invalidate_files({chunk_id.rsplit("_chunk_", 1)[0] for chunk_id in chunk_ids})
+        
+        self._index_changed()
     
     def _get_file_id(self, file_path: Path) -> str:
         """파일 ID 생성"""
@@ -84,17 +410,15 @@ class RAGSystem:
             }
         """
         try:
-            # 벡터 DB에서 같은 파일명을 가진 문서 검색
-            existing_docs = self.collection.get(where={"filename": filename})
+            # 카탈로그에서 같은 파일명을 가진 문서 검색
+            existing_doc = self.catalog.get_by_filename(filename)
             
-            if existing_docs.get("ids") and len(existing_docs["ids"]) > 0:
+            if existing_doc:
                 # 중복 문서 발견
-                # 첫 번째 문서의 메타데이터에서 file_id 추출
-                first_metadata = existing_docs["metadatas"][0]
-                existing_file_id = first_metadata.get("file_id")
-                date = first_metadata.get("date")
-                doc_type = first_metadata.get("doc_type")
-                doc_title = first_metadata.get("doc_title")
+                existing_file_id = existing_doc.get("file_id")
+                date = existing_doc.get("date")
+                doc_type = existing_doc.get("doc_type")
+                doc_title = existing_doc.get("doc_title")
                 
                 # 메시지 구성
                 message_parts = [f"파일명 '{filename}'과(와) 동일한 문서가 이미 존재합니다."]
@@ -127,9 +451,16 @@ class RAGSystem:
                 "message": f"중복 확인 중 오류 발생: {str(e)}"
             }
     
-    def index_document(self, file_path: Path, filename: str) -> Dict:
-        """문서를 인덱싱하여 벡터 DB에 저장"""
+    def index_document(self, file_path: Path, filename: str, progress_callback=None) -> Dict:
+        """문서를 인덱싱하여 벡터 DB에 저장
+        
+        Args:
+            progress_callback: 단계 전환/페이지 처리마다 progress_callback(stage, **info) 호출
+                               (stage: "parsing" → "embedding" → "storing",
+                                ProcessingCancelled를 발생시키면 벡터 DB 변경 전에 중단)
+        """
         file_id = self._get_file_id(file_path)
+        notify = progress_callback or (lambda stage, **info: None)
         
         print(f"\n{'='*60}")
         print(f"[INDEX] 문서 인덱싱 시작: {filename}")
@@ -137,7 +468,10 @@ class RAGSystem:
         
         # 문서 처리 (Layout-aware)
         print(f"[INDEX] 1단계: 문서 파싱 중...")
-        chunks = self.doc_processor.extract_text_with_layout(file_path)
+        notify("parsing")
+        parse_stats = {}
+        chunks = self.doc_processor.extract_text_with_layout(file_path, progress_callback=progress_callback,
+                                                             stats=parse_stats)
         
         # 표 관련 통계 로그
         table_chunks = [c for c in chunks if c.get("type") == "table"]
@@ -146,6 +480,10 @@ class RAGSystem:
         print(f"    - 총 청크 수: {len(chunks)}")
         print(f"    - 텍스트 청크: {len(text_chunks)}개")
         print(f"    - 표 청크: {len(table_chunks)}개")
+        page_routes = parse_stats.get("page_routes")
+        if page_routes:
+            print(f"    - PDF 페이지 표 경로: 표 없음 {page_routes['none']}, 벡터 표 {page_routes['vector']}, "
+                  f"이미지 표(OCR) {page_routes['image']}, 캐시 {page_routes['cached']}")
         
         # 표 청크 상세 정보 출력
         if table_chunks:
@@ -155,34 +493,18 @@ class RAGSystem:
                 text_preview = tc.get("text", "")[:200].replace('\n', ' ')
                 print(f"    표 {i+1} (페이지 {page}): {text_preview}...")
         
-        # 기존 문서 청크 삭제 (같은 파일 재업로드 시)
-        try:
-            existing = self.collection.get(where={"file_id": file_id})
-            if existing["ids"]:
-                print(f"[INDEX] 기존 청크 {len(existing['ids'])}개 삭제")
-                self.collection.delete(ids=existing["ids"])
-        except:
-            pass
-        
-        # 임베딩 생성 (CPU)
-        print(f"\n[INDEX] 2단계: 임베딩 생성 중... ({len(chunks)}개 청크)")
-        texts = [chunk["text"] for chunk in chunks]
-        embeddings = self.embedding_model.encode(
-            texts,
-            normalize_embeddings=True,
-            show_progress_bar=True
-        ).tolist()
-        
         # 파일명 파싱하여 메타데이터 추출
         parsed_info = parse_filename(filename)
         
         # 메타데이터 준비
         ids = []
+        texts = []
         metadatas = []
         
         for i, chunk in enumerate(chunks):
             chunk_id = f"{file_id}_chunk_{i}"
             ids.append(chunk_id)
+            texts.append(chunk["text"])
             
             # 청크 메타데이터 추출 (document_processor에서 온 정보)
             chunk_metadata = chunk.get("metadata", {})
@@ -197,7 +519,9 @@ class RAGSystem:
                 "type": chunk["type"],
                 "chunk_index": i,
                 "has_table": has_table,
-                "table_continued": table_continued
+                "table_continued": table_continued,
+                "embedding_backend": EMBEDDING_BACKEND,  # 벡터를 만든 추론 백엔드 (혼합 감지용)
+                "text_hash": hashlib.sha256(chunk["text"].encode('utf-8')).hexdigest()  # 재인덱싱 시 변경 비교용
             }
             
             # 파싱된 정보 추가
@@ -212,78 +536,167 @@ class RAGSystem:
             
             metadatas.append(metadata)
         
-        # ChromaDB에 저장
+        # 저장된 청크와 비교 (같은 청크 ID의 텍스트 해시 / 메타데이터)
+        try:
+            existing = self.collection.get(where={"file_id": file_id}, include=["metadatas"])
+            stored = {chunk_id: (metadata or {}) for chunk_id, metadata in zip(existing["ids"], existing["metadatas"])}
+        except Exception as e:
+            print(f"[INDEX] 기존 청크 조회 오류 (전체 청크를 새로 저장): {e}")
+            stored = {}
+        
+        added, updated, relabeled = [], [], []  # 청크 위치 목록
+        for i, (chunk_id, metadata) in enumerate(zip(ids, metadatas)):
+            previous = stored.get(chunk_id)
+            if previous is None:
+                added.append(i)
+            elif (previous.get("text_hash") != metadata["text_hash"]
+                  or previous.get("embedding_backend", "fp32") != EMBEDDING_BACKEND):
+                updated.append(i)
+            elif any(previous.get(key) != value for key, value in metadata.items()):
+                relabeled.append(i)
+        new_ids = set(ids)
+        removed_ids = [chunk_id for chunk_id in stored if chunk_id not in new_ids]
+        changes = {
+            "added": len(added),
+            "updated": len(updated),
+            "relabeled": len(relabeled),
+            "removed": len(removed_ids),
+            "unchanged": len(chunks) - len(added) - len(updated) - len(relabeled),
+        }
+        if stored:
+            print(f"[INDEX] 기존 청크와 비교: 추가 {changes['added']}개, 수정 {changes['updated']}개, "
+                  f"메타데이터 변경 {changes['relabeled']}개, 삭제 {changes['removed']}개, 그대로 {changes['unchanged']}개")
+        
+        # 임베딩 생성 (CPU, 추가/수정된 청크만)
+        to_embed = added + updated
+        embed_ids = [ids[i] for i in to_embed]
+        embed_texts = [texts[i] for i in to_embed]
+        print(f"\n[INDEX] 2단계: 임베딩 생성 중... ({len(to_embed)}개 청크)")
+        notify("embedding", chunks_total=len(to_embed))
+        embed_start = time.time()
+        embeddings, token_counts, lexical_weights, cache_hits = self._encode_chunks(embed_texts)
+        embeddings = embeddings.tolist()
+        embed_seconds = time.time() - embed_start
+        
+        # 최대 시퀀스 길이 초과로 잘린 청크 (청크 크기 조정용)
+        embedding_stats = truncation_stats(token_counts, EMBEDDING_MAX_SEQ_LENGTH)
+        embedding_stats["seconds"] = round(embed_seconds, 2)
+        embedding_stats["chunks_per_sec"] = round(len(embed_texts) / embed_seconds, 1) if embed_seconds > 0 else None
+        embedding_stats["cache_hits"] = cache_hits
+        embedding_stats["cache_hit_rate"] = round(cache_hits / len(embed_texts), 4) if embed_texts else 0.0
+        embedding_stats["chunks_reused"] = len(chunks) - len(to_embed)  # 저장된 벡터를 그대로 사용한 청크
+        print(f"[INDEX] 임베딩 완료: {len(embed_texts)}개 청크, {embed_seconds:.1f}초 ({embedding_stats['chunks_per_sec']}청크/초), "
+              f"최대 {embedding_stats['max_tokens']}토큰, 캐시 적중 {cache_hits}개 ({embedding_stats['cache_hit_rate']:.0%})")
+        if embedding_stats["truncated"]:
+            print(f"[INDEX] 경고: {embedding_stats['truncated']}개 청크가 {EMBEDDING_MAX_SEQ_LENGTH}토큰을 넘어 잘림 "
+                  f"(잘린 토큰 합계 {embedding_stats['truncated_tokens']}, 최대 {embedding_stats['max_truncated_tokens']})")
+        
+        # 저장 직전까지 취소 가능 (이후에는 벡터 DB가 변경되므로 끝까지 진행)
+        notify("storing")
+        
+        # 벡터 DB 반영: 추가/수정 → 메타데이터 변경 → 남는 청크 삭제 순서
+        # (기존 청크를 모두 지운 뒤 다시 넣지 않으므로 저장 중에도 문서가 검색에서 사라지지 않음)
         print(f"\n[INDEX] 3단계: 벡터 DB 저장 중...")
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=metadatas
-        )
+        if to_embed:
+            # upsert는 기존 메타데이터에 덮어쓰므로, 텍스트가 바뀐 청크는 이전 텍스트의 엔티티 추출 결과를 비움
+            # (엔티티는 새 텍스트로 다시 추출)
+            self.collection.upsert(
+                ids=embed_ids,
+                embeddings=embeddings,
+                documents=embed_texts,
+                metadatas=[{**{key: False if isinstance(value, bool) else ""
+                               for key, value in stored.get(ids[i], {}).items() if key not in metadatas[i]},
+                            **metadatas[i]}
+                           for i in to_embed]
+            )
+        if relabeled:
+            # 텍스트가 같으면 벡터와 엔티티 추출 결과는 그대로 두고 메타데이터만 갱신
+            self.collection.update(ids=[ids[i] for i in relabeled], metadatas=[metadatas[i] for i in relabeled])
+        if removed_ids:
+            self.collection.delete(ids=removed_ids)
         
         # 저장된 표 청크 메타데이터 출력
-        saved_table_count = sum(1 for m in metadatas if m.get("type") == "table")
         print(f"\n[INDEX] 저장 완료!")
-        print(f"    - 총 저장된 청크: {len(chunks)}개")
+        print(f"    - 총 청크: {len(chunks)}개 (새로 저장 {len(to_embed)}개, 삭제 {len(removed_ids)}개)")
         print(f"    - 표 청크 메타데이터:")
         for i, m in enumerate(metadatas):
             if m.get("type") == "table":
                 print(f"        페이지 {m.get('page')}: has_table={m.get('has_table', False)}, type={m.get('type')}")
         
+        # BM25 / lexical 인덱스 갱신 (같은 chunk_id는 교체, 텍스트가 그대로인 청크는 유지)
+        changed = bool(to_embed or relabeled or removed_ids)
+        if removed_ids:
+            self.bm25_index.remove_chunks(removed_ids)
+            if self.lexical_index is not None:
+                self.lexical_index.remove_chunks(removed_ids)
+            if self.entity_queue is not None:
+                self.entity_queue.discard_chunks(removed_ids)
+        if to_embed:
+            self.bm25_index.add_chunks(file_id, embed_ids, embed_texts)
+            if self.lexical_index is not None:
+                if lexical_weights is not None:
+                    self.lexical_index.add_chunks(file_id, embed_ids, lexical_weights)
+                else:
+                    # lexical 가중치를 계산하지 못했으면 이전 가중치를 지우고 다음 시작 시 재구성
+                    self.lexical_index.remove_chunks(embed_ids)
+        if to_embed or removed_ids:
+            self.bm25_index.save()
+            if self.lexical_index is not None:
+                self.lexical_index.save()
+        
+        # 카탈로그 갱신 (파일 내용 해시 / 처리 버전: reindex_documents.py --changed-only 비교용)
+        first_page = min((m["page"] for m in metadatas if isinstance(m.get("page"), int)), default=1)
+        self.catalog.upsert(file_id, filename, parsed_info, len(chunks), first_page, EMBEDDING_BACKEND,
+                            content_hash=content_hash(file_path),
+                            processor_version=self.doc_processor.processor_version())
+        
+        if changed:
+            # 이 문서를 사용했거나 검색 범위에 이 문서가 들어가는 캐시 답변 제거
+            if self.answer_cache is not None:
+                self.answer_cache.invalidate_document(file_id, {
+                    "filename": filename,
+                    "date": parsed_info.get("date"),
+                    "doc_type": parsed_info.get("doc_type")
+                })
+            self._index_changed()
+        
+        # 엔티티 추출은 백그라운드에서 처리 (업로드 응답을 기다리게 하지 않음, 텍스트가 바뀐 청크만)
+        if self.entity_queue is not None and embed_ids:
+            self.entity_queue.enqueue(file_id, embed_ids)
+        
         print(f"{'='*60}\n")
         
         return {
             "file_id": file_id,
-            "chunks_count": len(chunks)
+            "chunks_count": len(chunks),
+            "changes": changes,
+            "parsing": parse_stats,
+            "embedding": embedding_stats
         }
     
     def get_document_count_by_type(self, doc_type: str) -> int:
-        """문서 유형별 고유 문서 개수 조회"""
+        """문서 유형별 고유 문서 개수 조회 (카탈로그 기반)"""
         try:
-            # 해당 문서 유형의 모든 문서 가져오기
-            results = self.collection.get(where={"doc_type": doc_type})
-            
-            if not results["ids"]:
-                return 0
-            
-            # 고유한 filename 개수 세기
-            unique_filenames = set()
-            for metadata in results["metadatas"]:
-                filename = metadata.get("filename")
-                if filename:
-                    unique_filenames.add(filename)
-            
-            return len(unique_filenames)
+            return self.catalog.doc_type_counts().get(doc_type, 0)
         except Exception as e:
             print(f"[RAG] 문서 유형별 개수 조회 오류: {e}")
             return 0
     
     def get_all_document_types(self) -> Dict[str, int]:
-        """모든 문서 유형별 문서 개수 조회"""
+        """모든 문서 유형별 문서 개수 조회 (카탈로그 기반)"""
         try:
-            # 모든 문서 가져오기
-            all_docs = self.collection.get()
-            
-            # 문서 유형별로 그룹화
-            doc_type_counts = {}
-            for metadata in all_docs["metadatas"]:
-                doc_type = metadata.get("doc_type")
-                filename = metadata.get("filename")
-                
-                if doc_type and filename:
-                    if doc_type not in doc_type_counts:
-                        doc_type_counts[doc_type] = set()
-                    doc_type_counts[doc_type].add(filename)
-            
-            # 세트를 개수로 변환
-            return {doc_type: len(filenames) for doc_type, filenames in doc_type_counts.items()}
+            return self.catalog.doc_type_counts()
         except Exception as e:
             print(f"[RAG] 문서 유형 목록 조회 오류: {e}")
             return {}
     
-    def _classify_intent(self, query_text: str) -> str:
+    def _classify_intent(self, query_text: str,
+                         get_query_embedding: Optional[Callable[[], List[float]]] = None) -> str:
         """
-        LLM 기반 Intent Classifier (가벼운 프롬프트 사용)
+        Intent Classifier (규칙 → 임베딩 분류기 → LLM 순으로 시도)
+        
+        Args:
+            get_query_embedding: 질의 임베딩 제공 함수 (미리 시작한 임베딩 결과 대기, 없으면 직접 인코딩)
         
         Returns:
             "GLOBAL" - 전체 목록/개수 조회 (벡터 검색 생략)
@@ -319,15 +732,21 @@ class RAGSystem:
                 print(f"[Intent] 규칙 기반 분류: DETAIL (패턴: {pattern})")
                 return "DETAIL"
         
-        # 2단계: 애매한 경우 LLM으로 분류
+        # 2단계: 임베딩 분류기 (질의 임베딩은 캐시되어 검색 단계에서 재사용)
+        if self.intent_classifier.ready:
+            classify_start = time.time()
+            query_embedding = get_query_embedding() if get_query_embedding else self._encode_query(query_text)
+            predict_start = time.time()
+            intent, confidence = self.intent_classifier.predict(query_embedding)
+            predict_ms = (time.time() - predict_start) * 1000
+            print(f"[Intent] 임베딩 분류: {intent} (신뢰도 {confidence:.2f}, 분류 {predict_ms:.2f}ms, "
+                  f"임베딩 포함 {(time.time() - classify_start) * 1000:.0f}ms)")
+            if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+                return intent
+            print(f"[Intent] 신뢰도 낮음 (< {INTENT_CONFIDENCE_THRESHOLD}), LLM 분류로 대체")
+        
+        # 3단계: 애매한 경우 LLM으로 분류
         try:
-            if "http://" in self.ollama_base_url or "https://" in self.ollama_base_url:
-                host = self.ollama_base_url.replace("http://", "").replace("https://", "")
-            else:
-                host = self.ollama_base_url
-            
-            client = ollama.Client(host=host)
-            
             classify_prompt = f"""질문을 분류하세요. 한 단어로만 답하세요.
 
 GLOBAL: 문서 개수, 목록, 현황 질문
@@ -336,13 +755,14 @@ DETAIL: 문서 내용, 세부 정보 질문
 질문: {query_text}
 분류:"""
             
-            response = client.chat(
-                model=self.ollama_model,
-                messages=[{"role": "user", "content": classify_prompt}],
-                options={"temperature": 0, "num_predict": 10}
+            # 답변 호출과 같은 시스템 프롬프트로 시작 (Ollama prefix 캐시 재사용)
+            response = self.llm.chat(
+                self.llm.messages(classify_prompt),
+                options={"temperature": 0, "num_predict": 10},
+                timeout=OLLAMA_CLASSIFY_TIMEOUT
             )
             
-            result = response.message.content.strip().upper()
+            result = response["message"]["content"].strip().upper()
             
             if "GLOBAL" in result:
                 print(f"[Intent] LLM 분류: GLOBAL")
@@ -355,40 +775,102 @@ DETAIL: 문서 내용, 세부 정보 질문
             print(f"[Intent] LLM 분류 실패, 기본값 DETAIL 사용: {e}")
             return "DETAIL"
     
-    def _handle_global_query(self, query_text: str, doc_type_mentioned: str = None) -> Dict:
+    def _resolve_filenames(self, catalog_matches: Dict, specific_doc_date: Optional[str],
+                           doc_type_mentioned: Optional[str]) -> List[str]:
+        """질의가 가리키는 파일명 후보
+        
+        Args:
+            catalog_matches: self.catalog.match_query() 결과
+        
+        Returns:
+            가장 잘 맞는 파일명 목록 (1개면 특정 파일, 여러 개면 동률인 후보, 없으면 빈 목록)
+        """
+        parts = catalog_matches["parts"]
+        
+        def best(scores: Dict[str, int]) -> List[str]:
+            if not scores:
+                return []
+            top = max(scores.values())
+            return sorted(filename for filename, score in scores.items() if score == top)
+        
+        # 1단계: 날짜와 문서 유형이 모두 있으면 해당 파일들 중에서 선택
+        if specific_doc_date and doc_type_mentioned:
+            candidates = {doc["filename"] for doc in self.catalog.find(date=specific_doc_date, doc_type=doc_type_mentioned)
+                          if doc.get("filename")}
+            if len(candidates) == 1:
+                print(f"[RAG] 파일명 감지 (날짜+유형 매칭): {next(iter(candidates))}")
+                return list(candidates)
+            if candidates:
+                # 질의에 나타난 파일명 구성 요소(4자 이상)가 가장 많은 후보
+                scores = {filename: 0 for filename in candidates}
+                for part, owners in parts.items():
+                    if len(part) > 3:
+                        for filename in owners & candidates:
+                            scores[filename] += 1
+                matched = best(scores)
+                if len(matched) == 1:
+                    print(f"[RAG] 파일명 감지 (날짜+유형, 부분 매칭): {matched[0]}")
+                return matched
+        
+        # 2단계: 전체 파일명 또는 확장자 제거한 파일명 (가장 긴 매칭 우선)
+        if catalog_matches["filenames"]:
+            matched = best(catalog_matches["filenames"])
+            if len(matched) == 1:
+                print(f"[RAG] 파일명 감지 (파일명 매칭): {matched[0]}")
+            return matched
+        
+        # 다른 파일명에는 없는 고유한 구성 요소 (예: "센싱플러스")
+        scores = {}
+        for part, owners in parts.items():
+            if len(part) > 3 and len(owners) == 1:
+                filename = next(iter(owners))
+                scores[filename] = scores.get(filename, 0) + 1
+        if scores:
+            matched = best(scores)
+            if len(matched) == 1:
+                print(f"[RAG] 파일명 감지 (고유 부분 매칭): {matched[0]}")
+            return matched
+        
+        # 3단계: 파일명의 구성 요소가 2개 이상 질의에 포함된 파일
+        scores = {}
+        for part, owners in parts.items():
+            for filename in owners:
+                scores[filename] = scores.get(filename, 0) + 1
+        matched = best({filename: score for filename, score in scores.items() if score >= 2})
+        if len(matched) == 1:
+            print(f"[RAG] 파일명 감지 (다중 부분 매칭): {matched[0]}")
+        return matched
+    
+    def _global_query_events(self, query_text: str, doc_type_mentioned: str = None):
         """
         GLOBAL Intent: 전체 현황 파악 (벡터 검색 생략, 메타데이터만 사용)
         
-        LLM에게 파일 리스트를 전달하고 사실 기반 응답 생성
+        LLM에게 파일 리스트를 전달하고 사실 기반 응답 생성 (이벤트 스트림)
         """
         print(f"[RAG] GLOBAL 모드: 메타데이터 기반 응답")
         
         try:
-            # 모든 문서 메타데이터 수집
-            all_docs = self.collection.get()
+            # 모든 문서 메타데이터 수집 (카탈로그)
+            all_docs = self.catalog.documents()
             
-            if not all_docs["metadatas"]:
-                return {
-                    "answer": "현재 등록된 문서가 없습니다.",
-                    "sources": [],
-                    "has_answer": True,
-                    "intent": "GLOBAL"
-                }
+            if not all_docs:
+                yield self._done_event("현재 등록된 문서가 없습니다.", [], True, intent="GLOBAL")
+                return
             
             # 유니크 파일 정보 추출
             file_info = {}
-            for metadata in all_docs["metadatas"]:
-                filename = metadata.get("filename")
+            for doc in all_docs:
+                filename = doc.get("filename")
                 if not filename:
                     continue
                 
                 if filename not in file_info:
                     file_info[filename] = {
-                        "doc_type": metadata.get("doc_type", ""),
-                        "date": metadata.get("date", ""),
+                        "doc_type": doc.get("doc_type") or "",
+                        "date": doc.get("date") or "",
                         "page_count": 0
                     }
-                file_info[filename]["page_count"] += 1
+                file_info[filename]["page_count"] += doc.get("chunk_count", 0)
             
             # 문서 유형별 그룹화
             doc_type_groups = {}
@@ -411,93 +893,469 @@ DETAIL: 문서 내용, 세부 정보 질문
                 dt = info["doc_type"] or "(유형 없음)"
                 file_list_context += f"- {filename} (유형: {dt})\n"
             
+            # LLM 실패 시 사용할 직접 응답
+            if doc_type_mentioned and doc_type_mentioned in doc_type_groups:
+                count = len(doc_type_groups[doc_type_mentioned])
+                fallback_answer = f"{doc_type_mentioned} 문서는 총 {count}개입니다."
+                if count <= 10:
+                    fallback_answer += "\n\n파일 목록:\n" + "\n".join([f"- {f}" for f in doc_type_groups[doc_type_mentioned]])
+            else:
+                fallback_answer = f"등록된 문서는 총 {len(file_info)}개입니다.\n\n"
+                fallback_answer += "문서 유형별 현황:\n"
+                for dt, files in sorted(doc_type_groups.items()):
+                    fallback_answer += f"- {dt}: {len(files)}개\n"
+            
             # LLM에게 파일 리스트 기반 응답 요청
-            try:
-                if "http://" in self.ollama_base_url or "https://" in self.ollama_base_url:
-                    host = self.ollama_base_url.replace("http://", "").replace("https://", "")
-                else:
-                    host = self.ollama_base_url
-                
-                client = ollama.Client(host=host)
-                
-                user_prompt = f"""다음은 현재 등록된 문서 목록입니다.
+            user_prompt = f"""다음은 현재 등록된 문서 목록입니다.
 
 {file_list_context}
 
 질문: {query_text}
 
 위 목록을 바탕으로 정확하게 답변하세요. 마크다운을 사용하지 마세요."""
-                
-                response = client.chat(
-                    model=self.ollama_model,
-                    messages=[
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    options={
-                        "temperature": 0.1,
-                        "num_predict": 1000
-                    }
-                )
-                
-                answer = response.message.content
-                
-            except Exception as e:
-                # LLM 실패 시 직접 응답 생성
-                print(f"[RAG] GLOBAL LLM 응답 실패, 직접 생성: {e}")
-                
-                if doc_type_mentioned and doc_type_mentioned in doc_type_groups:
-                    count = len(doc_type_groups[doc_type_mentioned])
-                    answer = f"{doc_type_mentioned} 문서는 총 {count}개입니다."
-                    if count <= 10:
-                        answer += "\n\n파일 목록:\n" + "\n".join([f"- {f}" for f in doc_type_groups[doc_type_mentioned]])
-                else:
-                    answer = f"등록된 문서는 총 {len(file_info)}개입니다.\n\n"
-                    answer += "문서 유형별 현황:\n"
-                    for dt, files in sorted(doc_type_groups.items()):
-                        answer += f"- {dt}: {len(files)}개\n"
             
-            return {
-                "answer": answer,
-                "sources": [{"filename": f, "page": 1, "type": "metadata"} for f in list(file_info.keys())[:5]],
-                "has_answer": True,
-                "intent": "GLOBAL"
-            }
+            sources = [{"filename": f, "page": 1, "type": "metadata"} for f in list(file_info.keys())[:5]]
+            
+            yield from self._stream_answer(
+                messages=self.llm.messages(user_prompt),
+                options={
+                    "temperature": 0.1,
+                    "num_predict": 1000
+                },
+                sources=sources,
+                fallback_answer=fallback_answer,
+                check_answer=False,
+                intent="GLOBAL"
+            )
             
         except Exception as e:
             print(f"[RAG] GLOBAL 처리 오류: {e}")
             import traceback
             traceback.print_exc()
-            return {
-                "answer": f"문서 현황 조회 중 오류가 발생했습니다: {str(e)}",
-                "sources": [],
-                "has_answer": False,
-                "intent": "GLOBAL"
-            }
+            yield self._done_event(f"문서 현황 조회 중 오류가 발생했습니다: {str(e)}", [], False, intent="GLOBAL")
+    
+    def _search_result_count(self) -> int:
+        """하이브리드 검색 결과 수 (컬렉션 청크 수가 TOP_K_RESULTS보다 적으면 그만큼)"""
+        try:
+            collection_count = self.collection.count()
+            n_results = min(TOP_K_RESULTS, max(1, collection_count))
+            print(f"[RAG] 컬렉션 문서 수: {collection_count}, 요청 결과 수: {n_results}")
+            return n_results
+        except Exception as e:
+            print(f"[RAG] 컬렉션 카운트 오류: {e}, 기본값 사용")
+            return TOP_K_RESULTS
+    
+    def _start_prefetch(self, query_text: str) -> Dict:
+        """질의 임베딩 → 필터 없는 하이브리드 검색을 백그라운드에서 미리 시작
+        
+        의도 분류와 메타데이터(파일명/날짜/문서 유형) 감지는 호출 스레드에서 동시에 진행하고,
+        검색 결과는 필터가 없는 DETAIL 질의에서만 사용 (GLOBAL이거나 필터가 생기면 _discard_prefetch로 버림).
+        같은 작업 안에서 임베딩 → 검색을 순서대로 실행하므로 풀 작업끼리 서로 기다리지 않음.
+        
+        Returns:
+            {"embedding": Future[List[float]], "search": Future[(n_results, results) 또는 None] 또는 None,
+             "discarded": Event, "timings": {...}}
+        """
+        embedding_future = Future()
+        timings = {}
+        prefetch = {"embedding": embedding_future, "search": None, "discarded": threading.Event(),
+                    "timings": timings, "start": time.time()}
+        
+        if self._prefetch_pool is None:
+            # 병렬화 비활성: 임베딩만 필요할 때 직접 인코딩
+            embedding_future.set_running_or_notify_cancel()
+            try:
+                embedding_future.set_result(self._encode_query(query_text))
+            except Exception as e:
+                embedding_future.set_exception(e)
+            return prefetch
+        
+        def run():
+            encode_start = time.time()
+            try:
+                query_embedding = self._encode_query(query_text)
+            except Exception as e:
+                embedding_future.set_exception(e)
+                raise
+            timings["encode_ms"] = (time.time() - encode_start) * 1000
+            embedding_future.set_result(query_embedding)
+            if prefetch["discarded"].is_set():
+                return None  # 결과를 쓰지 않기로 함: 검색 생략
+            
+            search_start = time.time()
+            n_results = self._search_result_count()
+            results = self._hybrid_search(query_text, query_embedding, n_results)
+            timings["search_ms"] = (time.time() - search_start) * 1000
+            return n_results, results
+        
+        embedding_future.set_running_or_notify_cancel()
+        prefetch["search"] = self._prefetch_pool.submit(run)
+        return prefetch
+    
+    def _discard_prefetch(self, prefetch: Dict, reason: str):
+        """미리 시작한 검색 결과를 쓰지 않을 때 호출 (아직 검색 전이면 건너뜀)
+        
+        버린 검색이 QUERY_PREFETCH_WORKERS 풀을 차지해 다른 질의의 선행 검색이 밀리지 않도록 함.
+        future.cancel()은 쓰지 않음: 같은 작업이 질의 임베딩도 계산하므로 대기 중인 작업도 임베딩까지는 실행.
+        """
+        if prefetch["search"] is None or prefetch["discarded"].is_set():
+            return
+        prefetch["discarded"].set()
+        if prefetch["embedding"].done():
+            print(f"[Prefetch] {reason}: 미리 실행한 검색 결과 사용 안 함 (이미 시작된 검색)")
+        else:
+            print(f"[Prefetch] {reason}: 미리 실행할 검색 생략")
+    
+    def _log_prefetch(self, prefetch: Dict, stages: Dict[str, float], used_search: bool):
+        """검색 전 단계별 시간과 병렬 실행으로 줄어든 시간 로그"""
+        timings = prefetch["timings"]
+        stage_times = dict(stages)
+        stage_times["임베딩"] = timings.get("encode_ms", 0.0)
+        if used_search:
+            stage_times["검색(선행)"] = timings.get("search_ms", 0.0)
+        sequential_ms = sum(stage_times.values())
+        wall_ms = (time.time() - prefetch["start"]) * 1000
+        detail = ", ".join(f"{name} {ms:.0f}ms" for name, ms in stage_times.items())
+        print(f"[Prefetch] {detail} → 실제 {wall_ms:.0f}ms (순차 실행 시 {sequential_ms:.0f}ms, "
+              f"{max(0.0, sequential_ms - wall_ms):.0f}ms 절약)")
+    
+    def _hybrid_search(self, query_text: str, query_embedding: List[float], n_results: int,
+                       where_filter: Optional[Dict] = None, file_ids: Optional[set] = None) -> Dict:
+        """벡터 검색 + BM25 검색 (+ lexical 가중치 검색) 결과를 융합 (VECTOR_WEIGHT / BM25_WEIGHT / LEXICAL_WEIGHT)
+        
+        Args:
+            where_filter: ChromaDB 메타데이터 필터 (벡터 검색용)
+            file_ids: 같은 필터를 file_id 집합으로 변환한 것 (BM25 / lexical 검색용)
+        
+        Returns:
+            collection.query와 같은 형식 {"ids": [[...]], "documents": [[...]], "metadatas": [[...]], "embeddings": [[...]]}
+            (융합 점수 내림차순)
+        """
+        # 1. 벡터 검색 (컨텍스트 선택(MMR)에 쓰도록 임베딩도 함께 조회)
+        include = ["documents", "metadatas", "distances", "embeddings"]
+        if where_filter:
+            dense_results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=where_filter,
+                include=include
+            )
+        else:
+            dense_results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                include=include
+            )
+        
+        dense_ids = dense_results["ids"][0] if dense_results["ids"] else []
+        dense_distances = (dense_results.get("distances") or [[]])[0] or [1.0] * len(dense_ids)
+        dense_embeddings = dense_results.get("embeddings")
+        dense_embeddings = dense_embeddings[0] if dense_embeddings is not None else [None] * len(dense_ids)
+        chunk_data = {
+            chunk_id: (dense_results["documents"][0][i], dense_results["metadatas"][0][i], dense_embeddings[i])
+            for i, chunk_id in enumerate(dense_ids)
+        }
+        dense_ranking = [(chunk_id, 1.0 - distance) for chunk_id, distance in zip(dense_ids, dense_distances)]
+        
+        # 2. BM25 검색 (ANN 결과 수 제한과 무관하게 키워드 정확 매칭 확보)
+        sparse_ranking = []
+        if BM25_WEIGHT > 0:
+            bm25_start = time.time()
+            sparse_ranking = self.bm25_index.search(query_text, BM25_TOP_K, file_ids)
+            print(f"[RAG] BM25 검색 완료: {len(sparse_ranking)}개 ({(time.time() - bm25_start) * 1000:.1f}ms)")
+        
+        # 3. lexical 가중치 검색 (bge-m3 토큰 단위 매칭, 질의 가중치는 임베딩과 함께 계산되어 캐시에 있음)
+        lexical_ranking = []
+        lexical_index = self.lexical_index
+        if lexical_index is not None and LEXICAL_WEIGHT > 0:
+            lexical_start = time.time()
+            query_weights = self._query_lexical_weights(query_text)
+            if query_weights is not None:
+                lexical_ranking = lexical_index.search(query_weights, LEXICAL_TOP_K, file_ids)
+            print(f"[RAG] lexical 검색 완료: {len(lexical_ranking)}개 ({(time.time() - lexical_start) * 1000:.1f}ms)")
+        
+        # 4. 점수 융합
+        fused = fuse_rankings(dense_ranking, sparse_ranking, VECTOR_WEIGHT, BM25_WEIGHT,
+                              method=HYBRID_FUSION_METHOD,
+                              lexical=lexical_ranking, lexical_weight=LEXICAL_WEIGHT)[:n_results]
+        
+        # BM25 / lexical 검색에서만 찾은 청크는 벡터 DB에서 본문/메타데이터 조회
+        missing_ids = [chunk_id for chunk_id, _ in fused if chunk_id not in chunk_data]
+        if missing_ids:
+            fetched = self.collection.get(ids=missing_ids, include=["documents", "metadatas", "embeddings"])
+            fetched_embeddings = fetched.get("embeddings")
+            if fetched_embeddings is None:
+                fetched_embeddings = [None] * len(fetched["ids"])
+            for i, chunk_id in enumerate(fetched["ids"]):
+                chunk_data[chunk_id] = (fetched["documents"][i], fetched["metadatas"][i], fetched_embeddings[i])
+            print(f"[RAG] 키워드 검색 전용 결과 {len(fetched['ids'])}개 추가")
+        
+        ids, documents, metadatas, embeddings = [], [], [], []
+        for chunk_id, _ in fused:
+            if chunk_id not in chunk_data:
+                continue
+            document, metadata, embedding = chunk_data[chunk_id]
+            ids.append(chunk_id)
+            documents.append(document)
+            metadatas.append(metadata)
+            embeddings.append(embedding)
+        
+        return {"ids": [ids], "documents": [documents], "metadatas": [metadatas], "embeddings": [embeddings]}
+    
+    def _rerank_chunks(self, query_text: str, chunks: List[Dict], top_k: Optional[int] = RERANK_TOP_K) -> List[Dict]:
+        """Cross-Encoder로 재순위화 후 상위 top_k개 청크 반환 (None이면 전체를 재정렬하여 반환)
+        
+        chunks는 하이브리드 검색(융합 점수) 순서여야 하며, 재순위화 모델이 없거나
+        지연 시간 예산을 넘기면 점수화되지 않은 청크는 융합 점수 순서를 유지합니다.
+        """
+        rerank_start = time.time()
+        
+        if self.reranker is not None and self.reranker.available:
+            order, scores, complete = self.reranker.rerank(query_text, [chunk["doc_text"] for chunk in chunks])
+            for chunk, score in zip(chunks, scores):
+                chunk["rerank_score"] = score
+            chunks = [chunks[i] for i in order]
+            scored_count = sum(1 for score in scores if score is not None)
+            status = "완료" if complete else "부분 완료"
+            print(f"[Rerank] 재순위화 {status}: {scored_count}/{len(scores)}개 점수화 "
+                  f"({(time.time() - rerank_start) * 1000:.0f}ms)")
+        
+        if top_k is None:
+            return chunks
+        selected = chunks[:top_k]
+        print(f"[Rerank] 상위 {len(selected)}개 청크 선택 (후보 {len(chunks)}개)")
+        return selected
+    
+    def _pack_context(self, chunks: List[Dict], prompt_without_context: str, num_predict: int) -> Dict:
+        """토큰 예산 내에서 컨텍스트 구성 (pack_context 결과 + prompt_tokens, num_ctx)
+        
+        Args:
+            chunks: 관련도 순서의 청크 [{"doc_text", "metadata"}]
+            prompt_without_context: 컨텍스트를 비운 사용자 프롬프트 (지침/질문 토큰 계산용)
+            num_predict: 생성 토큰 수 (num_ctx에 함께 확보)
+        """
+        base_tokens = self.token_counter.count(self.system_prompt) + self.token_counter.count(prompt_without_context)
+        budget = min(CONTEXT_TOKEN_BUDGET, LLM_CONTEXT_LIMIT - num_predict - base_tokens - CHAT_TEMPLATE_OVERHEAD)
+        packed = pack_context(chunks, max(budget, 0), self.token_counter)
+        packed["prompt_tokens"] = base_tokens + packed["tokens"]
+        packed["num_ctx"] = num_ctx_for(packed["prompt_tokens"], num_predict, LLM_CONTEXT_LIMIT)
+        # 게이트웨이는 로드된 모델보다 작은 num_ctx로 다시 로드하지 않음 → 실제로 보낼 값을 함께 기록
+        effective = self.llm.effective_num_ctx(packed["num_ctx"])
+        ratchet = f" (로드된 모델 기준 {effective} 사용)" if effective != packed["num_ctx"] else ""
+        estimate = "" if self.token_counter.exact else " (추정)"
+        print(f"[Packer] 컨텍스트 {packed['tokens']}/{budget}토큰{estimate}: 청크 {len(packed['chunks'])}개 포함, "
+              f"{packed['dropped']}개 제외 ({packed['dropped_tokens']}토큰), "
+              f"프롬프트 {packed['prompt_tokens']}토큰 + 생성 {num_predict}토큰 → num_ctx={packed['num_ctx']}{ratchet}")
+        return packed
+    
+    def _sources_from_chunks(self, chunks: List[Dict]) -> List[Dict]:
+        """컨텍스트에 포함된 청크의 출처 목록"""
+        sources = []
+        for chunk in chunks:
+            metadata = chunk["metadata"]
+            text = chunk["doc_text"]
+            sources.append({
+                "filename": metadata.get("filename", "알 수 없음"),
+                "page": metadata.get("page", "알 수 없음"),
+                "type": metadata.get("type", "text"),
+                "text": text[:200] + "..." if len(text) > 200 else text
+            })
+        return sources
+    
+    def _done_event(self, answer: str, sources: List[Dict], has_answer: bool, **extra) -> Dict:
+        """질의 처리 완료 이벤트 (query() 반환값과 같은 필드 + "event")"""
+        event = {"event": "done", "answer": answer, "sources": sources, "has_answer": has_answer}
+        event.update(extra)
+        return event
+    
+    def _llm_error_message(self, e: Exception) -> str:
+        """Ollama 오류를 사용자 안내 메시지로 변환"""
+        if "Connection" in str(e) or "refused" in str(e).lower() or "timeout" in str(e).lower():
+            return "⚠️ Ollama 서버에 연결할 수 없습니다.\n\nOllama가 실행 중인지 확인하세요:\n  ollama serve\n\n또는 모델이 다운로드되었는지 확인:\n  ollama list"
+        elif "model" in str(e).lower() or "not found" in str(e).lower():
+            return f"⚠️ Ollama 모델을 찾을 수 없습니다.\n\n다음 명령어로 모델을 다운로드하세요:\n  ollama pull {self.ollama_model}"
+        else:
+            return f"⚠️ 답변 생성 중 오류가 발생했습니다.\n\n오류: {str(e)[:200]}"
+    
+    def _stream_answer(self, messages: List[Dict], options: Dict, sources: List[Dict],
+                       fallback_answer: Optional[str] = None, check_answer: bool = True,
+                       prompt_tokens_estimate: Optional[int] = None, **extra):
+        """Ollama 토큰 스트림을 질의 이벤트로 변환
+        
+        이벤트 순서: {"event": "sources"} → {"event": "token"}* → {"event": "done"}
+        
+        Args:
+            fallback_answer: LLM 실패 시 사용할 답변 (None이면 오류 안내 메시지, has_answer=False)
+            check_answer: 답변 내용으로 has_answer 판정 여부 ("지식 베이스에 없는 내용" 등)
+            prompt_tokens_estimate: 컨텍스트 구성 시 계산한 프롬프트 토큰 수 (실제 값과 비교 로그용)
+            extra: done 이벤트에 추가할 필드 (예: intent)
+        """
+        yield {"event": "sources", "sources": sources}
+        
+        llm_start = time.time()
+        first_token_time = None
+        
+        try:
+            print(f"[RAG] Ollama 요청: {self.ollama_base_url}, 모델: {self.ollama_model}")
+            
+            pieces = []
+            final_part = {}
+            for part in self.llm.stream_chat(messages, options=options, timeout=OLLAMA_STREAM_TIMEOUT):
+                content = part["message"]["content"]
+                if content:
+                    if first_token_time is None:
+                        first_token_time = time.time() - llm_start
+                        print(f"[RAG] 첫 토큰 수신 (TTFT: {first_token_time:.2f}초)")
+                    pieces.append(content)
+                    yield {"event": "token", "content": content}
+                if part.get("done"):
+                    final_part = part
+            llm_time = time.time() - llm_start
+            
+            answer = "".join(pieces)
+            print(f"[RAG] Ollama 응답 받음 (길이: {len(answer)}자, 소요 시간: {llm_time:.2f}초)")
+            prompt_tokens = final_part.get('prompt_eval_count')
+            estimate_info = f" (계산 {prompt_tokens_estimate})" if prompt_tokens_estimate is not None else ""
+            print(f"[RAG] 토큰: 입력 {prompt_tokens}{estimate_info}, 출력 {final_part.get('eval_count')}"
+                  f"{', num_ctx=' + str(self.llm.effective_num_ctx(options['num_ctx'])) if 'num_ctx' in options else ''}")
+            self.token_counter.calibrate(sum(len(m["content"]) for m in messages), prompt_tokens)
+            
+            # 성능 분석 (스트리밍에서는 첫 토큰까지의 시간이 체감 지연)
+            if first_token_time is not None and first_token_time > 5:
+                print(f"⚠️ 경고: 첫 토큰까지 매우 느립니다 ({first_token_time:.2f}초)")
+                print(f"   GPU가 제대로 사용되고 있는지 확인하세요.")
+            elif llm_time > 10:
+                print(f"⚠️ 주의: LLM 응답이 다소 느립니다 ({llm_time:.2f}초)")
+            
+            has_answer = True
+            if check_answer:
+                # 답변 검증
+                has_answer = "지식 베이스에 없는 내용" not in answer and "관련 문서가 없습니다" not in answer
+                
+                if len(answer.strip()) < 10:
+                    has_answer = False
+                    answer = "지식 베이스에 없는 내용입니다"
+        
+        except LLMQueueFull as e:
+            print(f"[RAG] LLM 대기열 초과: {e}")
+            if fallback_answer is not None:
+                answer = fallback_answer
+                has_answer = True
+            else:
+                answer = "⚠️ 현재 질의가 많아 답변을 생성할 수 없습니다. 잠시 후 다시 시도하세요."
+                has_answer = False
+                extra = dict(extra, busy=True, retry_after=e.retry_after)
+        
+        except Exception as e:
+            import traceback
+            print(f"[RAG] Ollama 오류:")
+            print(traceback.format_exc())
+            
+            if fallback_answer is not None:
+                print(f"[RAG] LLM 응답 실패, 직접 생성한 답변 사용")
+                answer = fallback_answer
+                has_answer = True
+            else:
+                answer = self._llm_error_message(e)
+                has_answer = False
+        
+        yield self._done_event(answer, sources, has_answer, ttft=first_token_time, **extra)
+    
+    def _lookup_answer_cache(self, query_embedding: List[float], scope: Dict) -> Optional[Dict]:
+        """답변 캐시 조회 (캐시 비활성 시 None)"""
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.lookup(query_embedding, scope)
+        if cached is not None:
+            print(f"[AnswerCache] 캐시 적중 (유사도 {cached['similarity']:.3f}), LLM 호출 생략")
+        return cached
+    
+    def _cached_answer_events(self, cached: Dict):
+        """캐시된 답변을 질의 이벤트로 변환"""
+        yield {"event": "sources", "sources": cached["sources"]}
+        yield self._done_event(cached["answer"], cached["sources"], cached["has_answer"], cached=True)
+    
+    def _store_answer_events(self, events, query_embedding: List[float], scope: Dict, file_ids):
+        """답변 이벤트를 그대로 전달하면서 완료된 답변을 캐시에 저장
+        
+        LLM 오류 등으로 답변을 만들지 못한 경우(has_answer=False)는 저장하지 않음
+        """
+        if self.answer_cache is None:
+            yield from events
+            return
+        generation = self.answer_cache.generation
+        for event in events:
+            if event["event"] == "done":
+                if event["has_answer"]:
+                    self.answer_cache.put(query_embedding, scope, event["answer"], event["sources"],
+                                          event["has_answer"], file_ids, generation=generation)
+                event["cached"] = False
+            yield event
     
     def query(self, query_text: str) -> Dict:
-        """RAG 질의 처리 (Intent 기반 동적 검색 전략)"""
+        """RAG 질의 처리 (Intent 기반 동적 검색 전략)
+        
+        Returns:
+            {"answer": str, "sources": [...], "has_answer": bool, ...}
+        """
+        result = None
+        for event in self._query_events(query_text):
+            if event["event"] == "done":
+                result = event
+        result = dict(result)
+        result.pop("event")
+        return result
+    
+    def query_stream(self, query_text: str):
+        """RAG 질의 처리 (스트리밍)
+        
+        Yields:
+            {"event": "sources", "sources": [...]}   검색 완료 직후 (LLM 호출 전)
+            {"event": "token", "content": str}        LLM 토큰
+            {"event": "done", "answer": str, "sources": [...], "has_answer": bool, "ttft": float}
+        """
+        yield from self._query_events(query_text)
+    
+    def _query_events(self, query_text: str):
+        """질의 처리 파이프라인 (query / query_stream 공용 이벤트 생성기)"""
         import time
         import re
         total_start = time.time()
         
         print(f"[RAG] 쿼리 수신: {query_text}")
         
+        # 질의 임베딩 + 필터 없는 검색을 미리 시작 (의도 분류/메타데이터 감지와 병렬)
+        prefetch = self._start_prefetch(query_text)
+        stage_ms = {}  # 호출 스레드에서 실행한 단계별 시간 (임베딩 대기 제외)
+        
+        def wait_embedding():
+            wait_start = time.time()
+            query_embedding = prefetch["embedding"].result()
+            stage_ms["임베딩 대기"] = stage_ms.get("임베딩 대기", 0.0) + (time.time() - wait_start) * 1000
+            return query_embedding
+        
         # ========== Intent Classification ==========
-        intent = self._classify_intent(query_text)
+        intent_start = time.time()
+        intent = self._classify_intent(query_text, wait_embedding)
+        stage_ms["의도 분류"] = (time.time() - intent_start) * 1000 - stage_ms.pop("임베딩 대기", 0.0)
+        
+        # 질의에 나타난 파일명/문서 유형/날짜 매칭 (카탈로그 오토마톤, 질의 1회 순회)
+        metadata_start = time.time()
+        catalog_matches = self.catalog.match_query(query_text)
         
-        # 문서 유형 감지
+        # 문서 유형 감지 (여러 유형이 겹치면 가장 구체적인 유형, 예: "계약서" < "용역계약서")
         doc_type_mentioned = None
         all_doc_types = self.get_all_document_types()
-        for doc_type in all_doc_types.keys():
-            if doc_type in query_text:
-                doc_type_mentioned = doc_type
-                print(f"[RAG] 문서 유형 감지: {doc_type}")
-                break
+        if catalog_matches["doc_types"]:
+            doc_type_mentioned = max(catalog_matches["doc_types"], key=len)
+            print(f"[RAG] 문서 유형 감지: {doc_type_mentioned}")
         
         # ========== GLOBAL Intent: 메타데이터 기반 응답 ==========
         if intent == "GLOBAL":
-            return self._handle_global_query(query_text, doc_type_mentioned)
+            stage_ms["메타데이터"] = (time.time() - metadata_start) * 1000
+            self._discard_prefetch(prefetch, "GLOBAL 질의")
+            yield from self._global_query_events(query_text, doc_type_mentioned)
+            return
         
         # ========== DETAIL Intent: 하이브리드 검색 ==========
         print(f"[RAG] DETAIL 모드: 하이브리드 검색 실행")
@@ -506,7 +1364,8 @@ DETAIL: 문서 내용, 세부 정보 질문
         doc_type_info = None
         doc_titles_info = None
         if doc_type_mentioned:
-            doc_type_info = f"{doc_type_mentioned} 문서는 총 {all_doc_types[doc_type_mentioned]}개입니다."
+            # 유형 개수와 질의 매칭은 카탈로그를 따로 읽으므로 그 사이 삭제된 유형은 0개
+            doc_type_info = f"{doc_type_mentioned} 문서는 총 {all_doc_types.get(doc_type_mentioned, 0)}개입니다."
         
         # "몇 개", "개수", "총" 등의 키워드로 문서 개수 질문 감지
         count_keywords = ["몇 개", "개수", "총", "몇개", "개 있", "개 있나"]
@@ -537,128 +1396,37 @@ DETAIL: 문서 내용, 세부 정보 질문
         specific_doc_type = None
         specific_doc_filename = None
         
-        # 날짜 패턴 추출 (6자리 숫자: 250211)
-        date_pattern = r'(\d{6})'
-        date_match = re.search(date_pattern, query_text)
-        if date_match:
-            specific_doc_date = date_match.group(1)
+        # 날짜 추출 (카탈로그에 있는 날짜 우선, 없으면 6자리 숫자: 250211)
+        if catalog_matches["dates"]:
+            specific_doc_date = catalog_matches["dates"][0]
             print(f"[RAG] 날짜 감지: {specific_doc_date}")
+        else:
+            date_match = re.search(r'(\d{6})', query_text)
+            if date_match:
+                specific_doc_date = date_match.group(1)
+                print(f"[RAG] 날짜 감지: {specific_doc_date}")
         
         # 파일명 감지 및 필터링 (Self-Query Retriever 기능)
+        # 후보가 1개면 해당 파일만, 동률로 여러 개면 후보 전체에서 검색 (임의로 첫 번째 파일을 고르지 않음)
         specific_filename = None
         detected_filenames = []  # 감지된 모든 파일명 (후처리 필터링용)
         try:
-            # 벡터 DB에 저장된 모든 파일명 가져오기
-            all_docs_for_filename_check = self.collection.get()
-            all_filenames = set()
-            for metadata in all_docs_for_filename_check.get("metadatas", []):
-                filename = metadata.get("filename")
-                if filename:
-                    all_filenames.add(filename)
-            
-            # 1단계: 날짜와 문서 유형이 모두 있으면 정확한 파일명 찾기
-            if specific_doc_date and doc_type_mentioned:
-                matching_docs = self.collection.get(where={
-                    "$and": [
-                        {"date": specific_doc_date},
-                        {"doc_type": doc_type_mentioned}
-                    ]
-                })
-                if matching_docs.get("metadatas"):
-                    # 고유한 파일명 추출
-                    unique_filenames = set()
-                    for metadata in matching_docs["metadatas"]:
-                        filename = metadata.get("filename")
-                        if filename:
-                            unique_filenames.add(filename)
-                    
-                    if len(unique_filenames) == 1:
-                        specific_filename = list(unique_filenames)[0]
-                        detected_filenames.append(specific_filename)
-                        print(f"[RAG] 파일명 감지 (날짜+유형 매칭): {specific_filename}")
-                    elif len(unique_filenames) > 1:
-                        # 여러 파일이 있으면 질문에서 파일명 부분 매칭 시도
-                        for filename in unique_filenames:
-                            filename_without_ext = filename.rsplit('.', 1)[0] if '.' in filename else filename
-                            filename_parts = filename_without_ext.split('_')
-                            for part in filename_parts:
-                                if len(part) > 3 and part in query_text:
-                                    specific_filename = filename
-                                    detected_filenames.append(filename)
-                                    print(f"[RAG] 파일명 감지 (부분 매칭): {specific_filename}")
-                                    break
-                            if specific_filename:
-                                break
-                        
-                        # 부분 매칭이 실패하면 첫 번째 파일 선택
-                        if not specific_filename:
-                            specific_filename = list(unique_filenames)[0]
-                            detected_filenames.append(specific_filename)
-                            print(f"[RAG] 파일명 감지 (날짜+유형 매칭, 첫 번째 파일 선택): {specific_filename}")
-            
-            # 2단계: 질문에서 직접 파일명 찾기 (전체 파일명 또는 확장자 제거한 파일명)
-            if not specific_filename:
-                for filename in all_filenames:
-                    filename_without_ext = filename.rsplit('.', 1)[0] if '.' in filename else filename
-                    
-                    # 전체 파일명 매칭 (정확한 매칭 우선)
-                    if filename in query_text:
-                        specific_filename = filename
-                        detected_filenames.append(filename)
-                        print(f"[RAG] 파일명 감지 (전체 파일명 매칭): {specific_filename}")
-                        break
-                    
-                    # 확장자 제거한 파일명 매칭
-                    if filename_without_ext in query_text:
-                        specific_filename = filename
-                        detected_filenames.append(filename)
-                        print(f"[RAG] 파일명 감지 (확장자 제거 매칭): {specific_filename}")
-                        break
-                    
-                    # 파일명의 주요 부분 매칭 (예: "재직증명서", "센싱플러스")
-                    # 단, 다른 파일명과 겹치지 않는 고유한 부분만 매칭
-                    filename_parts = filename_without_ext.split('_')
-                    for part in filename_parts:
-                        if len(part) > 3 and part in query_text:
-                            # 다른 파일명에도 같은 부분이 있는지 확인
-                            is_unique = True
-                            for other_filename in all_filenames:
-                                if other_filename != filename and part in other_filename:
-                                    is_unique = False
-                                    break
-                            
-                            if is_unique:
-                                specific_filename = filename
-                                detected_filenames.append(filename)
-                                print(f"[RAG] 파일명 감지 (고유 부분 매칭): {specific_filename}")
-                                break
-                    
-                    if specific_filename:
-                        break
-            
-            # 3단계: 파일명의 일부가 질문에 포함되어 있는지 확인 (더 넓은 검색)
-            if not specific_filename:
-                for filename in all_filenames:
-                    filename_without_ext = filename.rsplit('.', 1)[0] if '.' in filename else filename
-                    filename_parts = filename_without_ext.split('_')
-                    
-                    # 파일명의 여러 부분이 질문에 포함되어 있는지 확인
-                    matched_parts = [part for part in filename_parts if len(part) > 2 and part in query_text]
-                    if len(matched_parts) >= 2:  # 최소 2개 이상의 부분이 매칭되면
-                        specific_filename = filename
-                        detected_filenames.append(filename)
-                        print(f"[RAG] 파일명 감지 (다중 부분 매칭): {specific_filename}")
-                        break
-            
-            # 감지된 파일명이 여러 개인 경우 로그 출력
-            if len(detected_filenames) > 1:
-                print(f"[RAG] 경고: 여러 파일명이 감지됨: {detected_filenames}, 첫 번째 파일 사용: {specific_filename}")
-                
+            detected_filenames = self._resolve_filenames(catalog_matches, specific_doc_date, doc_type_mentioned)
+            if len(detected_filenames) == 1:
+                specific_filename = detected_filenames[0]
+            elif detected_filenames:
+                print(f"[RAG] 파일명 후보 {len(detected_filenames)}개 (모호함), 후보 전체에서 검색: {detected_filenames[:5]}")
         except Exception as e:
             print(f"[RAG] 파일명 감지 오류: {e}")
             import traceback
             traceback.print_exc()
         
+        stage_ms["메타데이터"] = (time.time() - metadata_start) * 1000
+        
+        # 메타데이터 필터가 적용되는 질의(특정 문서 전체 검색 포함)는 필터 없는 선행 검색 결과를 쓰지 않음
+        if specific_filename or detected_filenames or specific_doc_date or doc_type_mentioned:
+            self._discard_prefetch(prefetch, "메타데이터 필터 적용")
+        
         # "전체", "모든", "나열" 키워드 감지
         full_document_keywords = ["전체", "모든", "나열", "전부", "다", "모두"]
         is_full_document_query = any(keyword in query_text for keyword in full_document_keywords)
@@ -668,6 +1436,15 @@ DETAIL: 문서 내용, 세부 정보 질문
             try:
                 print(f"[RAG] 특정 문서 전체 검색 모드: 날짜={specific_doc_date}, 문서유형={doc_type_mentioned}")
                 
+                # 답변 캐시 확인 (같은 문서 범위에 대한 같은/유사한 질문)
+                query_embedding = prefetch["embedding"].result()
+                cache_scope = {"_mode": "full_document", "date": specific_doc_date, "doc_type": doc_type_mentioned}
+                cached = self._lookup_answer_cache(query_embedding, cache_scope)
+                if cached is not None:
+                    yield from self._cached_answer_events(cached)
+                    print(f"[RAG] 특정 문서 전체 검색 완료 (캐시, 총 {time.time() - total_start:.2f}초)")
+                    return
+                
                 # 필터 조건 설정 (ChromaDB 형식: $and 연산자 사용)
                 where_filter = None
                 if specific_doc_date and doc_type_mentioned:
@@ -736,45 +1513,12 @@ DETAIL: 문서 내용, 세부 정보 질문
                             specific_doc_filename = target_filename
                             print(f"[RAG] 특정 문서 전체 검색: {target_filename}, {len(chunks)}개 청크 발견")
                         
-                        # 페이지 순서대로 컨텍스트 구성
-                        contexts = []
-                        sources = []
-                        
-                        for chunk in chunks:
-                            page = chunk["page"]
-                            text = chunk["text"]
-                            metadata = chunk["metadata"]
-                            
-                            # 메타데이터 정보 추출
-                            filename = metadata.get("filename", "알 수 없음")
-                            doc_type = metadata.get("doc_type")
-                            doc_title = metadata.get("doc_title")
-                            date = metadata.get("date")
-                            
-                            # 컨텍스트에 메타데이터 정보 포함
-                            metadata_str = f"[문서 정보]\n"
-                            metadata_str += f"- 파일명: {filename}\n"
-                            metadata_str += f"- 페이지: {page}\n"
-                            if date:
-                                metadata_str += f"- 날짜: {date}\n"
-                            if doc_type:
-                                metadata_str += f"- 문서 유형: {doc_type}\n"
-                            if doc_title:
-                                metadata_str += f"- 문서 제목: {doc_title}\n"
-                            metadata_str += f"\n[문서 내용]\n{text}"
-                            
-                            contexts.append(metadata_str)
-                            sources.append({
-                                "filename": filename,
-                                "page": page,
-                                "type": metadata.get("type", "text"),
-                                "text": text[:200] + "..." if len(text) > 200 else text
-                            })
-                        
-                        context_text = "\n\n---\n\n".join(contexts)
+                        # 페이지 순서대로 토큰 예산까지 컨텍스트 구성 (초과 페이지는 제외)
+                        page_chunks = [{"doc_text": chunk["text"], "metadata": chunk["metadata"]} for chunk in chunks]
                         
                         # LLM 프롬프트 구성
-                        user_prompt = f"""다음은 특정 문서의 전체 내용입니다. 페이지 순서대로 제공되었습니다.
+                        def build_user_prompt(context_text):
+                            return f"""다음은 특정 문서의 전체 내용입니다. 페이지 순서대로 제공되었습니다.
 
 [문서 전체 내용]
 {context_text}
@@ -801,69 +1545,33 @@ DETAIL: 문서 내용, 세부 정보 질문
    - 답변 마지막에 [출처: 파일명, 페이지 X] 형식으로 소스를 명시하세요.
    - 여러 페이지에서 정보를 가져왔다면 모든 페이지를 명시하세요."""
                         
-                        # Ollama로 답변 생성
-                        try:
-                            import os
-                            if "http://" in self.ollama_base_url or "https://" in self.ollama_base_url:
-                                host = self.ollama_base_url.replace("http://", "").replace("https://", "")
-                            else:
-                                host = self.ollama_base_url
-                            
-                            client = ollama.Client(host=host)
-                            
-                            print(f"[RAG] Ollama 연결 시도: {host}, 모델: {self.ollama_model}")
-                            
-                            llm_start = time.time()
-                            response = client.chat(
-                                model=self.ollama_model,
-                                messages=[
-                                    {"role": "system", "content": self.system_prompt},
-                                    {"role": "user", "content": user_prompt}
-                                ],
+                        num_predict = 2000
+                        packed = self._pack_context(page_chunks, build_user_prompt(""), num_predict)
+                        user_prompt = build_user_prompt(packed["context_text"])
+                        sources = self._sources_from_chunks(packed["chunks"])
+                        
+                        # Ollama로 답변 생성 (토큰 스트림, 완료된 답변은 캐시에 저장)
+                        yield from self._store_answer_events(
+                            self._stream_answer(
+                                messages=self.llm.messages(user_prompt),
                                 options={
                                     "temperature": 0.1,
                                     "top_p": 0.85,
-                                    "num_predict": 2000,
+                                    "num_predict": num_predict,
+                                    "num_ctx": packed["num_ctx"],
                                     "repeat_penalty": 1.2  # 반복 답변 방지
-                                }
-                            )
-                            llm_time = time.time() - llm_start
-                            
-                            answer = response["message"]["content"]
-                            print(f"[RAG] Ollama 응답 받음 (길이: {len(answer)}자, 소요 시간: {llm_time:.2f}초)")
-                            
-                            has_answer = "지식 베이스에 없는 내용" not in answer and "관련 문서가 없습니다" not in answer
-                            
-                            if len(answer.strip()) < 10:
-                                has_answer = False
-                                answer = "지식 베이스에 없는 내용입니다"
-                            
-                            total_time = time.time() - total_start
-                            print(f"[RAG] 특정 문서 전체 검색 완료 (총 {total_time:.2f}초)")
-                            
-                            return {
-                                "answer": answer,
-                                "sources": sources,
-                                "has_answer": has_answer
-                            }
-                        except Exception as e:
-                            import traceback
-                            error_detail = traceback.format_exc()
-                            print(f"[RAG] Ollama 오류:")
-                            print(error_detail)
-                            
-                            if "Connection" in str(e) or "refused" in str(e).lower() or "timeout" in str(e).lower():
-                                answer = "⚠️ Ollama 서버에 연결할 수 없습니다.\n\nOllama가 실행 중인지 확인하세요:\n  ollama serve"
-                            elif "model" in str(e).lower() or "not found" in str(e).lower():
-                                answer = f"⚠️ Ollama 모델을 찾을 수 없습니다.\n\n다음 명령어로 모델을 다운로드하세요:\n  ollama pull {self.ollama_model}"
-                            else:
-                                answer = f"⚠️ 답변 생성 중 오류가 발생했습니다.\n\n오류: {str(e)[:200]}"
-                            
-                            return {
-                                "answer": answer,
-                                "sources": sources,
-                                "has_answer": False
-                            }
+                                },
+                                sources=sources,
+                                prompt_tokens_estimate=packed["prompt_tokens"]
+                            ),
+                            query_embedding,
+                            cache_scope,
+                            {chunk["metadata"].get("file_id") for chunk in packed["chunks"]}
+                        )
+                        
+                        total_time = time.time() - total_start
+                        print(f"[RAG] 특정 문서 전체 검색 완료 (총 {total_time:.2f}초)")
+                        return
                 else:
                     print(f"[RAG] 특정 문서를 찾을 수 없음: 날짜={specific_doc_date}, 문서유형={doc_type_mentioned}")
             except Exception as e:
@@ -874,31 +1582,29 @@ DETAIL: 문서 내용, 세부 정보 질문
         try:
             print(f"[RAG] 쿼리 처리 시작: {query_text[:50]}...")
             
-            # 쿼리 임베딩 생성 (CPU)
+            # 쿼리 임베딩 (CPU, 의도 분류와 병렬로 미리 시작됨)
             embed_start = time.time()
-            query_embedding = self.embedding_model.encode(
-                query_text,
-                normalize_embeddings=True
-            ).tolist()
-            embed_time = time.time() - embed_start
-            print(f"[RAG] 임베딩 생성 완료 ({embed_time:.2f}초)")
+            query_embedding = prefetch["embedding"].result()
+            cache_stats = self.query_embedding_cache.stats()
+            print(f"[RAG] 임베딩 준비 완료 (대기 {time.time() - embed_start:.2f}초, "
+                  f"캐시 적중 {cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})")
             
-            # 컬렉션의 문서 수 확인하여 n_results 조정
             search_start = time.time()
-            try:
-                collection_count = self.collection.count()
-                n_results = min(TOP_K_RESULTS, max(1, collection_count))
-                print(f"[RAG] 컬렉션 문서 수: {collection_count}, 요청 결과 수: {n_results}")
-            except Exception as e:
-                print(f"[RAG] 컬렉션 카운트 오류: {e}, 기본값 사용")
-                n_results = TOP_K_RESULTS
             
             # 필터링 조건 설정 (파일명 우선, 그 다음 날짜+문서유형, 그 다음 문서 유형만)
+            # BM25 검색에는 같은 조건을 카탈로그로 file_id 집합으로 변환하여 적용
             where_filter = None
+            filter_docs = None
             if specific_filename:
                 # 특정 파일명이 감지된 경우 해당 파일만 검색
                 where_filter = {"filename": specific_filename}
+                filter_docs = self.catalog.find(filename=specific_filename)
                 print(f"[RAG] 파일명 필터링 적용: {specific_filename}")
+            elif detected_filenames:
+                # 모호한 파일명 후보 전체
+                where_filter = {"filename": {"$in": detected_filenames}}
+                filter_docs = [doc for filename in detected_filenames for doc in self.catalog.find(filename=filename)]
+                print(f"[RAG] 파일명 후보 필터링 적용: {len(detected_filenames)}개 파일")
             elif specific_doc_date and doc_type_mentioned:
                 # 날짜와 문서 유형이 모두 감지된 경우 둘 다 필터링 (ChromaDB 형식: $and 연산자 사용)
                 where_filter = {
@@ -907,68 +1613,74 @@ DETAIL: 문서 내용, 세부 정보 질문
                         {"doc_type": doc_type_mentioned}
                     ]
                 }
+                filter_docs = self.catalog.find(date=specific_doc_date, doc_type=doc_type_mentioned)
                 print(f"[RAG] 날짜+문서유형 필터링 적용: 날짜={specific_doc_date}, 유형={doc_type_mentioned}")
             elif specific_doc_date:
                 # 날짜만 감지된 경우 날짜 필터링
                 where_filter = {"date": specific_doc_date}
+                filter_docs = self.catalog.find(date=specific_doc_date)
                 print(f"[RAG] 날짜 필터링 적용: {specific_doc_date}")
             elif doc_type_mentioned:
                 # 문서 유형 필터링
                 where_filter = {"doc_type": doc_type_mentioned}
+                filter_docs = self.catalog.find(doc_type=doc_type_mentioned)
                 print(f"[RAG] 문서 유형 필터링 적용: {doc_type_mentioned}")
+            filter_file_ids = {doc["file_id"] for doc in filter_docs} if filter_docs is not None else None
             
-            # 유사 문서 검색
-            if where_filter:
-                results = self.collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=n_results,
-                    where=where_filter
-                )
+            # 답변 캐시 확인 (같은 검색 범위의 같은/유사한 질문이면 검색과 LLM 호출 모두 생략)
+            # 프롬프트에 들어가는 문서 개수 정보도 키에 포함 (개수가 바뀌면 적중하지 않음)
+            cache_scope = {
+                "_mode": "detail",
+                "filename": specific_filename,
+                "_filenames": ",".join(detected_filenames) if len(detected_filenames) > 1 else None,
+                "date": specific_doc_date if not specific_filename else None,
+                "doc_type": doc_type_mentioned if not specific_filename else None,
+                "_doc_type_count": all_doc_types.get(doc_type_mentioned) if doc_type_mentioned else None,
+                "_doc_counts": sorted(all_doc_types.items()) if is_count_query and not doc_type_mentioned else None,
+            }
+            cached = self._lookup_answer_cache(query_embedding, cache_scope)
+            if cached is not None:
+                self._discard_prefetch(prefetch, "답변 캐시 적중")
+                yield from self._cached_answer_events(cached)
+                print(f"[RAG] 전체 쿼리 처리 완료 (캐시, 총 {time.time() - total_start:.2f}초)")
+                return
+            
+            # 하이브리드 검색 (벡터 + BM25)
+            # 필터가 없으면 미리 실행한 검색 결과 사용, 필터가 있으면 버리고 필터 조건으로 다시 검색
+            # (필터 없는 상위 n개를 다시 거르면 필터 범위 안의 하위 청크를 놓치므로 재필터링하지 않음)
+            used_prefetch = where_filter is None and prefetch["search"] is not None
+            if used_prefetch:
+                n_results, results = prefetch["search"].result()
             else:
-                results = self.collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=n_results
-                )
+                n_results = self._search_result_count()
+                results = self._hybrid_search(query_text, query_embedding, n_results, where_filter, filter_file_ids)
+            self._log_prefetch(prefetch, stage_ms, used_prefetch)
             search_time = time.time() - search_start
-            print(f"[RAG] 벡터 검색 완료 ({search_time:.2f}초)")
+            print(f"[RAG] 하이브리드 검색 완료 ({search_time:.2f}초)")
             
             if not results["ids"] or not results["ids"][0]:
                 print(f"[RAG] 검색 결과 없음")
-                return {
-                    "answer": "지식 베이스에 관련 문서가 없습니다.",
-                    "sources": [],
-                    "has_answer": False
-                }
+                yield self._done_event("지식 베이스에 관련 문서가 없습니다.", [], False)
+                return
             
             print(f"[RAG] 검색 결과: {len(results['ids'][0])}개 문서 발견")
         except Exception as e:
             import traceback
             print(f"[RAG] ChromaDB 쿼리 오류:")
             print(traceback.format_exc())
-            return {
-                "answer": f"문서 검색 중 오류가 발생했습니다: {str(e)}",
-                "sources": [],
-                "has_answer": False
-            }
+            yield self._done_event(f"문서 검색 중 오류가 발생했습니다: {str(e)}", [], False)
+            return
         
         # 문서 목록/제목 질문인 경우 메타데이터에서 직접 제목 조회
         if (is_title_query or is_list_query) and (doc_type_mentioned or keyword):
             try:
-                # 필터 조건 설정
-                where_filter = {}
-                if doc_type_mentioned:
-                    where_filter["doc_type"] = doc_type_mentioned
-                
-                # 해당 조건의 모든 문서 가져오기
-                if where_filter:
-                    all_results = self.collection.get(where=where_filter)
-                else:
-                    all_results = self.collection.get()
+                # 해당 조건의 모든 문서 가져오기 (카탈로그)
+                all_results = self.catalog.find(doc_type=doc_type_mentioned)
                 
-                if all_results["metadatas"]:
+                if all_results:
                     # 고유한 문서 제목 추출 (filename 기준)
                     unique_titles = {}
-                    for metadata in all_results["metadatas"]:
+                    for metadata in all_results:
                         doc_title = metadata.get("doc_title")
                         filename = metadata.get("filename")
                         doc_type = metadata.get("doc_type")
@@ -987,7 +1699,8 @@ DETAIL: 문서 내용, 세부 정보 질문
                                     "title": doc_title,
                                     "date": metadata.get("date"),
                                     "filename": filename,
-                                    "doc_type": doc_type
+                                    "doc_type": doc_type,
+                                    "first_page": metadata.get("first_page", 1)
                                 }
                     
                     if unique_titles:
@@ -1005,25 +1718,19 @@ DETAIL: 문서 내용, 세부 정보 질문
                         # 출처는 해당 문서들의 첫 페이지 (원본 파일명 사용)
                         sources = []
                         for filename, info in unique_titles.items():
-                            # 해당 파일의 첫 페이지 찾기
-                            file_results = self.collection.get(where={"filename": filename})
-                            if file_results["metadatas"]:
-                                first_page = min([m.get("page", 1) for m in file_results["metadatas"]])
-                                sources.append({
-                                    "filename": filename,  # 원본 파일명 사용
-                                    "page": first_page,
-                                    "type": "text",
-                                    "text": f"{info['title']}"
-                                })
+                            # 해당 파일의 첫 페이지 (카탈로그에 기록됨)
+                            sources.append({
+                                "filename": filename,  # 원본 파일명 사용
+                                "page": info["first_page"],
+                                "type": "text",
+                                "text": f"{info['title']}"
+                            })
                         
                         total_time = time.time() - total_start
                         print(f"[RAG] 문서 목록 조회 완료: {len(unique_titles)}개 문서 (총 {total_time:.2f}초)")
                         
-                        return {
-                            "answer": answer,
-                            "sources": sources,
-                            "has_answer": True
-                        }
+                        yield self._done_event(answer, sources, True)
+                        return
             except Exception as e:
                 import traceback
                 print(f"[RAG] 문서 목록 조회 오류: {e}")
@@ -1058,6 +1765,7 @@ DETAIL: 문서 내용, 세부 정보 질문
             filename_groups[result_filename].append({
                 "doc_text": doc_text,
                 "metadata": metadata,
+                "embedding": results["embeddings"][0][i],
                 "index": i  # 원본 순서 유지용
             })
         
@@ -1075,123 +1783,57 @@ DETAIL: 문서 내용, 세부 정보 질문
                     chunk["_sort_page"] = 0
                 all_chunks.append(chunk)
         
-        # 파일명 → 페이지 순으로 정렬
-        all_chunks.sort(key=lambda x: (x["_sort_filename"], x["_sort_page"]))
-        
-        # ========== De-duplication 강화 ==========
-        def calculate_text_similarity(text1: str, text2: str) -> float:
-            """텍스트 유사도 계산 (간단한 Jaccard 유사도)"""
-            if not text1 or not text2:
-                return 0.0
-            # 단어 단위로 분할
-            words1 = set(text1.split())
-            words2 = set(text2.split())
-            if not words1 or not words2:
-                return 0.0
-            intersection = len(words1 & words2)
-            union = len(words1 | words2)
-            return intersection / union if union > 0 else 0.0
-        
-        # 1단계: 파일명+페이지 기반 중복 제거
+        # ========== 재순위화: 관련도 순으로 재정렬 (선택은 MMR에서) ==========
+        all_chunks.sort(key=lambda x: x["index"])
+        max_context_count = MAX_CONTEXT_COUNT
+        if RERANK_ENABLED and all_chunks:
+            all_chunks = self._rerank_chunks(query_text, all_chunks, top_k=None)
+            max_context_count = min(RERANK_TOP_K, MAX_CONTEXT_COUNT)
+        
+        # ========== 컨텍스트 선택 ==========
+        # 1단계: 파일명+페이지 기반 중복 제거 (관련도가 가장 높은 청크 유지)
         seen_file_page = set()
-        dedup_chunks_stage1 = []
+        candidates = []
         for chunk in all_chunks:
             key = (chunk["_sort_filename"], chunk["_sort_page"])
             if key not in seen_file_page:
                 seen_file_page.add(key)
-                dedup_chunks_stage1.append(chunk)
+                candidates.append(chunk)
         
-        stage1_removed = len(all_chunks) - len(dedup_chunks_stage1)
+        stage1_removed = len(all_chunks) - len(candidates)
         if stage1_removed > 0:
             print(f"[De-dup] 파일명+페이지 중복 제거: {stage1_removed}개 제거")
         
-        # 2단계: 텍스트 유사도 기반 중복 제거 (90% 이상 유사)
-        SIMILARITY_THRESHOLD = 0.9
-        dedup_chunks_stage2 = []
-        
-        for chunk in dedup_chunks_stage1:
-            is_duplicate = False
-            chunk_text = chunk["doc_text"]
-            
-            for existing_chunk in dedup_chunks_stage2:
-                existing_text = existing_chunk["doc_text"]
-                similarity = calculate_text_similarity(chunk_text, existing_text)
-                
-                if similarity >= SIMILARITY_THRESHOLD:
-                    is_duplicate = True
-                    # 기존 청크에 페이지 정보 병합 (참조용)
-                    if "_merged_pages" not in existing_chunk:
-                        existing_chunk["_merged_pages"] = [existing_chunk["_sort_page"]]
-                    existing_chunk["_merged_pages"].append(chunk["_sort_page"])
-                    break
-            
-            if not is_duplicate:
-                dedup_chunks_stage2.append(chunk)
-        
-        stage2_removed = len(dedup_chunks_stage1) - len(dedup_chunks_stage2)
-        if stage2_removed > 0:
-            print(f"[De-dup] 텍스트 유사도 중복 제거: {stage2_removed}개 제거 (유사도 {SIMILARITY_THRESHOLD*100:.0f}% 이상)")
-        
-        # 최소 15개, 최대 30개 청크 선택
-        MIN_CHUNKS = 15
-        MAX_CHUNKS = 30
-        selected_chunks = dedup_chunks_stage2[:MAX_CHUNKS]
+        # 2단계: MMR 선택 (임베딩 유사도 기반 중복 제외 + 파일당/전체 개수 제한)
+        select_start = time.time()
+        if candidates and all(chunk["embedding"] is not None for chunk in candidates):
+            order = select_mmr(
+                [chunk["embedding"] for chunk in candidates],
+                rank_relevance(len(candidates)),
+                [chunk["_sort_filename"] for chunk in candidates],
+                max_count=max_context_count,
+                min_count=MIN_CONTEXT_COUNT,
+                per_file_cap=MAX_CHUNKS_PER_FILE,
+                mmr_lambda=CONTEXT_MMR_LAMBDA,
+                duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD
+            )
+            selected_chunks = [candidates[i] for i in order]
+        else:
+            selected_chunks = candidates[:max_context_count]
+        print(f"[MMR] 컨텍스트 선택: 후보 {len(candidates)}개 → {len(selected_chunks)}개 "
+              f"(최대 {max_context_count}개, 파일당 {MAX_CHUNKS_PER_FILE}개, {(time.time() - select_start) * 1000:.1f}ms)")
         
         # 청크가 부족하면 있는 만큼만 사용
-        if len(selected_chunks) < MIN_CHUNKS:
-            print(f"[RAG] 경고: 검색된 청크({len(selected_chunks)}개)가 최소 요구치({MIN_CHUNKS}개)보다 적음")
-        
-        print(f"[De-dup] 최종 청크 수: {len(selected_chunks)}개 (원본 {len(all_chunks)}개)")
-        
-        contexts = []
-        sources = []
-        unique_filenames = set()
-        
-        for chunk in selected_chunks:
-            metadata = chunk["metadata"]
-            doc_text = chunk["doc_text"]
-            filename = metadata.get("filename", "알 수 없음")
-            page = metadata.get("page", "알 수 없음")
-            doc_type = metadata.get("doc_type")
-            doc_title = metadata.get("doc_title")
-            date = metadata.get("date")
-            
-            unique_filenames.add(filename)  # 통계용
-            
-            # 컨텍스트에 메타데이터 정보 포함
-            metadata_str = f"[문서 정보]\n"
-            metadata_str += f"- 파일명: {filename}\n"
-            metadata_str += f"- 페이지: {page}\n"
-            if date:
-                metadata_str += f"- 날짜: {date}\n"
-            if doc_type:
-                metadata_str += f"- 문서 유형: {doc_type}\n"
-            if doc_title:
-                metadata_str += f"- 문서 제목: {doc_title}\n"
-            metadata_str += f"\n[문서 내용]\n{doc_text}"
-            
-            contexts.append(metadata_str)
-            sources.append({
-                "filename": filename,
-                "page": page,
-                "type": metadata.get("type", "text"),
-                "text": doc_text[:200] + "..." if len(doc_text) > 200 else doc_text
-            })
+        if len(selected_chunks) < MIN_CONTEXT_COUNT:
+            print(f"[RAG] 경고: 검색된 청크({len(selected_chunks)}개)가 최소 요구치({MIN_CONTEXT_COUNT}개)보다 적음")
         
         if filtered_count > 0:
             print(f"[RAG] 파일명 필터링 완료: {filtered_count}개 청크 제외")
         
-        print(f"[RAG] 컨텍스트 구성 완료: {len(contexts)}개 청크, {len(unique_filenames)}개 파일에서 추출")
-        
-        if not contexts:
+        if not selected_chunks:
             print(f"[RAG] 경고: 파일명 필터링 후 사용 가능한 청크가 없음")
-            return {
-                "answer": f"요청하신 파일명('{specific_filename if specific_filename else '알 수 없음'}')과 일치하는 문서를 찾을 수 없습니다.",
-                "sources": [],
-                "has_answer": False
-            }
-        
-        context_text = "\n\n---\n\n".join(contexts)
+            yield self._done_event(f"요청하신 파일명('{specific_filename if specific_filename else '알 수 없음'}')과 일치하는 문서를 찾을 수 없습니다.", [], False)
+            return
         
         # 문서 유형별 개수 정보 및 제목 정보 추가
         metadata_info = ""
@@ -1206,7 +1848,8 @@ DETAIL: 문서 내용, 세부 정보 질문
             metadata_info = f"\n\n[문서 유형별 개수 정보]\n{type_list}\n"
         
         # LLM 프롬프트 구성
-        user_prompt = f"""다음 컨텍스트를 참고하여 질문에 답변하세요.
+        def build_user_prompt(context_text):
+            return f"""다음 컨텍스트를 참고하여 질문에 답변하세요.
 
 [컨텍스트]
 {context_text}{metadata_info}
@@ -1236,85 +1879,45 @@ DETAIL: 문서 내용, 세부 정보 질문
    - 답변 마지막에 [출처: 파일명, 페이지 X] 형식으로 소스를 명시하세요.
    - 여러 소스가 있으면 모두 명시하세요."""
         
-        # Ollama로 답변 생성 (GPU)
-        try:
-            # Ollama 클라이언트가 base_url을 사용하도록 설정
-            import os
-            # 환경 변수 설정
-            if "http://" in self.ollama_base_url or "https://" in self.ollama_base_url:
-                host = self.ollama_base_url.replace("http://", "").replace("https://", "")
-            else:
-                host = self.ollama_base_url
-            
-            client = ollama.Client(host=host)
-            
-            print(f"[RAG] Ollama 연결 시도: {host}, 모델: {self.ollama_model}")
-            
-            # LLM 추론 시간 측정
-            llm_start = time.time()
-            response = client.chat(
-                model=self.ollama_model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+        # 토큰 예산 내에서 관련도 순으로 컨텍스트 구성 (파일별 헤더 1회)
+        num_predict = 1500
+        packed = self._pack_context(selected_chunks, build_user_prompt(""), num_predict)
+        user_prompt = build_user_prompt(packed["context_text"])
+        sources = self._sources_from_chunks(packed["chunks"])
+        unique_filenames = {chunk["metadata"].get("filename", "알 수 없음") for chunk in packed["chunks"]}
+        print(f"[RAG] 컨텍스트 구성 완료: {len(packed['chunks'])}개 청크, {len(unique_filenames)}개 파일에서 추출")
+        
+        # Ollama로 답변 생성 (GPU, 토큰 스트림, 완료된 답변은 캐시에 저장)
+        yield from self._store_answer_events(
+            self._stream_answer(
+                messages=self.llm.messages(user_prompt),
                 options={
                     "temperature": 0.1,
                     "top_p": 0.85,
-                    "num_predict": 1500,
+                    "num_predict": num_predict,
+                    "num_ctx": packed["num_ctx"],
                     "repeat_penalty": 1.2  # 반복 답변 방지
-                }
-            )
-            llm_time = time.time() - llm_start
-            
-            answer = response["message"]["content"]
-            print(f"[RAG] Ollama 응답 받음 (길이: {len(answer)}자, 소요 시간: {llm_time:.2f}초)")
-            
-            # 성능 분석
-            if llm_time > 10:
-                print(f"⚠️ 경고: LLM 응답이 매우 느립니다 ({llm_time:.2f}초)")
-                print(f"   GPU가 제대로 사용되고 있는지 확인하세요.")
-            elif llm_time > 5:
-                print(f"⚠️ 주의: LLM 응답이 다소 느립니다 ({llm_time:.2f}초)")
-            
-            # 답변 검증
-            has_answer = "지식 베이스에 없는 내용" not in answer and "관련 문서가 없습니다" not in answer
-            
-            if len(answer.strip()) < 10:
-                has_answer = False
-                answer = "지식 베이스에 없는 내용입니다"
-            
-        except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
-            print(f"[RAG] Ollama 오류:")
-            print(error_detail)
-            
-            # 친절한 에러 메시지
-            if "Connection" in str(e) or "refused" in str(e).lower() or "timeout" in str(e).lower():
-                answer = "⚠️ Ollama 서버에 연결할 수 없습니다.\n\nOllama가 실행 중인지 확인하세요:\n  ollama serve\n\n또는 모델이 다운로드되었는지 확인:\n  ollama list"
-            elif "model" in str(e).lower() or "not found" in str(e).lower():
-                answer = f"⚠️ Ollama 모델을 찾을 수 없습니다.\n\n다음 명령어로 모델을 다운로드하세요:\n  ollama pull {self.ollama_model}"
-            else:
-                answer = f"⚠️ 답변 생성 중 오류가 발생했습니다.\n\n오류: {str(e)[:200]}"
-            has_answer = False
+                },
+                sources=sources,
+                prompt_tokens_estimate=packed["prompt_tokens"]
+            ),
+            query_embedding,
+            cache_scope,
+            {chunk["metadata"].get("file_id") for chunk in packed["chunks"]}
+        )
         
         total_time = time.time() - total_start
         print(f"[RAG] 전체 쿼리 처리 완료 (총 {total_time:.2f}초)")
-        
-        return {
-            "answer": answer,
-            "sources": sources,
-            "has_answer": has_answer
-        }
     
     def delete_document(self, file_id: str):
         """벡터 DB에서 문서 삭제 (file_id로 직접 삭제)"""
         try:
-            existing = self.collection.get(where={"file_id": file_id})
+            existing = self.collection.get(where={"file_id": file_id}, include=[])
             if existing["ids"]:
                 deleted_count = len(existing["ids"])
                 self.collection.delete(ids=existing["ids"])
+                self.catalog.remove(file_id)
+                self._remove_chunks_from_indexes(existing["ids"])
                 print(f"[RAG] 문서 삭제 완료: file_id={file_id}, 삭제된 청크 수={deleted_count}")
                 return deleted_count
             else:
@@ -1336,27 +1939,37 @@ DETAIL: 문서 내용, 세부 정보 질문
             print(f"[RAG] 파일명 기반 삭제 시도: {filename}")
             
             # 정확한 파일명 매칭
-            existing = self.collection.get(where={"filename": filename})
+            existing = self.collection.get(where={"filename": filename}, include=[])
             
             if existing["ids"]:
                 deleted_count = len(existing["ids"])
                 self.collection.delete(ids=existing["ids"])
+                self.catalog.remove_by_filename(filename)
+                self._remove_chunks_from_indexes(existing["ids"])
                 print(f"[RAG] 문서 삭제 완료 (filename): {filename}, 삭제된 청크 수={deleted_count}")
                 return deleted_count
             else:
                 # 부분 매칭 시도 (안전한 파일명으로 저장된 경우)
-                print(f"[RAG] 정확한 매칭 실패, 전체 검색으로 재시도")
-                all_docs = self.collection.get()
+                print(f"[RAG] 정확한 매칭 실패, 카탈로그 파일명으로 재시도")
+                matched_filenames = [
+                    doc_filename for doc_filename in self.catalog.filenames()
+                    # 파일명이 포함되어 있거나, 일부가 매칭되면 삭제 대상
+                    if filename in doc_filename or doc_filename in filename
+                ]
                 
                 ids_to_delete = []
-                for i, metadata in enumerate(all_docs["metadatas"]):
-                    doc_filename = metadata.get("filename", "")
-                    # 파일명이 포함되어 있거나, 일부가 매칭되면 삭제 대상
-                    if doc_filename == filename or filename in doc_filename or doc_filename in filename:
-                        ids_to_delete.append(all_docs["ids"][i])
+                if matched_filenames:
+                    matched = self.collection.get(
+                        where={"filename": {"$in": matched_filenames}},
+                        include=[]
+                    )
+                    ids_to_delete = matched["ids"]
                 
                 if ids_to_delete:
                     self.collection.delete(ids=ids_to_delete)
+                    for doc_filename in matched_filenames:
+                        self.catalog.remove_by_filename(doc_filename)
+                    self._remove_chunks_from_indexes(ids_to_delete)
                     print(f"[RAG] 문서 삭제 완료 (부분 매칭): {filename}, 삭제된 청크 수={len(ids_to_delete)}")
                     return len(ids_to_delete)
                 else:
@@ -1377,20 +1990,24 @@ DETAIL: 문서 내용, 세부 정보 질문
             print(f"[RAG] 파일 경로 기반 삭제 시도: {file_path}, file_id={file_id}")
             
             # file_id로 문서 검색 및 삭제
-            existing = self.collection.get(where={"file_id": file_id})
+            existing = self.collection.get(where={"file_id": file_id}, include=[])
             if existing["ids"]:
                 deleted_count = len(existing["ids"])
                 self.collection.delete(ids=existing["ids"])
+                self.catalog.remove(file_id)
+                self._remove_chunks_from_indexes(existing["ids"])
                 print(f"[RAG] 문서 삭제 완료: file_id={file_id}, 삭제된 청크 수={deleted_count}")
                 return deleted_count
             else:
                 # file_id로 찾지 못하면 filename으로도 시도
                 filename = file_path.name
                 print(f"[RAG] file_id로 찾지 못함, filename으로 재시도: {filename}")
-                existing = self.collection.get(where={"filename": filename})
+                existing = self.collection.get(where={"filename": filename}, include=[])
                 if existing["ids"]:
                     deleted_count = len(existing["ids"])
                     self.collection.delete(ids=existing["ids"])
+                    self.catalog.remove_by_filename(filename)
+                    self._remove_chunks_from_indexes(existing["ids"])
                     print(f"[RAG] 문서 삭제 완료 (filename 기반): filename={filename}, 삭제된 청크 수={deleted_count}")
                     return deleted_count
                 else:
@@ -0,0 +1,89 @@
+"""
+Cross-Encoder 재순위화 모듈
+
+하이브리드 검색 결과(질의-청크 쌍)를 Cross-Encoder로 다시 점수화하여
+LLM에 전달할 청크를 관련도 상위 RERANK_TOP_K개로 줄입니다.
+
+- CPU에서 실행 (임베딩 모델과 동일)
+- 질의-청크 쌍을 RERANK_BATCH_SIZE 단위로 배치 처리
+- 지연 시간 예산(RERANK_LATENCY_BUDGET_MS)을 넘길 것으로 예상되면
+  남은 배치를 건너뛰고, 점수화되지 않은 청크는 기존(융합 점수) 순서로 뒤에 붙임
+"""
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class Reranker:
+    """Cross-Encoder 기반 재순위화기 (모델 로드 실패 시 비활성)"""
+
+    def __init__(self, model_name: str, device: str = "cpu", batch_size: int = 16,
+                 max_length: int = 512, latency_budget_ms: float = 1500):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.latency_budget_ms = latency_budget_ms
+        self._lock = threading.Lock()
+        self.model = None
+
+        try:
+            from .models import load_cross_encoder
+            self.model = load_cross_encoder(model_name, device=device, max_length=max_length)
+        except Exception as e:
+            print(f"⚠️ 재순위화 모델 로드 실패, 재순위화 비활성화: {e}")
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    def rerank(self, query_text: str, passages: List[str],
+               latency_budget_ms: Optional[float] = None) -> Tuple[List[int], List[Optional[float]], bool]:
+        """질의-청크 쌍 점수화 후 재정렬
+
+        Args:
+            query_text: 질의 텍스트
+            passages: 기존 관련도 순서의 청크 텍스트 목록
+            latency_budget_ms: 지연 시간 예산 (None이면 기본값)
+
+        Returns:
+            (order, scores, complete)
+            - order: 재정렬된 passages 인덱스 (점수화된 청크 → 점수화되지 않은 청크)
+            - scores: passages 순서의 점수 (예산 초과로 건너뛴 청크는 None)
+            - complete: 모든 청크가 점수화되었는지 여부
+        """
+        if not passages:
+            return [], [], True
+        if not self.available:
+            return list(range(len(passages))), [None] * len(passages), False
+
+        budget = self.latency_budget_ms if latency_budget_ms is None else latency_budget_ms
+        scores: List[Optional[float]] = [None] * len(passages)
+        start = time.time()
+        scored = 0
+
+        # 모델은 스레드 안전하지 않으므로 동시 질의는 순차 처리
+        with self._lock:
+            for batch_start in range(0, len(passages), self.batch_size):
+                elapsed_ms = (time.time() - start) * 1000
+                if scored:
+                    # 지금까지의 배치 평균으로 다음 배치가 예산을 넘길지 추정
+                    per_batch_ms = elapsed_ms / (batch_start / self.batch_size)
+                    if elapsed_ms + per_batch_ms > budget:
+                        print(f"[Rerank] 지연 시간 예산 초과 예상 ({elapsed_ms:.0f}ms + {per_batch_ms:.0f}ms > {budget:.0f}ms), "
+                              f"{len(passages) - scored}개 청크 점수화 생략")
+                        break
+                batch = passages[batch_start:batch_start + self.batch_size]
+                batch_scores = self.model.predict(
+                    [(query_text, passage) for passage in batch],
+                    batch_size=self.batch_size,
+                    show_progress_bar=False
+                )
+                for offset, score in enumerate(batch_scores):
+                    scores[batch_start + offset] = float(score)
+                scored += len(batch)
+
+        scored_indices = sorted((i for i, s in enumerate(scores) if s is not None),
+                                key=lambda i: scores[i], reverse=True)
+        unscored_indices = [i for i, s in enumerate(scores) if s is None]
+        return scored_indices + unscored_indices, scores, not unscored_indices
@@ -0,0 +1,43 @@
+"""
+임베딩 서버 단독 실행 (개발 서버 또는 같은 호스트의 여러 API/인덱싱 프로세스가 공유)
+
+    python embedding_server.py [--port 5002] [--lexical]
+
+serve.py는 embedder 워커로 이 서버를 직접 띄우므로 따로 실행할 필요가 없습니다.
+"""
+import argparse
+import signal
+import threading
+
+from config import *
+from core.embedding_service import EmbeddingServer
+from core.models import load_embedding_model, load_lexical_head, embedding_model_id, EMBEDDING_BACKENDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 서버 (마이크로 배치)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=EMBEDDING_SERVER_PORT)
+    parser.add_argument("--max-batch", type=int, default=EMBEDDING_MAX_BATCH)
+    parser.add_argument("--wait-ms", type=float, default=EMBEDDING_BATCH_WAIT_MS)
+    parser.add_argument("--backend", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND,
+                        help="추론 백엔드 (클라이언트의 EMBEDDING_BACKEND와 같아야 사용됨)")
+    parser.add_argument("--lexical", action=argparse.BooleanOptionalAction, default=LEXICAL_ENABLED,
+                        help="bge-m3 lexical 가중치도 계산 (기본: LEXICAL_ENABLED)")
+    args = parser.parse_args()
+
+    server = EmbeddingServer(load_embedding_model(EMBEDDING_MODEL, EMBEDDING_DEVICE, args.backend),
+                             embedding_model_id(EMBEDDING_MODEL, args.backend),
+                             max_batch=args.max_batch, max_wait_ms=args.wait_ms,
+                             lexical_head=load_lexical_head(EMBEDDING_MODEL, EMBEDDING_DEVICE) if args.lexical else None)
+
+    def on_signal(signum, frame):
+        threading.Thread(target=server.shutdown, args=(SERVER_GRACEFUL_TIMEOUT,)).start()
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    server.serve(host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
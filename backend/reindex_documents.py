@@ -1,79 +1,115 @@
-"""기존 문서를 pdfplumber로 재인덱싱하는 스크립트"""
+"""기존 문서를 pdfplumber로 재인덱싱하는 스크립트
+
+사용법:
+    python reindex_documents.py                 # 모든 업로드 문서 재인덱싱 (바뀐 청크만 벡터 DB에 반영)
+    python reindex_documents.py --changed-only  # 파일 내용 / 처리 버전 / 임베딩 백엔드가 그대로인 문서는 건너뜀
+"""
+import argparse
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from core.rag_system import RAGSystem
 from core.file_manager import FileManager
-from config import UPLOAD_DIR
+from core.parse_cache import content_hash
+from config import UPLOAD_DIR, EMBEDDING_BACKEND
+
+def find_upload_path(file_id: str, filename: str) -> Path:
+    """업로드 파일 경로 찾기 (여러 형식 시도)"""
+    file_path = Path(UPLOAD_DIR) / f"{file_id}_{filename.replace(' ', '_')}"
+    if not file_path.exists():
+        # 원본 파일명으로 시도
+        for f in Path(UPLOAD_DIR).iterdir():
+            if f.name.startswith(file_id):
+                return f
+    return file_path
+
+def is_unchanged(rag_system: RAGSystem, file_path: Path) -> bool:
+    """카탈로그에 기록된 파일 내용 해시 / 처리 버전 / 임베딩 백엔드가 현재와 같은지"""
+    entry = rag_system.catalog.get(rag_system._get_file_id(file_path))
+    if not entry or not entry.get("content_hash"):
+        return False
+    return (entry["content_hash"] == content_hash(file_path)
+            and entry.get("processor_version") == rag_system.doc_processor.processor_version()
+            and (entry.get("embedding_backend") or "fp32") == EMBEDDING_BACKEND)
 
-def reindex_all_documents():
+def reindex_all_documents(changed_only: bool = False):
     """모든 업로드된 문서를 재인덱싱"""
     print("=" * 60)
-    print("문서 재인덱싱 시작")
+    print("문서 재인덱싱 시작" + (" (변경된 문서만)" if changed_only else ""))
     print("=" * 60)
-    
+
     rag_system = RAGSystem()
     file_manager = FileManager()
-    
+
     # 업로드된 파일 목록 가져오기
     files = file_manager.list_files()
-    
+
     if not files:
         print("재인덱싱할 파일이 없습니다.")
         return
-    
+
     print(f"총 {len(files)}개 파일 발견\n")
-    
+
+    paths = [(file_info.get("filename"), find_upload_path(file_info.get("id"), file_info.get("filename")))
+             for file_info in files]
+    # 재인덱싱 대상 문서의 file_id (같은 파일명이 다른 경로로 인덱싱된 이전 청크 정리용)
+    expected_file_ids = {rag_system._get_file_id(file_path) for _, file_path in paths if file_path.exists()}
+
     success_count = 0
+    skipped_count = 0
     error_count = 0
-    
-    for i, file_info in enumerate(files, 1):
-        file_id = file_info.get("id")
-        filename = file_info.get("filename")
-        file_path = Path(UPLOAD_DIR) / f"{file_id}_{filename.replace(' ', '_')}"
-        
-        # 파일 경로 찾기 (여러 형식 시도)
-        if not file_path.exists():
-            # 원본 파일명으로 시도
-            for f in Path(UPLOAD_DIR).iterdir():
-                if f.name.startswith(file_id):
-                    file_path = f
-                    break
-        
+    totals = {"added": 0, "updated": 0, "relabeled": 0, "removed": 0, "unchanged": 0}
+
+    for i, (filename, file_path) in enumerate(paths, 1):
         if not file_path.exists():
             print(f"[{i}/{len(files)}] ❌ 파일 없음: {filename}")
             error_count += 1
             continue
-        
-        print(f"[{i}/{len(files)}] 처리 중: {filename}")
-        
+
         try:
-            # 기존 청크 삭제
-            existing = rag_system.collection.get(where={"filename": filename})
-            if existing["ids"]:
-                rag_system.collection.delete(ids=existing["ids"])
-                print(f"    - 기존 {len(existing['ids'])}개 청크 삭제")
-            
-            # 새로 인덱싱
+            if changed_only and is_unchanged(rag_system, file_path):
+                print(f"[{i}/{len(files)}] 변경 없음, 건너뜀: {filename}")
+                skipped_count += 1
+                continue
+
+            print(f"[{i}/{len(files)}] 처리 중: {filename}")
+
+            # 같은 파일명이 다른 file_id로 저장된 이전 청크 삭제 (업로드 경로가 바뀐 경우)
+            for entry in rag_system.catalog.find(filename=filename):
+                if entry["file_id"] not in expected_file_ids:
+                    deleted = rag_system.delete_document(entry["file_id"])
+                    print(f"    - 이전 경로의 청크 {deleted}개 삭제")
+
+            # 저장된 청크와 비교하여 바뀐 청크만 반영
             result = rag_system.index_document(file_path, filename)
-            
-            # 결과 확인
-            new_chunks = rag_system.collection.get(where={"filename": filename})
-            table_count = sum(1 for m in new_chunks["metadatas"] if m.get("type") == "table")
-            text_count = sum(1 for m in new_chunks["metadatas"] if m.get("type") == "text")
-            
-            print(f"    - 새로 인덱싱: {len(new_chunks['ids'])}개 청크 (텍스트: {text_count}, 표: {table_count})")
+            changes = result["changes"]
+            for key in totals:
+                totals[key] += changes[key]
+
+            print(f"    - 청크 {result['chunks_count']}개: 추가 {changes['added']}, 수정 {changes['updated']}, "
+                  f"메타데이터 변경 {changes['relabeled']}, 삭제 {changes['removed']}, 그대로 {changes['unchanged']}")
             success_count += 1
-            
+
         except Exception as e:
             print(f"    - ❌ 오류: {e}")
             error_count += 1
-    
+
     print("\n" + "=" * 60)
-    print(f"재인덱싱 완료: 성공 {success_count}개, 실패 {error_count}개")
+    print(f"재인덱싱 완료: 성공 {success_count}개, 건너뜀 {skipped_count}개, 실패 {error_count}개")
+    print(f"청크: 추가 {totals['added']}, 수정 {totals['updated']}, 메타데이터 변경 {totals['relabeled']}, "
+          f"삭제 {totals['removed']}, 그대로 {totals['unchanged']}")
+    if rag_system.parse_cache is not None:
+        stats = rag_system.parse_cache.stats()
+        print(f"파싱 캐시: 적중 {stats['hits']}회, 미적중 {stats['misses']}회 ({stats['size_mb']}MB)")
+    if rag_system.embedding_cache is not None:
+        stats = rag_system.embedding_cache.stats()
+        print(f"임베딩 캐시: 적중 {stats['hits']}개 청크, 미적중 {stats['misses']}개 (적중률 {stats['hit_rate']:.0%})")
     print("=" * 60)
 
 if __name__ == "__main__":
-    reindex_all_documents()
-
+    parser = argparse.ArgumentParser(description="업로드된 문서 재인덱싱")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="파일 내용 해시 / 처리 버전 / 임베딩 백엔드가 그대로인 문서는 건너뜀")
+    args = parser.parse_args()
+    reindex_all_documents(changed_only=args.changed_only)
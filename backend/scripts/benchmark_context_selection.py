@@ -0,0 +1,115 @@
+"""
+컨텍스트 선택 마이크로 벤치마크
+
+query()의 기존 2단계 중복 제거(단어 집합 Jaccard 유사도, 이중 루프)와
+MMR 선택(core.context_selector.select_mmr, numpy)을 후보 수별로 비교합니다.
+
+후보는 합성 데이터입니다.
+    - 청크 텍스트: 어휘 2,000개에서 뽑은 약 150단어
+    - 임베딩: 1024차원 정규화 벡터 (bge-m3와 같은 차원)
+    - 약 10%는 다른 후보를 조금 바꾼 근접 중복
+
+사용법:
+    python scripts/benchmark_context_selection.py
+    python scripts/benchmark_context_selection.py --sizes 40 200 1000 --repeat 5
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 상위 디렉토리(backend)를 경로에 추가
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import MAX_CHUNKS_PER_FILE, MIN_CONTEXT_COUNT, MAX_CONTEXT_COUNT, CONTEXT_MMR_LAMBDA, CONTEXT_DUPLICATE_THRESHOLD
+from core.context_selector import select_mmr, rank_relevance
+
+EMBEDDING_DIM = 1024
+
+
+def make_candidates(n, seed=0):
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    vocab = [f"단어{i}" for i in range(2000)]
+    texts, embeddings, files = [], [], []
+    for i in range(n):
+        if i > 0 and rng.random() < 0.1:
+            # 근접 중복: 기존 후보의 단어 일부만 교체
+            source = rng.randrange(i)
+            words = texts[source].split()
+            for _ in range(3):
+                words[rng.randrange(len(words))] = rng.choice(vocab)
+            texts.append(" ".join(words))
+            vector = embeddings[source] + np_rng.normal(0, 0.005, EMBEDDING_DIM)
+        else:
+            texts.append(" ".join(rng.choice(vocab) for _ in range(150)))
+            vector = np_rng.normal(0, 1, EMBEDDING_DIM)
+        embeddings.append(vector / np.linalg.norm(vector))
+        files.append(f"file_{rng.randrange(max(2, n // 10))}.pdf")
+    return texts, [e.tolist() for e in embeddings], files
+
+
+def legacy_select(texts, max_chunks=30, threshold=0.9):
+    """기존 query()의 텍스트 유사도 중복 제거 + 앞에서 30개"""
+    def calculate_text_similarity(text1, text2):
+        if not text1 or not text2:
+            return 0.0
+        words1 = set(text1.split())
+        words2 = set(text2.split())
+        if not words1 or not words2:
+            return 0.0
+        intersection = len(words1 & words2)
+        union = len(words1 | words2)
+        return intersection / union if union > 0 else 0.0
+
+    kept = []
+    for i, text in enumerate(texts):
+        if not any(calculate_text_similarity(text, texts[j]) >= threshold for j in kept):
+            kept.append(i)
+    return kept[:max_chunks]
+
+
+def mmr_select(embeddings, files):
+    return select_mmr(
+        embeddings,
+        rank_relevance(len(embeddings)),
+        files,
+        max_count=MAX_CONTEXT_COUNT,
+        min_count=MIN_CONTEXT_COUNT,
+        per_file_cap=MAX_CHUNKS_PER_FILE,
+        mmr_lambda=CONTEXT_MMR_LAMBDA,
+        duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD
+    )
+
+
+def measure(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jaccard 중복 제거 vs MMR 컨텍스트 선택 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[40, 200, 1000], help="후보 수")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 횟수 (중앙값 보고)")
+    args = parser.parse_args()
+
+    print(f"{'후보 수':>8} {'기존(ms)':>12} {'MMR(ms)':>12} {'배율':>8} {'기존 선택':>10} {'MMR 선택':>10}")
+    print("-" * 68)
+    for n in args.sizes:
+        texts, embeddings, files = make_candidates(n)
+        legacy_ms, legacy_result = measure(lambda: legacy_select(texts), args.repeat)
+        mmr_ms, mmr_result = measure(lambda: mmr_select(embeddings, files), args.repeat)
+        print(f"{n:>8} {legacy_ms:>12.2f} {mmr_ms:>12.2f} {legacy_ms / max(mmr_ms, 1e-6):>7.1f}x "
+              f"{len(legacy_result):>10} {len(mmr_result):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+임베딩 처리량 벤치마크 (프로세스 내 순차 인코딩 vs 임베딩 서버 마이크로 배치)
+
+동시 질의 N개를 스레드로 보내 질의 인코딩 처리량(texts/s)과 지연 시간(p50/p95)을 비교합니다.
+
+    - local : 스레드마다 프로세스 내 모델로 1개씩 인코딩 (기존 방식)
+    - server: 임베딩 서버(EMBEDDING_SERVER_URL)에 요청 (서버가 배치로 묶어 인코딩)
+
+--documents를 지정하면 문서 청크 인코딩(인덱싱) 처리량을 비교합니다. (표가 많은 엑셀 파일 권장)
+
+    - default : 청크 전체를 encode 1회 (기본 max_seq_length, batch_size 32 - 기존 index_document 방식)
+    - bucketed: 길이 버킷 배치 (EMBEDDING_MAX_SEQ_LENGTH, EMBEDDING_BATCH_TOKENS)
+
+사용법:
+    python embedding_server.py &          # 또는 serve.py 실행 중
+    python scripts/benchmark_embedding.py --file queries.txt --concurrency 8 --requests 200
+    python scripts/benchmark_embedding.py --documents ../data/uploads/*.xlsx
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# 상위 디렉토리(backend)를 경로에 추가
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import (EMBEDDING_MODEL, EMBEDDING_DEVICE, EMBEDDING_BACKEND, EMBEDDING_SERVER_URL,
+                    EMBEDDING_SERVER_TIMEOUT, EMBEDDING_MAX_SEQ_LENGTH, EMBEDDING_BATCH_TOKENS)
+
+DEFAULT_QUERIES = [
+    "2024년 3월 주간업무보고 요약해줘",
+    "회의록에서 결정된 사항은?",
+    "예산 집행 현황을 알려줘",
+    "프로젝트 일정 지연 원인",
+    "보안 점검 결과 조치 사항",
+    "신규 채용 계획",
+    "분기별 매출 추이",
+    "고객 불만 처리 절차",
+]
+
+
+def run(encode, queries, total_requests, concurrency):
+    """동시 인코딩 → (texts/s, 지연 시간 목록(ms))"""
+
+    def one(i):
+        start = time.time()
+        encode(queries[i % len(queries)] + f" ({i})")  # 캐시 없이 매번 다른 텍스트
+        return (time.time() - start) * 1000
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one, range(total_requests)))
+    return total_requests / (time.time() - start), latencies
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def benchmark_documents(paths):
+    """문서 청크 인코딩 처리량: 기존 방식(encode 1회) vs 길이 버킷 배치"""
+    from core.document_processor import DocumentProcessor
+    from core.embedding_service import encode_bucketed, truncation_stats
+    from core.models import load_embedding_model
+
+    processor = DocumentProcessor()
+    texts = []
+    for path in paths:
+        chunks = processor.extract_text_with_layout(Path(path))
+        tables = sum(1 for chunk in chunks if chunk.get("type") == "table")
+        print(f"[Benchmark] {Path(path).name}: 청크 {len(chunks)}개 (표 {tables}개)")
+        texts.extend(chunk["text"] for chunk in chunks)
+    if not texts:
+        print("청크가 없습니다")
+        return
+
+    model = load_embedding_model(EMBEDDING_MODEL, EMBEDDING_DEVICE, EMBEDDING_BACKEND)
+    model.encode(texts[:2], normalize_embeddings=True, show_progress_bar=False)  # 예열
+
+    # 기존 방식: 모델 기본 최대 길이 + 기본 배치 크기
+    default_max_seq_length = min(model.tokenizer.model_max_length, 8192)
+    model.max_seq_length = default_max_seq_length
+    start = time.time()
+    model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+    default_seconds = time.time() - start
+    model.max_seq_length = EMBEDDING_MAX_SEQ_LENGTH
+
+    start = time.time()
+    _, token_counts, _ = encode_bucketed(model, texts)
+    bucketed_seconds = time.time() - start
+    stats = truncation_stats(token_counts, EMBEDDING_MAX_SEQ_LENGTH)
+
+    print("\n" + "=" * 60)
+    print(f"청크 {len(texts)}개, 토큰 수 p50 {int(np.median(token_counts))} / 최대 {stats['max_tokens']}")
+    print(f"{'방식':<10} {'청크/초':>10} {'소요':>10}")
+    print("-" * 60)
+    print(f"{'default':<10} {len(texts) / default_seconds:>10.1f} {default_seconds:>9.1f}s  (max_seq_length {default_max_seq_length})")
+    print(f"{'bucketed':<10} {len(texts) / bucketed_seconds:>10.1f} {bucketed_seconds:>9.1f}s  "
+          f"(max_seq_length {EMBEDDING_MAX_SEQ_LENGTH}, 배치 토큰 {EMBEDDING_BATCH_TOKENS})")
+    print("-" * 60)
+    print(f"잘린 청크: {stats['truncated']}개 (잘린 토큰 합계 {stats['truncated_tokens']}, 최대 {stats['max_truncated_tokens']})")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 처리량 벤치마크")
+    parser.add_argument("queries", nargs="*", help="벤치마크 질의 (없으면 기본 질의)")
+    parser.add_argument("--file", help="질의 목록 파일 (한 줄에 하나)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--requests", type=int, default=200, help="총 요청 수")
+    parser.add_argument("--mode", choices=["local", "server", "both"], default="both")
+    parser.add_argument("--documents", nargs="+", help="문서 청크 인코딩 처리량 측정 (파일 경로)")
+    args = parser.parse_args()
+
+    if args.documents:
+        benchmark_documents(args.documents)
+        return
+
+    queries = list(args.queries)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            queries.extend(line.strip() for line in f if line.strip())
+    queries = queries or DEFAULT_QUERIES
+
+    from core.embedding_service import EmbeddingClient
+
+    clients = {}
+    if args.mode in ("local", "both"):
+        clients["local"] = EmbeddingClient(EMBEDDING_MODEL, EMBEDDING_DEVICE, server_url=None)
+    if args.mode in ("server", "both"):
+        clients["server"] = EmbeddingClient(EMBEDDING_MODEL, EMBEDDING_DEVICE, server_url=EMBEDDING_SERVER_URL,
+                                            timeout=EMBEDDING_SERVER_TIMEOUT)
+
+    rows = []
+    for name, client in clients.items():
+        client.encode(queries[:1])  # 예열
+        throughput, latencies = run(client.encode, queries, args.requests, args.concurrency)
+        stats = client.stats()
+        if name == "server" and stats["local_texts"] > 1:
+            print("⚠️ 임베딩 서버에 연결하지 못해 프로세스 내 모델로 측정됨")
+        rows.append((name, throughput, percentile(latencies, 0.5), percentile(latencies, 0.95)))
+
+    print("\n" + "=" * 60)
+    print(f"동시 요청 {args.concurrency}개, 총 {args.requests}개")
+    print(f"{'모드':<8} {'texts/s':>10} {'p50':>10} {'p95':>10}")
+    print("-" * 60)
+    for name, throughput, p50, p95 in rows:
+        print(f"{name:<8} {throughput:>10.1f} {p50:>8.0f}ms {p95:>8.0f}ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+임베딩 추론 백엔드 벤치마크 (fp32 기준 vs int8 동적 양자화)
+
+저장된 벡터 DB의 청크(우리 문서)로 측정합니다.
+    - docs/s      : 청크 인코딩 처리량 (인덱싱 속도)
+    - 질의 지연   : 질의 1개 인코딩 p50/p95 (ms)
+    - RSS         : 모델 로드 전후 프로세스 RSS 증가량 (MB, 백엔드마다 별도 프로세스에서 측정)
+    - recall@k    : 같은 질의에 대해 fp32 상위 k개 청크 중 각 백엔드 상위 k개에 들어간 비율
+                    "혼합"은 int8 질의 벡터로 fp32로 저장된 벡터를 검색한 경우 (백엔드를 바꾸고 재인덱싱하지 않은 상태)
+
+질의를 지정하지 않으면 샘플 청크 앞부분(QUERY_PREFIX_CHARS자)을 질의로 사용합니다.
+
+사용법:
+    python scripts/benchmark_quantization.py --sample 500 --k 10
+    python scripts/benchmark_quantization.py --file queries.txt --backends fp32 int8
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 상위 디렉토리(backend)를 경로에 추가
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import EMBEDDING_MODEL, EMBEDDING_DEVICE, CHROMA_PERSIST_DIR, CHROMA_COLLECTION_NAME
+
+QUERY_PREFIX_CHARS = 60
+ENCODE_BATCH_SIZE = 32
+
+
+def read_rss_mb():
+    """현재 프로세스 RSS (MB, Linux /proc 기준, 없으면 최대 RSS)"""
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_corpus(sample, seed):
+    """벡터 DB에서 청크 텍스트 샘플"""
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR, settings=Settings(anonymized_telemetry=False))
+    collection = client.get_collection(CHROMA_COLLECTION_NAME)
+    total = collection.count()
+    if total == 0:
+        raise SystemExit("벡터 DB에 청크가 없습니다 (문서를 먼저 업로드하세요)")
+    documents = collection.get(include=["documents"], limit=total)["documents"]
+    documents = [doc for doc in documents if doc and doc.strip()]
+    random.Random(seed).shuffle(documents)
+    return documents[:sample]
+
+
+def measure_backend(backend, corpus, queries):
+    """한 백엔드 측정 (모델 로드부터, 별도 프로세스에서 호출)"""
+    from core.models import load_embedding_model
+    from core.embedding_service import encode_bucketed
+
+    rss_before = read_rss_mb()
+    load_start = time.time()
+    model = load_embedding_model(EMBEDDING_MODEL, EMBEDDING_DEVICE, backend)
+    load_s = time.time() - load_start
+    rss_model = read_rss_mb() - rss_before
+
+    def encode(texts):
+        return encode_bucketed(model, texts)[0]
+
+    encode(corpus[:4])  # 예열
+
+    start = time.time()
+    doc_embeddings = np.vstack([
+        encode(corpus[i:i + ENCODE_BATCH_SIZE])
+        for i in range(0, len(corpus), ENCODE_BATCH_SIZE)
+    ])
+    docs_per_s = len(corpus) / (time.time() - start)
+
+    latencies, query_embeddings = [], []
+    for query in queries:
+        start = time.time()
+        query_embeddings.append(encode([query])[0])
+        latencies.append((time.time() - start) * 1000)
+    latencies.sort()
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "rss_model_mb": rss_model,
+        "rss_total_mb": read_rss_mb(),
+        "docs_per_s": docs_per_s,
+        "query_p50_ms": latencies[len(latencies) // 2],
+        "query_p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "doc_embeddings": doc_embeddings,
+        "query_embeddings": np.vstack(query_embeddings),
+    }
+
+
+def top_k(query_embeddings, doc_embeddings, k):
+    scores = query_embeddings @ doc_embeddings.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_at_k(reference, candidate):
+    hits = [len(set(ref) & set(cand)) / len(ref) for ref, cand in zip(reference, candidate)]
+    return float(np.mean(hits))
+
+
+def run_child(backend, corpus_path, output_path):
+    """백엔드별 측정은 자식 프로세스에서 (RSS가 다른 백엔드 모델의 영향을 받지 않도록)"""
+    subprocess.run([sys.executable, __file__, "--child", backend, "--corpus", corpus_path, "--output", output_path],
+                   check=True)
+    data = np.load(output_path, allow_pickle=False)
+    result = json.loads(str(data["summary"]))
+    result["doc_embeddings"] = data["doc_embeddings"]
+    result["query_embeddings"] = data["query_embeddings"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 추론 백엔드 벤치마크 (fp32 vs int8)")
+    parser.add_argument("queries", nargs="*", help="벤치마크 질의")
+    parser.add_argument("--file", help="질의 목록 파일 (한 줄에 하나)")
+    parser.add_argument("--backends", nargs="+", default=["fp32", "int8"], help="비교할 백엔드 (첫 번째가 기준)")
+    parser.add_argument("--sample", type=int, default=500, help="벡터 DB에서 샘플링할 청크 수")
+    parser.add_argument("--k", type=int, default=10, help="recall@k의 k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(args.corpus, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        result = measure_backend(args.child, data["corpus"], data["queries"])
+        summary = {key: value for key, value in result.items() if not key.endswith("_embeddings")}
+        np.savez(args.output, summary=json.dumps(summary), doc_embeddings=result["doc_embeddings"],
+                 query_embeddings=result["query_embeddings"])
+        return
+
+    queries = list(args.queries)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            queries.extend(line.strip() for line in f if line.strip())
+
+    corpus = load_corpus(args.sample, args.seed)
+    if not queries:
+        queries = [doc.strip().replace("\n", " ")[:QUERY_PREFIX_CHARS] for doc in corpus[:50]]
+    k = min(args.k, len(corpus))
+    print(f"[Benchmark] 청크 {len(corpus)}개, 질의 {len(queries)}개, k={k}, 백엔드 {args.backends}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_path = os.path.join(tmp_dir, "corpus.json")
+        with open(corpus_path, 'w', encoding='utf-8') as f:
+            json.dump({"corpus": corpus, "queries": queries}, f, ensure_ascii=False)
+        for backend in args.backends:
+            print(f"\n[Benchmark] {backend} 측정 중...")
+            results.append(run_child(backend, corpus_path, os.path.join(tmp_dir, f"{backend}.npz")))
+
+    baseline = results[0]
+    reference = top_k(baseline["query_embeddings"], baseline["doc_embeddings"], k)
+
+    print("\n" + "=" * 100)
+    print(f"{'백엔드':<8} {'docs/s':>9} {'질의 p50':>10} {'질의 p95':>10} {'모델 RSS':>10} {'전체 RSS':>10} "
+          f"{'recall@' + str(k):>11} {'혼합 recall':>12}")
+    print("-" * 100)
+    for result in results:
+        recall = recall_at_k(reference, top_k(result["query_embeddings"], result["doc_embeddings"], k))
+        # 이 백엔드로 질의 + 기준 백엔드로 저장된 벡터 (재인덱싱 전 혼합 상태)
+        mixed = recall_at_k(reference, top_k(result["query_embeddings"], baseline["doc_embeddings"], k))
+        print(f"{result['backend']:<8} {result['docs_per_s']:>9.1f} {result['query_p50_ms']:>8.1f}ms "
+              f"{result['query_p95_ms']:>8.1f}ms {result['rss_model_mb']:>8.0f}MB {result['rss_total_mb']:>8.0f}MB "
+              f"{recall:>11.3f} {mixed:>12.3f}")
+    print("-" * 100)
+    print(f"recall@{k}: {baseline['backend']} 상위 {k}개 청크 중 각 백엔드 상위 {k}개에 포함된 비율 (1.0 = 검색 결과 동일)")
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+재순위화 벤치마크 스크립트
+
+질의별로 재순위화 비용과 LLM 프롬프트 토큰 절감량을 비교합니다.
+
+    - baseline: 하이브리드 검색 결과를 파일명/페이지 순으로 최대 30개 전달 (기존 방식)
+    - rerank  : Cross-Encoder 재순위화 후 상위 RERANK_TOP_K개 전달
+
+각 모드에서 Ollama에 같은 형식의 프롬프트를 보내 prompt_eval_count(프롬프트 토큰 수)와
+프롬프트 처리/전체 응답 시간을 측정합니다.
+
+사용법:
+    python scripts/benchmark_rerank.py "질문1" "질문2" ...
+    python scripts/benchmark_rerank.py --file queries.txt --num-predict 200
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 상위 디렉토리(backend)를 경로에 추가
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import TOP_K_RESULTS, RERANK_TOP_K
+
+BASELINE_MAX_CHUNKS = 30  # query()의 기존 MAX_CHUNKS
+
+
+def build_prompt(query_text, chunks):
+    """query()와 같은 형식의 컨텍스트 구성"""
+    contexts = []
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        contexts.append(
+            f"[문서 정보]\n- 파일명: {metadata.get('filename')}\n- 페이지: {metadata.get('page')}\n"
+            f"\n[문서 내용]\n{chunk['doc_text']}"
+        )
+    context_text = "\n\n---\n\n".join(contexts)
+    return f"다음 컨텍스트를 참고하여 질문에 답변하세요.\n\n[컨텍스트]\n{context_text}\n\n[질문]\n{query_text}"
+
+
+def run_llm(rag_system, user_prompt, num_predict):
+    """Ollama 호출 후 (prompt 토큰 수, 프롬프트 처리 ms, 전체 ms)"""
+    start = time.time()
+    response = rag_system.llm.chat(
+        rag_system.llm.messages(user_prompt),
+        options={"temperature": 0.1, "num_predict": num_predict}
+    )
+    total_ms = (time.time() - start) * 1000
+    prompt_tokens = response.get("prompt_eval_count") or 0
+    prompt_ms = (response.get("prompt_eval_duration") or 0) / 1e6
+    return prompt_tokens, prompt_ms, total_ms
+
+
+def benchmark_query(rag_system, query_text, num_predict):
+    query_embedding = rag_system._encode_query(query_text)
+    n_results = min(TOP_K_RESULTS, max(1, rag_system.collection.count()))
+    results = rag_system._hybrid_search(query_text, query_embedding, n_results)
+
+    candidates = [
+        {"doc_text": results["documents"][0][i], "metadata": results["metadatas"][0][i], "index": i}
+        for i in range(len(results["ids"][0]))
+    ]
+    if not candidates:
+        print(f"  검색 결과 없음: {query_text}")
+        return None
+
+    # baseline: 파일명 → 페이지 순 상위 30개
+    baseline = sorted(candidates, key=lambda c: (c["metadata"].get("filename") or "", str(c["metadata"].get("page"))))
+    baseline = baseline[:BASELINE_MAX_CHUNKS]
+
+    # rerank: Cross-Encoder 상위 RERANK_TOP_K개
+    rerank_start = time.time()
+    reranked = rag_system._rerank_chunks(query_text, [dict(c) for c in candidates], top_k=RERANK_TOP_K)
+    rerank_ms = (time.time() - rerank_start) * 1000
+
+    base_tokens, base_prompt_ms, base_total_ms = run_llm(rag_system, build_prompt(query_text, baseline), num_predict)
+    rr_tokens, rr_prompt_ms, rr_total_ms = run_llm(rag_system, build_prompt(query_text, reranked), num_predict)
+
+    return {
+        "query": query_text,
+        "candidates": len(candidates),
+        "baseline_chunks": len(baseline),
+        "rerank_chunks": len(reranked),
+        "rerank_ms": rerank_ms,
+        "baseline_tokens": base_tokens,
+        "rerank_tokens": rr_tokens,
+        "baseline_prompt_ms": base_prompt_ms,
+        "rerank_prompt_ms": rr_prompt_ms,
+        "baseline_total_ms": base_total_ms,
+        "rerank_total_ms": rr_total_ms + rerank_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="재순위화 비용 vs LLM 프롬프트 절감 벤치마크")
+    parser.add_argument("queries", nargs="*", help="벤치마크 질의")
+    parser.add_argument("--file", help="질의 목록 파일 (한 줄에 하나)")
+    parser.add_argument("--num-predict", type=int, default=200, help="LLM 생성 토큰 수 상한")
+    args = parser.parse_args()
+
+    queries = list(args.queries)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            queries.extend(line.strip() for line in f if line.strip())
+    if not queries:
+        parser.error("질의를 하나 이상 지정하세요")
+
+    from core.rag_system import RAGSystem
+
+    rag_system = RAGSystem()
+    if rag_system.reranker is None or not rag_system.reranker.available:
+        print("⚠️ 재순위화 모델이 없어 융합 점수 순서로 상위 RERANK_TOP_K개만 자릅니다")
+
+    # 모델 로드 시간이 첫 측정에 섞이지 않도록 예열
+    rag_system.llm.warm_up()
+
+    rows = []
+    for query_text in queries:
+        print(f"\n[Benchmark] {query_text}")
+        row = benchmark_query(rag_system, query_text, args.num_predict)
+        if row:
+            rows.append(row)
+
+    if not rows:
+        return
+
+    print("\n" + "=" * 100)
+    print(f"{'질의':<24} {'청크':>9} {'재순위화':>9} {'프롬프트 토큰':>15} {'프롬프트 처리':>17} {'전체':>17}")
+    print("-" * 100)
+    for row in rows:
+        print(f"{row['query'][:24]:<24} "
+              f"{row['baseline_chunks']:>3}→{row['rerank_chunks']:<3}  "
+              f"{row['rerank_ms']:>7.0f}ms "
+              f"{row['baseline_tokens']:>6}→{row['rerank_tokens']:<6}  "
+              f"{row['baseline_prompt_ms']:>7.0f}→{row['rerank_prompt_ms']:<7.0f}ms "
+              f"{row['baseline_total_ms']:>7.0f}→{row['rerank_total_ms']:<7.0f}ms")
+    print("-" * 100)
+
+    n = len(rows)
+    avg = lambda key: sum(row[key] for row in rows) / n
+    print(f"평균 재순위화 비용: {avg('rerank_ms'):.0f}ms (RERANK_TOP_K={RERANK_TOP_K})")
+    print(f"평균 프롬프트 토큰: {avg('baseline_tokens'):.0f} → {avg('rerank_tokens'):.0f} "
+          f"(절감 {avg('baseline_tokens') - avg('rerank_tokens'):.0f})")
+    print(f"평균 프롬프트 처리: {avg('baseline_prompt_ms'):.0f}ms → {avg('rerank_prompt_ms'):.0f}ms")
+    print(f"평균 전체 지연 (재순위화 포함): {avg('baseline_total_ms'):.0f}ms → {avg('rerank_total_ms'):.0f}ms "
+          f"({avg('rerank_total_ms') - avg('baseline_total_ms'):+.0f}ms)")
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+서버 처리량 / 메모리 벤치마크 (개발 서버 vs 프로덕션 서버)
+
+    - dev : python app.py (프로세스 1개, 스레드)
+    - prod: python serve.py --workers N (마스터가 모델 로드 후 fork, 가중치 copy-on-write 공유)
+
+각 서버를 차례로 띄워 /api/health 응답을 기다린 뒤 /api/query에 동시 요청을 보내
+requests/sec, 지연 시간(p50/p95), 429(LLM 대기열 초과) 수를 측정하고,
+/proc/<pid>/smaps_rollup으로 프로세스별 RSS / PSS / 공유 / 전용 메모리를 보고합니다.
+(PSS는 공유 페이지를 공유 프로세스 수로 나눈 값이므로, 워커 수를 늘려도 PSS 합계가
+ 거의 늘지 않으면 모델 가중치가 공유되고 있다는 뜻입니다. Linux 전용)
+
+사용법:
+    python scripts/benchmark_serving.py "질문1" "질문2" ...
+    python scripts/benchmark_serving.py --file queries.txt --workers 4 --concurrency 8 --requests 200
+    python scripts/benchmark_serving.py --file queries.txt --mode prod
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# 서버 시작(모델 로드 + 인덱스 로드) 최대 대기 시간 (초)
+STARTUP_TIMEOUT = 600
+
+
+def read_memory(pid):
+    """프로세스 메모리 (kB): rss, pss, shared, private"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "shared": values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def child_pids(pid):
+    """직계 자식 프로세스 (워커)"""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                # pid (comm) state ppid ... - comm에 공백이 있을 수 있으므로 마지막 ')' 이후로 분리
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def start_server(mode, port, workers):
+    env = dict(os.environ, PORT=str(port), PYTHONUNBUFFERED="1")
+    if mode == "dev":
+        command = [sys.executable, "app.py"]
+    else:
+        command = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)]
+    log_path = BACKEND_DIR / f"benchmark_serving_{mode}.log"
+    log_file = open(log_path, 'w', encoding='utf-8')
+    process = subprocess.Popen(command, cwd=str(BACKEND_DIR), env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    print(f"[Benchmark] {mode} 서버 시작 (pid={process.pid}, 로그: {log_path})")
+
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.time()
+    while time.time() - start < STARTUP_TIMEOUT:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} 서버가 종료됨 (종료 코드 {process.returncode}, 로그: {log_path})")
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=2).status_code == 200:
+                print(f"[Benchmark] {mode} 서버 준비 완료 ({time.time() - start:.1f}초)")
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    process.kill()
+    raise RuntimeError(f"{mode} 서버가 {STARTUP_TIMEOUT}초 안에 준비되지 않음")
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_load(base_url, queries, total_requests, concurrency):
+    """동시 요청 → (초당 요청 수, 지연 시간 목록(ms), 상태 코드별 수)"""
+
+    def one(i):
+        start = time.time()
+        try:
+            response = requests.post(f"{base_url}/api/query", json={"query": queries[i % len(queries)]}, timeout=600)
+            status = response.status_code
+        except requests.RequestException:
+            status = "error"
+        return status, (time.time() - start) * 1000
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total_requests)))
+    elapsed = time.time() - start
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(ms for status, ms in results if status == 200)
+    return total_requests / elapsed, latencies, statuses
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def benchmark(mode, args, queries):
+    process, base_url = start_server(mode, args.port, args.workers)
+    try:
+        # 예열 (첫 요청의 모델/캐시 초기화가 측정에 섞이지 않도록)
+        run_load(base_url, queries, min(len(queries), args.concurrency), args.concurrency)
+        rps, latencies, statuses = run_load(base_url, queries, args.requests, args.concurrency)
+
+        pids = [process.pid] + child_pids(process.pid)
+        memory = {pid: read_memory(pid) for pid in pids}
+    finally:
+        stop_server(process)
+
+    print(f"\n[{mode}] {rps:.2f} req/s, p50 {percentile(latencies, 0.5):.0f}ms, "
+          f"p95 {percentile(latencies, 0.95):.0f}ms, 응답 {statuses}")
+    print(f"{'pid':>8} {'역할':<8} {'RSS':>10} {'PSS':>10} {'공유':>10} {'전용':>10}")
+    totals = {"rss": 0, "pss": 0}
+    for pid, mem in memory.items():
+        if mem is None:
+            continue
+        role = "master" if pid == process.pid and mode == "prod" else ("server" if pid == process.pid else "worker")
+        print(f"{pid:>8} {role:<8} {mem['rss'] / 1024:>8.0f}MB {mem['pss'] / 1024:>8.0f}MB "
+              f"{mem['shared'] / 1024:>8.0f}MB {mem['private'] / 1024:>8.0f}MB")
+        totals["rss"] += mem["rss"]
+        totals["pss"] += mem["pss"]
+    print(f"{'합계':>17} {totals['rss'] / 1024:>8.0f}MB {totals['pss'] / 1024:>8.0f}MB  "
+          f"(RSS 합계는 공유 페이지를 중복 계산, 실제 사용량은 PSS 합계)")
+    return {"mode": mode, "rps": rps, "p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95),
+            "statuses": statuses, "pss_mb": totals["pss"] / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="개발 서버 vs 프로덕션 서버 처리량/메모리 벤치마크")
+    parser.add_argument("queries", nargs="*", help="벤치마크 질의")
+    parser.add_argument("--file", help="질의 목록 파일 (한 줄에 하나)")
+    parser.add_argument("--mode", choices=["dev", "prod", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=2, help="프로덕션 서버 reader 워커 수")
+    parser.add_argument("--port", type=int, default=5050, help="벤치마크용 포트 (실행 중인 서버와 겹치지 않게)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 요청 수")
+    parser.add_argument("--requests", type=int, default=100, help="총 요청 수")
+    args = parser.parse_args()
+
+    queries = list(args.queries)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            queries.extend(line.strip() for line in f if line.strip())
+    if not queries:
+        parser.error("질의를 하나 이상 지정하세요")
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("⚠️ /proc/<pid>/smaps_rollup이 없어 메모리는 측정하지 않습니다 (Linux 4.14 이상 필요)")
+
+    modes = ["dev", "prod"] if args.mode == "both" else [args.mode]
+    rows = [benchmark(mode, args, queries) for mode in modes]
+
+    print("\n" + "=" * 80)
+    print(f"{'서버':<6} {'req/s':>8} {'p50':>10} {'p95':>10} {'PSS 합계':>12} {'429':>6}")
+    print("-" * 80)
+    for row in rows:
+        print(f"{row['mode']:<6} {row['rps']:>8.2f} {row['p50']:>8.0f}ms {row['p95']:>8.0f}ms "
+              f"{row['pss_mb']:>10.0f}MB {row['statuses'].get(429, 0):>6}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+문서 파싱 캐시 관리 (PARSE_CACHE_DIR)
+
+사용법:
+    python scripts/parse_cache.py stats                       # 종류별 항목 수 / 크기
+    python scripts/parse_cache.py list --kind page --limit 50 # 최근 사용 순 항목 목록
+    python scripts/parse_cache.py purge --unused-days 30      # 30일 동안 사용하지 않은 항목 삭제
+    python scripts/parse_cache.py purge --file 회의록.pdf     # 라벨(파일명)에 포함된 항목 삭제
+    python scripts/parse_cache.py purge --all                 # 전체 삭제 (파서 수정 후 등)
+    python scripts/parse_cache.py evict                       # 크기 상한(PARSE_CACHE_MAX_MB)까지 LRU 삭제
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 상위 디렉토리(backend)를 경로에 추가
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import PARSE_CACHE_DIR, PARSE_CACHE_MAX_MB
+from core.parse_cache import ParseCache
+
+
+def format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp)) if timestamp else "-"
+
+
+def show_stats(cache: ParseCache):
+    kinds = {}
+    for entry in cache.entries():
+        count, size = kinds.get(entry["kind"], (0, 0))
+        kinds[entry["kind"]] = (count + 1, size + entry["size"])
+
+    print("=" * 60)
+    print(f"파싱 캐시: {cache.cache_dir}")
+    print(f"{'종류':<10} {'항목 수':>10} {'크기':>12}")
+    print("-" * 60)
+    total_count = total_size = 0
+    for kind, (count, size) in sorted(kinds.items()):
+        print(f"{kind:<10} {count:>10} {size / (1 << 20):>10.1f}MB")
+        total_count += count
+        total_size += size
+    print("-" * 60)
+    print(f"{'합계':<10} {total_count:>10} {total_size / (1 << 20):>10.1f}MB  (상한 {cache.max_bytes >> 20}MB)")
+    print("=" * 60)
+
+
+def list_entries(cache: ParseCache, kind, limit):
+    entries = [entry for entry in cache.entries() if kind is None or entry["kind"] == kind]
+    print(f"{'마지막 사용':<17} {'생성':<17} {'종류':<9} {'크기':>9}  라벨")
+    for entry in entries[:limit]:
+        print(f"{format_time(entry['used']):<17} {format_time(entry['created']):<17} {entry['kind']:<9} "
+              f"{entry['size'] / 1024:>7.1f}KB  {entry['label']}")
+    if len(entries) > limit:
+        print(f"... 외 {len(entries) - limit}개")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="문서 파싱 캐시 관리")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("stats", help="종류별 항목 수 / 크기")
+
+    list_parser = subparsers.add_parser("list", help="최근 사용 순 항목 목록")
+    list_parser.add_argument("--kind", choices=["document", "page", "pdf-mode"])
+    list_parser.add_argument("--limit", type=int, default=100)
+
+    purge_parser = subparsers.add_parser("purge", help="항목 삭제")
+    purge_parser.add_argument("--all", action="store_true", help="전체 삭제")
+    purge_parser.add_argument("--kind", choices=["document", "page", "pdf-mode"])
+    purge_parser.add_argument("--unused-days", type=float, help="이 기간(일) 동안 사용하지 않은 항목")
+    purge_parser.add_argument("--file", help="라벨(파일명)에 이 문자열이 포함된 항목")
+
+    subparsers.add_parser("evict", help="크기 상한까지 오래 사용하지 않은 항목 삭제")
+    args = parser.parse_args()
+
+    if not Path(PARSE_CACHE_DIR).exists():
+        print(f"파싱 캐시가 없습니다: {PARSE_CACHE_DIR}")
+        return
+    cache = ParseCache(PARSE_CACHE_DIR, max_bytes=PARSE_CACHE_MAX_MB << 20)
+
+    if args.command == "stats":
+        show_stats(cache)
+    elif args.command == "list":
+        list_entries(cache, args.kind, args.limit)
+    elif args.command == "purge":
+        if not (args.all or args.kind or args.unused_days is not None or args.file):
+            parser.error("purge: --all 또는 조건(--kind / --unused-days / --file)을 지정하세요")
+        removed = cache.purge(kind=args.kind, unused_days=args.unused_days, label=args.file)
+        print(f"{removed}개 항목 삭제")
+    elif args.command == "evict":
+        removed = cache.evict()
+        print(f"{removed}개 항목 삭제 (현재 {cache.stats()['size_mb']}MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+프로덕션 서버 (멀티 프로세스, 모델 가중치 copy-on-write 공유)
+
+    python serve.py [--workers N] [--host HOST] [--port PORT]
+
+개발 서버(python app.py)는 프로세스 1개에서 모든 요청을 처리하므로 임베딩/재순위화(CPU)가
+GIL과 torch 스레드를 두고 경쟁합니다. 이 서버는 프로세스를 나누되 모델은 한 번만 메모리에 올립니다.
+
+마스터 프로세스 (스레드를 만들지 않음)
+  1. Ollama 서버 확인/시작 (1회)
+  2. 임베딩/재순위화 모델 로드 → gc.collect() + gc.freeze()
+     (fork 후 GC가 모델 객체를 순회하며 참조 카운트/헤더를 건드려 공유 페이지가 복사되는 것을 줄임)
+  3. 공개 포트와 내부 포트(writer, 임베딩 서버) 소켓을 미리 열고 워커를 fork
+     - embedder 워커 1개: 임베딩 서버 (모든 워커의 질의/문서 인코딩 요청을 모아 배치 인코딩)
+     - writer 워커 1개: 업로드/삭제/인덱싱 작업 큐/엔티티 추출 (인덱스 파일을 바꾸는 유일한 프로세스)
+     - reader 워커 N개: 같은 공개 소켓에서 accept (커널이 연결을 분배)
+       쓰기 요청은 writer로 전달하고, writer가 세대 번호를 올리면 인덱스를 다시 로드
+  4. 죽은 워커는 다시 fork (연속으로 바로 죽으면 대기 시간을 늘림)
+
+신호
+  - SIGHUP: 워커를 하나씩 교체 (reader는 새 워커 준비 후 이전 워커 종료 → 중단 없이 재시작)
+           app.py 변경은 반영되지만, 마스터가 로드한 core 모듈/모델은 그대로 (전체 반영은 재시작)
+  - SIGTERM / SIGINT: 워커에 SIGTERM → 진행 중 요청 완료 대기 (SERVER_GRACEFUL_TIMEOUT) → 종료
+
+os.fork가 없는 환경(Windows)에서는 개발 서버와 같은 단일 프로세스로 실행합니다.
+"""
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+from config import *
+
+# 워커 준비(RAGSystem 초기화, 인덱스 재구성 포함) 최대 대기 시간 (초)
+WORKER_BOOT_TIMEOUT = 600
+# 이 시간 안에 죽은 워커는 비정상 종료로 보고 다시 fork하기 전 대기
+WORKER_MIN_UPTIME = 10
+
+
+class _ActiveRequests:
+    """진행 중 요청 수 (응답 본문을 다 보낼 때까지, 스트리밍 포함) - 종료 전 대기에 사용"""
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _done(self):
+        with self._lock:
+            self.count -= 1
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        with self._lock:
+            self.count += 1
+        try:
+            return ClosingIterator(self.app(environ, start_response), self._done)
+        except BaseException:
+            self._done()
+            raise
+
+
+def _listen(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _init_worker(role: str, torch_threads: int):
+    """fork 직후 워커 공통 초기화"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl+C는 마스터가 받아 SIGTERM으로 정리
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # 준비 전에는 바로 종료
+    os.environ["RAG_SERVER_ROLE"] = role
+    os.environ["RAG_WRITER_URL"] = f"http://127.0.0.1:{SERVER_WRITER_PORT}"
+    # gc.freeze()된 마스터 객체(모델 가중치 포함)는 워커에서도 GC 대상에서 빠진 채로 둠 (unfreeze 하지 않음)
+
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+
+def _embedder_main(sock: socket.socket, ready_fd: int, torch_threads: int):
+    """임베딩 서버 워커 (마스터가 로드한 임베딩 모델을 공유)"""
+    _init_worker("embedder", torch_threads)
+
+    from core.models import load_embedding_model, load_lexical_head, embedding_model_id
+    from core.embedding_service import EmbeddingServer
+
+    lexical_head = None
+    if LEXICAL_ENABLED:
+        try:
+            lexical_head = load_lexical_head(EMBEDDING_MODEL, EMBEDDING_DEVICE)
+        except Exception as e:
+            print(f"⚠️ lexical 가중치 헤드 로드 실패, 임베딩 서버는 lexical 가중치 없이 실행: {e}")
+    server = EmbeddingServer(load_embedding_model(EMBEDDING_MODEL, EMBEDDING_DEVICE, EMBEDDING_BACKEND),
+                             embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+                             max_batch=EMBEDDING_MAX_BATCH, max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+                             lexical_head=lexical_head)
+    shutdown_threads = []
+
+    def on_sigterm(signum, frame):
+        thread = threading.Thread(target=server.shutdown, args=(SERVER_GRACEFUL_TIMEOUT,), daemon=True)
+        thread.start()
+        shutdown_threads.append(thread)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    print(f"[Serve] embedder 워커 준비 완료 (pid={os.getpid()}, torch 스레드 {torch_threads})")
+    os.write(ready_fd, b"1")
+    os.close(ready_fd)
+
+    server.serve(sock)
+    for thread in shutdown_threads:
+        thread.join()
+    sys.exit(0)
+
+
+def _worker_main(role: str, sock: socket.socket, ready_fd: int, torch_threads: int):
+    """API 워커 프로세스 본체 (fork 직후 호출, 반환하지 않음)"""
+    _init_worker(role, torch_threads)
+
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    wsgi_app = _ActiveRequests(app_module.app)
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, wsgi_app, threaded=True, fd=sock.fileno())
+
+    def on_sigterm(signum, frame):
+        # serve_forever가 돌고 있는 스레드에서 shutdown()을 부르면 멈추므로 별도 스레드에서 호출
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    print(f"[Serve] {role} 워커 준비 완료 (pid={os.getpid()}, {host}:{port}, torch 스레드 {torch_threads})")
+    os.write(ready_fd, b"1")
+    os.close(ready_fd)
+
+    server.serve_forever()
+
+    # 진행 중 요청(스트리밍 답변 포함) 완료 대기
+    deadline = time.time() + SERVER_GRACEFUL_TIMEOUT
+    while wsgi_app.count > 0 and time.time() < deadline:
+        time.sleep(0.1)
+    if wsgi_app.count > 0:
+        print(f"[Serve] {role} 워커 종료: 완료되지 않은 요청 {wsgi_app.count}개 (pid={os.getpid()})")
+    else:
+        print(f"[Serve] {role} 워커 종료 (pid={os.getpid()})")
+    server.server_close()
+    sys.exit(0)  # atexit(질의 캐시 저장 등) 실행
+
+
+class PreforkServer:
+    """마스터 프로세스: 모델 미리 로드 + 워커 fork/감시/교체"""
+
+    def __init__(self, host: str, port: int, workers: int, torch_threads: int = None,
+                 embedder_threads: int = None):
+        self.host = host
+        self.port = port
+        self.num_readers = max(1, workers)
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // (self.num_readers + 1))
+        # 인코딩은 embedder 워커에 모이므로 CPU 코어의 절반을 배정 (나머지는 재순위화/파싱)
+        self.embedder_threads = embedder_threads or max(1, (os.cpu_count() or 1) // 2)
+        self.targets = {"embedder": 1 if EMBEDDING_SERVER_ENABLED else 0, "writer": 1, "reader": self.num_readers}
+        self.workers = {}          # pid -> {"role", "started_at"}
+        self.failures = {role: 0 for role in self.targets}
+        self.stopping = False
+        self.reload_requested = False
+        self.sockets = {}          # role -> listen 소켓 (reader: 공개 포트, writer/embedder: 내부 포트)
+
+    # ==================== 워커 ====================
+
+    def _spawn(self, role: str):
+        """워커 1개 fork 후 요청을 받을 준비가 될 때까지 대기
+
+        Returns:
+            pid (준비 실패 시 None)
+        """
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for other_role, other_sock in self.sockets.items():
+                if other_role != role:
+                    other_sock.close()
+            try:
+                if role == "embedder":
+                    _embedder_main(self.sockets[role], write_fd, self.embedder_threads)
+                else:
+                    _worker_main(role, self.sockets[role], write_fd, self.torch_threads)
+            except SystemExit as e:
+                os._exit(e.code or 0)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+
+        os.close(write_fd)
+        self.workers[pid] = {"role": role, "started_at": time.time()}
+        print(f"[Serve] {role} 워커 시작 (pid={pid})")
+        try:
+            ready, _, _ = select.select([read_fd], [], [], WORKER_BOOT_TIMEOUT)
+            if ready and os.read(read_fd, 1) == b"1":
+                return pid
+            print(f"[Serve] {role} 워커 준비 실패 (pid={pid})")
+            self._stop(pid)
+            return None
+        finally:
+            os.close(read_fd)
+
+    def _stop(self, pid: int):
+        """워커에 SIGTERM → 진행 중 요청 완료 대기 → 시간 초과 시 SIGKILL"""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.time() + SERVER_GRACEFUL_TIMEOUT + 5
+        while time.time() < deadline:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if done:
+                break
+            time.sleep(0.1)
+        else:
+            print(f"[Serve] 워커가 시간 안에 종료되지 않아 강제 종료 (pid={pid})")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.workers.pop(pid, None)
+
+    def _reap(self):
+        """종료된 워커 정리 (비정상 종료가 이어지면 다시 fork하기 전 대기 시간 증가)"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            info = self.workers.pop(pid, None)
+            if info is None or self.stopping:
+                continue
+            uptime = time.time() - info["started_at"]
+            print(f"[Serve] {info['role']} 워커 종료됨 (pid={pid}, 상태 {status}, 실행 {uptime:.0f}초)")
+            if uptime < WORKER_MIN_UPTIME:
+                self.failures[info["role"]] += 1
+            else:
+                self.failures[info["role"]] = 0
+
+    def _count(self, role: str) -> int:
+        return sum(1 for info in self.workers.values() if info["role"] == role)
+
+    def _ensure_workers(self):
+        for role, target in self.targets.items():
+            while not self.stopping and self._count(role) < target:
+                if self.failures[role]:
+                    backoff = min(2 ** self.failures[role], 60)
+                    print(f"[Serve] {role} 워커 다시 시작 전 {backoff}초 대기")
+                    time.sleep(backoff)
+                if self._spawn(role) is None:
+                    self.failures[role] += 1
+
+    def _rolling_reload(self):
+        """워커를 하나씩 교체"""
+        print("[Serve] 워커 교체 시작")
+        for pid in [pid for pid, info in self.workers.items() if info["role"] == "embedder"]:
+            if self._spawn("embedder") is not None:
+                self._stop(pid)
+        # writer는 인덱싱 작업 큐를 가지므로 동시에 2개가 뜨지 않게 먼저 종료 (미완료 작업은 새 writer가 재개)
+        for pid in [pid for pid, info in self.workers.items() if info["role"] == "writer"]:
+            self._stop(pid)
+        self._spawn("writer")
+        for pid in [pid for pid, info in self.workers.items() if info["role"] == "reader"]:
+            if self.stopping:
+                break
+            if self._spawn("reader") is not None:
+                self._stop(pid)
+        print("[Serve] 워커 교체 완료")
+
+    # ==================== 실행 ====================
+
+    def _on_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self.reload_requested = True
+        else:
+            self.stopping = True
+
+    def run(self):
+        from core.ollama_server import start_ollama_server
+        from core.models import preload_models
+
+        start_ollama_server()
+
+        # 모델은 fork 전에 한 번만 로드 (추론은 하지 않음: torch/OpenMP 스레드 풀이 만들어진 뒤 fork하면 워커가 멈출 수 있음)
+        load_start = time.time()
+        preload_models()
+        gc.collect()
+        gc.freeze()
+        print(f"[Serve] 모델 로드 완료 ({time.time() - load_start:.1f}초), 워커 {self.num_readers}개 + writer 1개"
+              f"{' + embedder 1개' if self.targets['embedder'] else ''} 시작")
+
+        self.sockets["reader"] = _listen(self.host, self.port)
+        self.sockets["writer"] = _listen("127.0.0.1", SERVER_WRITER_PORT)
+        if self.targets["embedder"]:
+            self.sockets["embedder"] = _listen("127.0.0.1", EMBEDDING_SERVER_PORT)
+
+        signal.signal(signal.SIGHUP, self._on_signal)
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+        print(f"[Serve] 마스터 pid={os.getpid()}, http://{self.host}:{self.port} (재시작: kill -HUP {os.getpid()})")
+        try:
+            while not self.stopping:
+                self._reap()
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self._rolling_reload()
+                self._ensure_workers()
+                time.sleep(0.5)
+        finally:
+            self.stopping = True
+            print("[Serve] 종료 중: 진행 중 요청 완료 대기")
+            for pid in list(self.workers):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in list(self.workers):
+                self._stop(pid)
+            for sock in self.sockets.values():
+                sock.close()
+            print("[Serve] 종료 완료")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Private RAG 프로덕션 서버 (멀티 프로세스)")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="질의 처리 reader 워커 수")
+    parser.add_argument("--torch-threads", type=int, default=SERVER_TORCH_THREADS,
+                        help="워커당 torch 스레드 수 (기본: CPU 코어 수 / 워커 수)")
+    parser.add_argument("--embedder-threads", type=int, default=None,
+                        help="임베딩 서버 torch 스레드 수 (기본: CPU 코어 수 / 2)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("[Serve] os.fork를 지원하지 않는 환경: 단일 프로세스로 실행")
+        from app import app
+        app.run(host=args.host, port=args.port, debug=False, threaded=True)
+        return
+
+    PreforkServer(args.host, args.port, args.workers, args.torch_threads, args.embedder_threads).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -161,13 +161,27 @@ function App() {
       const formData = new FormData()
       formData.append('file', file)
 
-      await api.post('/upload', formData, {
+      const response = await api.post('/upload', formData, {
         headers: {
           'Content-Type': 'multipart/form-data'
         }
       })
 
+      // 인덱싱은 백그라운드 작업으로 처리되므로 완료될 때까지 상태 확인
+      const jobId = response.data.job_id
+      let job = response.data
+      while (jobId && (job.status === 'queued' || job.status === 'running')) {
+        await new Promise((resolve) => setTimeout(resolve, 1000))
+        job = (await api.get(`/jobs/${jobId}`)).data
+      }
+
       await loadFiles()
+      if (job.status === 'failed') {
+        return { success: false, error: job.error || '인덱싱 실패' }
+      }
+      if (job.status === 'cancelled') {
+        return { success: false, error: '인덱싱이 취소되었습니다' }
+      }
       return { success: true }
     } catch (error) {
       console.error('파일 업로드 실패:', error)
@@ -1,10 +1,11 @@
 import React, { useState, useRef, useEffect } from 'react'
 import './ChatInterface.css'
-import api from '../services/api'
+import { streamQuery } from '../services/api'
 
 function ChatInterface({ backendStatus, chatId, messages, onMessagesChange }) {
   const [input, setInput] = useState('')
   const [loading, setLoading] = useState(false)
+  const [streaming, setStreaming] = useState(false)
   const messagesEndRef = useRef(null)
 
   const scrollToBottom = () => {
@@ -39,28 +40,40 @@ function ChatInterface({ backendStatus, chatId, messages, onMessagesChange }) {
     setLoading(true)
 
     try {
-      const response = await api.post('/query', {
-        query: userMessage
-      })
-
-      const { answer, sources, has_answer } = response.data
+      // 출처를 먼저 받고, 답변은 토큰 단위로 이어 붙임
+      let assistantMessage = { role: 'assistant', content: '', sources: [] }
+      const render = () => onMessagesChange([...messages, newUserMessage, { ...assistantMessage }])
 
-      const newAssistantMessage = {
-        role: 'assistant',
-        content: answer,
-        sources: sources || [],
-        has_answer: has_answer
-      }
-      onMessagesChange([...messages, newUserMessage, newAssistantMessage])
+      await streamQuery(userMessage, (event, data) => {
+        if (event === 'sources') {
+          assistantMessage.sources = data.sources || []
+          render()
+        } else if (event === 'token') {
+          assistantMessage.content += data.content
+          setStreaming(true)
+          render()
+        } else if (event === 'done') {
+          assistantMessage = {
+            role: 'assistant',
+            content: data.answer,
+            sources: data.sources || [],
+            has_answer: data.has_answer
+          }
+          render()
+        } else if (event === 'error') {
+          throw new Error(data.error)
+        }
+      })
     } catch (error) {
       const errorMessage = {
         role: 'assistant',
-        content: `오류가 발생했습니다: ${error.response?.data?.error || error.message}`,
+        content: `오류가 발생했습니다: ${error.message}`,
         error: true
       }
       onMessagesChange([...messages, newUserMessage, errorMessage])
     } finally {
       setLoading(false)
+      setStreaming(false)
     }
   }
 
@@ -122,7 +135,7 @@ function ChatInterface({ backendStatus, chatId, messages, onMessagesChange }) {
           </div>
         ))}
 
-        {loading && (
+        {loading && !streaming && (
           <div className="chat-message assistant">
             <div className="message-bubble assistant">
               <div className="loading-dots">
@@ -13,5 +13,49 @@ api.interceptors.response.use(
   }
 )
 
+/**
+ * 스트리밍 질의 (Server-Sent Events)
+ * onEvent(eventName, data) 콜백으로 sources → token* → done 순서로 전달
+ */
+export async function streamQuery(query, onEvent) {
+  const response = await fetch('/api/query/stream', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ query }),
+  })
+  if (response.status === 429) {
+    // LLM 대기열 초과: 안내 메시지를 답변으로 표시
+    onEvent('done', await response.json())
+    return
+  }
+  if (!response.ok || !response.body) {
+    throw new Error(`HTTP ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+
+      let eventName = 'message'
+      let data = ''
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) eventName = line.slice(6).trim()
+        else if (line.startsWith('data:')) data += line.slice(5).trim()
+      }
+      if (data) onEvent(eventName, JSON.parse(data))
+    }
+  }
+}
+
 export default api
 